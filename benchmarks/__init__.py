@@ -0,0 +1,88 @@
+"""Benchmarks del motor del presupuesto y de los reruns de la interfaz.
+
+    python -m benchmarks                       # motor e interfaz
+    python -m benchmarks --capa motor --comparar benchmarks/resultados/abc1234.json
+
+Los resultados se guardan en JSON (por omisión en ``benchmarks/resultados``
+con el commit actual como nombre) para comparar una versión contra otra.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+DIRECTORIO_RESULTADOS = Path(__file__).parent / 'resultados'
+
+
+def medir(funcion, repeticiones=None, tiempo_minimo=0.2, maximo=1000):
+    """Ejecuta ``funcion`` varias veces y regresa sus tiempos en milisegundos.
+
+    Sin ``repeticiones`` se repite hasta sumar ``tiempo_minimo`` segundos
+    (al menos cinco veces y a lo más ``maximo``). La primera ejecución es de
+    calentamiento y no se cuenta.
+    """
+    funcion()
+    tiempos = []
+    inicio = time.perf_counter()
+    while len(tiempos) < (repeticiones or 5) or (
+            repeticiones is None and len(tiempos) < maximo and time.perf_counter() - inicio < tiempo_minimo):
+        t = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t) * 1000)
+    return {
+        'repeticiones': len(tiempos),
+        'mediana_ms': statistics.median(tiempos),
+        'minimo_ms': min(tiempos),
+        'media_ms': statistics.fmean(tiempos),
+        'desviacion_ms': statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def entorno():
+    """Versión del código y del entorno con que se midió."""
+    import numpy
+    import pandas
+    import streamlit
+    return {
+        'commit': commit_actual(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'streamlit': streamlit.__version__,
+    }
+
+
+def guardar(resultados, ruta):
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(json.dumps({'entorno': entorno(), 'resultados': resultados}, indent=2, ensure_ascii=False))
+    return ruta
+
+
+def comparar(actual, base, umbral=1.25):
+    """Renglones ``(nombre, base_ms, actual_ms, razón, regresión)`` de los benchmarks comunes.
+
+    Se compara la mediana; hay regresión si la razón actual/base supera ``umbral``.
+    """
+    renglones = []
+    for nombre, medida in actual.items():
+        if nombre not in base:
+            continue
+        antes, ahora = base[nombre]['mediana_ms'], medida['mediana_ms']
+        razon = ahora / antes if antes else float('inf')
+        renglones.append((nombre, antes, ahora, razon, razon > umbral))
+    return renglones
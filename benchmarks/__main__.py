@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# La caché en disco del motor no debe mezclarse con la del usuario ni sesgar los tiempos
+os.environ.setdefault('PRESUPUESTO_CACHE_DIR', tempfile.mkdtemp(prefix='presupuesto-bench-'))
+
+from . import DIRECTORIO_RESULTADOS, commit_actual, comparar, guardar, medir  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmarks del motor y de los reruns de finanzas.py.")
+    parser.add_argument('--capa', choices=('motor', 'interfaz', 'todo'), default='todo')
+    parser.add_argument('--filtro', default=None, help="Sólo los micro benchmarks cuyo nombre contiene este texto")
+    parser.add_argument('--repeticiones', type=int, default=5, help="Reruns medidos por benchmark de interfaz")
+    parser.add_argument('--salida', default=None,
+                        help="Archivo JSON (por omisión, benchmarks/resultados/<commit>.json)")
+    parser.add_argument('--comparar', default=None, help="JSON de una corrida anterior contra el cual comparar")
+    parser.add_argument('--umbral', type=float, default=1.25,
+                        help="Razón actual/base de la mediana a partir de la cual se marca una regresión")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    if args.capa in ('motor', 'todo'):
+        from .motor import benchmarks
+        for nombre, funcion in benchmarks().items():
+            if args.filtro and args.filtro not in nombre:
+                continue
+            resultados[nombre] = medir(funcion)
+            print(f"{nombre:<52} {resultados[nombre]['mediana_ms']:>12.4f} ms", file=sys.stderr)
+    if args.capa in ('interfaz', 'todo'):
+        from .interfaz import benchmarks
+        for nombre, medida in benchmarks(args.repeticiones).items():
+            resultados[nombre] = medida
+            print(f"{nombre:<52} {medida['mediana_ms']:>12.4f} ms", file=sys.stderr)
+
+    ruta = guardar(resultados, args.salida or DIRECTORIO_RESULTADOS / f"{commit_actual() or 'sin_commit'}.json")
+    print(f"Resultados en {ruta}", file=sys.stderr)
+
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text(encoding='utf-8'))['resultados']
+        regresiones = 0
+        for nombre, antes, ahora, razon, regresion in comparar(resultados, base, args.umbral):
+            regresiones += regresion
+            print(f"{nombre:<52} {antes:>12.4f} -> {ahora:>12.4f} ms  x{razon:5.2f}{'  REGRESIÓN' if regresion else ''}")
+        return 1 if regresiones else 0
+    return 0
+
+
+sys.exit(main())
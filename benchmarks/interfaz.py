@@ -0,0 +1,70 @@
+"""Tiempo de rerun de la página completa con el arnés de pruebas de Streamlit.
+
+Se maneja ``finanzas.py`` sin navegador (``AppTest``) dentro del módulo 1:
+arranque en frío, cambio de módulo, cambio a cada etapa de presupuestos
+operativos, rerun sin cambios en cada etapa y rerun después de editar una
+entrada (lo que el usuario hace en cada tecla).
+"""
+import itertools
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from . import medir
+
+APLICACION = Path(__file__).resolve().parent.parent / 'finanzas.py'
+MODULO = "1. Presupuestos Operativos"
+# Etapas de presupuestos operativos que se recorren (Ventas a Estado de Resultados)
+ETAPAS_OPERATIVAS = 8
+# Entrada que se edita para medir el rerun de una interacción: (etapa, key, valores alternos)
+EDICION = (4, 'gif_mat', (1_320_000.0, 1_000_000.0))
+
+
+def _aplicacion():
+    at = AppTest.from_file(str(APLICACION), default_timeout=120)
+    at.run()
+    return at
+
+
+def _correr(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"La aplicación falló durante el benchmark: {at.exception[0].message}")
+
+
+def benchmarks(repeticiones=5):
+    """Mide los reruns del módulo 1; regresa ``{nombre: medida}``."""
+    resultados = {}
+    resultados['interfaz/arranque'] = medir(_aplicacion, repeticiones)
+
+    at = _aplicacion()
+
+    def cambiar_modulo():
+        at.sidebar.radio[0].set_value("Inicio" if at.sidebar.radio[0].value == MODULO else MODULO)
+        _correr(at)
+    resultados['interfaz/cambio_modulo'] = medir(cambiar_modulo, repeticiones)
+
+    at.sidebar.radio[0].set_value(MODULO)
+    _correr(at)
+    etapas = at.radio(key='etapa').options[:ETAPAS_OPERATIVAS]
+    for i, etapa in enumerate(etapas, 1):
+        at.radio(key='etapa').set_value(etapa)
+        _correr(at)
+        resultados[f'interfaz/rerun/etapa_{i}'] = medir(lambda: _correr(at), repeticiones)
+
+    numero, key, valores = EDICION
+    at.radio(key='etapa').set_value(etapas[numero])
+    _correr(at)
+    alterno = itertools.cycle(valores)
+
+    def editar():
+        at.number_input(key=key).set_value(next(alterno))
+        _correr(at)
+    resultados[f'interfaz/edicion/{key}'] = medir(editar, repeticiones)
+
+    def recorrer():
+        for etapa in etapas:
+            at.radio(key='etapa').set_value(etapa)
+            _correr(at)
+    resultados['interfaz/recorrido_etapas'] = medir(recorrer, repeticiones)
+    return resultados
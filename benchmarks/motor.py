@@ -0,0 +1,85 @@
+"""Micro benchmarks del paquete ``presupuesto``.
+
+* Valuación de materiales (``calcular_valuacion``) y costo de ventas de
+  producto terminado con los tres métodos, escalar y vectorizado.
+* Presupuesto maestro de un producto y evaluación de lotes de escenarios.
+* Presupuesto multiproducto y serialización a Arrow de la tabla por SKU (lo
+  que hace ``st.dataframe`` en cada rerun) con 1, 100 y 10,000 SKU.
+"""
+import numpy as np
+import pandas as pd
+from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+
+from presupuesto import METODOS_VALUACION, EntradasPresupuesto, Material, compute_master_budget, evaluar_escenarios
+from presupuesto.bom import ListaMateriales
+from presupuesto.motor import costo_de_ventas
+from presupuesto.multiproducto import presupuesto_multiproducto
+from presupuesto.valuacion import calcular_valuacion, codificar_metodos, valuacion_vectorizada
+
+ESCENARIOS = (1_000, 100_000)
+SKUS = (1, 100, 10_000)
+# Materiales por SKU en los catálogos sintéticos
+COMPONENTES_POR_SKU = 3
+
+
+def catalogo_sintetico(skus, semilla=0):
+    """Tabla de productos y BOM de ``skus`` productos con datos aleatorios reproducibles."""
+    rng = np.random.default_rng(semilla)
+    n_materiales = max(2, skus // 10)
+    productos = pd.DataFrame({
+        'unidades': rng.integers(1_000, 100_000, skus).astype(float),
+        'precio': rng.uniform(50, 500, skus),
+        'inv_final_pt': rng.integers(0, 10_000, skus).astype(float),
+        'inv_inicial_pt': rng.integers(0, 10_000, skus).astype(float),
+        'hrs_unit': rng.uniform(0.5, 15, skus),
+        'precio_inv_inicial_pt': rng.uniform(20, 300, skus),
+    }, index=pd.Index([f'SKU-{i:05d}' for i in range(skus)], name='sku'))
+    materiales = [
+        Material(f'MAT-{i:04d}', float(rng.integers(0, 50_000)), float(rng.uniform(1, 20)),
+                 float(rng.integers(0, 50_000)), float(rng.uniform(1, 20)))
+        for i in range(n_materiales)
+    ]
+    filas = rng.integers(0, n_materiales, skus * COMPONENTES_POR_SKU)
+    columnas = np.repeat(np.arange(skus), COMPONENTES_POR_SKU)
+    bom = ListaMateriales(materiales, productos.index, filas, columnas, rng.uniform(0.5, 8, len(filas)))
+    return productos, bom
+
+
+def escenarios_sinteticos(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'unidades': rng.integers(40_000, 90_000, n).astype(float),
+        'precio': rng.uniform(300, 550, n),
+        'costo_mat_a': rng.uniform(4, 9, n),
+        'cuota_hr': rng.uniform(7, 12, n),
+        'metodo_valuacion': np.resize(np.array(METODOS_VALUACION), n),
+    })
+
+
+def benchmarks():
+    """``{nombre: función sin argumentos}`` de todos los micro benchmarks."""
+    casos = {}
+    base = EntradasPresupuesto()
+    for metodo in METODOS_VALUACION:
+        casos[f'valuacion/{metodo}'] = lambda m=metodo: calcular_valuacion(40000, 5.0, 443000, 6.0, 448000, m)
+        casos[f'costo_ventas/{metodo}'] = lambda m=metodo: costo_de_ventas(5000, 250.0, 64000, 180.0, 63000, m)
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    capas = (rng.uniform(0, 10_000, n), rng.uniform(50, 300, n), rng.uniform(10_000, 90_000, n),
+             rng.uniform(50, 300, n), rng.uniform(10_000, 90_000, n))
+    for metodo in METODOS_VALUACION:
+        codigo = codificar_metodos(metodo)
+        casos[f'costo_ventas_vectorizado/{metodo}/{n}'] = lambda c=codigo: valuacion_vectorizada(*capas, c)
+
+    casos['presupuesto/maestro'] = lambda: compute_master_budget(base)
+    for n in ESCENARIOS:
+        escenarios = escenarios_sinteticos(n)
+        casos[f'lote/escenarios/{n}'] = lambda e=escenarios: evaluar_escenarios(e, base)
+
+    for skus in SKUS:
+        productos, bom = catalogo_sintetico(skus)
+        tabla = presupuesto_multiproducto(productos, bom, base).productos
+        casos[f'multiproducto/{skus}_sku'] = lambda p=productos, b=bom: presupuesto_multiproducto(p, b, base)
+        casos[f'tabla_arrow/{skus}_sku'] = lambda t=tabla: convert_pandas_df_to_arrow_bytes(t)
+    return casos
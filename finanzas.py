@@ -1,1077 +1,1857 @@
-import streamlit as st
-import pandas as pd
-import math
-
-# --- CONFIGURACIÓN GLOBAL ---
-st.set_page_config(page_title="Sistema de Gestión Financiera", layout="wide")
-
-# --- ESTILOS CSS PREMIUM EQUILIBRADO ---
-# --- ESTILOS CSS MEJORADOS ---
-st.markdown("""
-    <style>
-    /* Importar fuente moderna */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-    
-    /* Configuración global */
-    .main { 
-        background: linear-gradient(135deg, #f5f7fa 0%, #e8eef5 100%);
-        font-family: 'Inter', 'Segoe UI', sans-serif;
-    }
-    
-    /* Títulos principales */
-    h1 { 
-        font-family: 'Inter', sans-serif;
-        color: #1a202c;
-        font-size: 2.5rem;
-        font-weight: 700;
-        border-bottom: 3px solid #3b82f6;
-        padding-bottom: 20px;
-        margin-bottom: 30px;
-        text-shadow: 0 2px 4px rgba(0,0,0,0.05);
-    }
-    
-    h2 { 
-        font-family: 'Inter', sans-serif;
-        color: #2d3748;
-        font-size: 1.8rem;
-        font-weight: 600;
-        margin-top: 25px;
-        margin-bottom: 15px;
-    }
-    
-    h3 { 
-        font-family: 'Inter', sans-serif;
-        color: #4a5568;
-        font-size: 1.3rem;
-        font-weight: 600;
-        margin-top: 20px;
-    }
-    
-    h4 {
-        font-family: 'Inter', sans-serif;
-        color: #4a5568;
-        font-size: 1.1rem;
-        font-weight: 600;
-    }
-    
-    /* Tarjetas métricas mejoradas */
-    .metric-card {
-        background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
-        border: none;
-        border-radius: 12px;
-        padding: 25px;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.07), 0 1px 3px rgba(0,0,0,0.06);
-        text-align: center;
-        margin-bottom: 20px;
-        transition: all 0.3s ease;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .metric-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: 4px;
-        background: linear-gradient(90deg, #3b82f6, #8b5cf6);
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 12px 24px rgba(0,0,0,0.1), 0 4px 8px rgba(0,0,0,0.06);
-    }
-    
-    .metric-card h3 { 
-        color: #1a202c;
-        font-size: 28px;
-        margin: 10px 0;
-        font-weight: 700;
-    }
-    
-    .metric-card p { 
-        color: #64748b;
-        font-size: 13px;
-        margin-top: 8px;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        font-weight: 500;
-    }
-    
-    /* Variantes de tarjetas */
-    .metric-success::before {
-        background: linear-gradient(90deg, #10b981, #059669);
-    }
-    
-    .metric-success h3 {
-        color: #059669;
-    }
-    
-    .metric-warning::before {
-        background: linear-gradient(90deg, #f59e0b, #d97706);
-    }
-    
-    .metric-warning h3 {
-        color: #d97706;
-    }
-    
-    .metric-danger::before {
-        background: linear-gradient(90deg, #ef4444, #dc2626);
-    }
-    
-    .metric-danger h3 {
-        color: #dc2626;
-    }
-    
-    /* Botones mejorados */
-    .stButton>button {
-        background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%);
-        color: white;
-        border-radius: 8px;
-        border: none;
-        height: 3em;
-        font-weight: 600;
-        width: 100%;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 6px rgba(59, 130, 246, 0.3);
-        font-family: 'Inter', sans-serif;
-        font-size: 15px;
-        letter-spacing: 0.5px;
-    }
-    
-    .stButton>button:hover { 
-        background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%);
-        box-shadow: 0 6px 12px rgba(59, 130, 246, 0.4);
-        transform: translateY(-2px);
-    }
-    
-    .stButton>button:active {
-        transform: translateY(0);
-    }
-    
-    /* DataFrames mejorados */
-    .stDataFrame { 
-        border: 1px solid #e2e8f0;
-        border-radius: 12px;
-        overflow: hidden;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.04);
-    }
-    
-    .stDataFrame [data-testid="stDataFrameResizable"] {
-        border-radius: 12px;
-    }
-    
-    /* Cajas de información mejoradas */
-    .info-box {
-        background: linear-gradient(135deg, #dbeafe 0%, #bfdbfe 100%);
-        border-left: 5px solid #3b82f6;
-        padding: 20px;
-        margin: 15px 0;
-        border-radius: 8px;
-        box-shadow: 0 2px 4px rgba(59, 130, 246, 0.1);
-        font-family: 'Inter', sans-serif;
-    }
-    
-    .info-box b {
-        color: #1e40af;
-        font-weight: 600;
-    }
-    
-    .warning-box {
-        background: linear-gradient(135deg, #fef3c7 0%, #fde68a 100%);
-        border-left: 5px solid #f59e0b;
-        padding: 20px;
-        margin: 15px 0;
-        border-radius: 8px;
-        box-shadow: 0 2px 4px rgba(245, 158, 11, 0.1);
-        font-family: 'Inter', sans-serif;
-    }
-    
-    .warning-box b {
-        color: #d97706;
-        font-weight: 600;
-    }
-    
-    .success-box {
-        background: linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%);
-        border-left: 5px solid #10b981;
-        padding: 20px;
-        margin: 15px 0;
-        border-radius: 8px;
-        box-shadow: 0 2px 4px rgba(16, 185, 129, 0.1);
-        font-family: 'Inter', sans-serif;
-    }
-    
-    .success-box b {
-        color: #059669;
-        font-weight: 600;
-    }
-    
-    /* Sidebar mejorado */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, #1e293b 0%, #0f172a 100%);
-    }
-    
-    [data-testid="stSidebar"] .stRadio label {
-        color: #e2e8f0 !important;
-        font-weight: 500;
-        padding: 12px 16px;
-        border-radius: 8px;
-        transition: all 0.2s ease;
-    }
-    
-    [data-testid="stSidebar"] .stRadio label:hover {
-        background-color: rgba(59, 130, 246, 0.1);
-        color: #93c5fd !important;
-    }
-    
-    [data-testid="stSidebar"] h2 {
-        color: #f1f5f9 !important;
-        font-weight: 600;
-        font-size: 1.2rem;
-    }
-    
-    [data-testid="stSidebar"] .stMarkdown {
-        color: #cbd5e1;
-    }
-    
-    /* Tabs mejorados */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-        background-color: transparent;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        height: 50px;
-        background-color: white;
-        border-radius: 8px 8px 0 0;
-        color: #64748b;
-        font-weight: 500;
-        border: 1px solid #e2e8f0;
-        border-bottom: none;
-        padding: 0 24px;
-        transition: all 0.2s ease;
-    }
-    
-    .stTabs [data-baseweb="tab"]:hover {
-        background-color: #f8fafc;
-        color: #3b82f6;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background: linear-gradient(180deg, #ffffff 0%, #f8fafc 100%);
-        color: #3b82f6 !important;
-        border-color: #3b82f6;
-        font-weight: 600;
-    }
-    
-    /* Inputs mejorados */
-    .stNumberInput input, .stTextInput input {
-        border-radius: 8px;
-        border: 2px solid #e2e8f0;
-        padding: 10px;
-        font-family: 'Inter', sans-serif;
-        transition: all 0.2s ease;
-    }
-    
-    .stNumberInput input:focus, .stTextInput input:focus {
-        border-color: #3b82f6;
-        box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.1);
-    }
-    
-    /* Expander mejorado */
-    .streamlit-expanderHeader {
-        background-color: white;
-        border-radius: 8px;
-        border: 1px solid #e2e8f0;
-        font-weight: 600;
-        color: #1a202c;
-        padding: 16px;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    .streamlit-expanderHeader:hover {
-        background-color: #f8fafc;
-        border-color: #3b82f6;
-    }
-    
-    /* Radio buttons mejorados */
-    .stRadio > label {
-        font-weight: 600;
-        color: #1a202c;
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Animaciones */
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(10px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    .metric-card, .info-box, .warning-box, .success-box {
-        animation: fadeIn 0.5s ease;
-    }
-    
-    /* Scrollbar personalizada */
-    ::-webkit-scrollbar {
-        width: 10px;
-        height: 10px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: #f1f5f9;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: linear-gradient(180deg, #3b82f6, #2563eb);
-        border-radius: 5px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: linear-gradient(180deg, #2563eb, #1d4ed8);
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-st.title("Sistema Integral de Presupuestos y Finanzas - 6NM62")
-
-# --- MENÚ LATERAL ---
-st.sidebar.header("Navegación")
-modulo = st.sidebar.radio("Seleccione Módulo:", [
-    "Inicio",
-    "1. Presupuestos Operativos",
-])
-st.sidebar.markdown("---")
-st.sidebar.info("Versión Profesional 3.0 - Completo")
-
-# ==============================================================================
-#        MÓDULO 0: INICIO
-# ==============================================================================
-if modulo == "Inicio":
-    st.markdown("#### Panel de Control Principal")
-    st.write("Bienvenido al sistema. Seleccione una opción del menú lateral para proceder.")
-    
-    c1, c2, c3 = st.columns(3)
-    c1.markdown("<div class='metric-card'><h3>Módulo 1</h3><p>Presupuestos Maestros</p></div>", unsafe_allow_html=True)
-
-# ==============================================================================
-#        MÓDULO 1: PRESUPUESTOS OPERATIVOS 
-# ==============================================================================
-elif modulo == "1. Presupuestos Operativos":
-    st.header("🎯 Generador de Presupuestos Maestros")
-    
-    # Inicializar variables de sesión si no existen
-    if 'datos_inicializados' not in st.session_state:
-        st.session_state['datos_inicializados'] = True
-        st.session_state['metodo_valuacion'] = 'UEPS'
-    
-    # Selector de método de valuación
-    with st.expander("⚙️ Configuración del Sistema", expanded=False):
-        st.session_state['metodo_valuacion'] = st.radio(
-            "Método de Valuación de Inventarios:",
-            ['UEPS', 'PEPS', 'Promedio Ponderado'],
-            horizontal=True
-        )
-        st.info(f"📌 Método seleccionado: **{st.session_state['metodo_valuacion']}** - Este método se aplicará a todos los cálculos de inventarios.")
-    
-    tabs = st.tabs([
-        "1️⃣ Ventas", 
-        "2️⃣ Producción", 
-        "3️⃣ Materiales", 
-        "4️⃣ Mano de Obra", 
-        "5️⃣ GIF",
-        "6️⃣ Costo Producción",
-        "7️⃣ Costo de Ventas",
-        "8️⃣ Estado de Resultados"
-    ])
-    
-    # ==================== TAB 1: VENTAS ====================
-    with tabs[0]:
-        st.subheader("📊 Presupuesto de Ventas")
-        
-        st.markdown("<div class='info-box'>💡 <b>Tip:</b> Este es el punto de partida de todo el presupuesto maestro.</div>", unsafe_allow_html=True)
-        
-        c1, c2 = st.columns(2)
-        unidades = c1.number_input("Unidades a vender", 0, 1000000, 63000, key="pv_uni", 
-                                   help="Cantidad de productos que se planea vender en el período")
-        precio = c2.number_input("Precio Unitario ($)", 0.0, 100000.0, 420.0, key="pv_precio",
-                                 help="Precio de venta por unidad")
-        
-        ingreso = unidades * precio
-        st.session_state['ventas_unidades'] = unidades
-        st.session_state['ventas_precio'] = precio
-        st.session_state['ventas_ingresos'] = ingreso
-        
-        st.markdown("---")
-        st.markdown("### Resultado:")
-        col1, col2, col3 = st.columns(3)
-        col1.markdown(f"<div class='metric-card metric-success'><h3>{unidades:,}</h3><p>Unidades</p></div>", unsafe_allow_html=True)
-        col2.markdown(f"<div class='metric-card'><h3>${precio:,.2f}</h3><p>Precio Unitario</p></div>", unsafe_allow_html=True)
-        col3.markdown(f"<div class='metric-card metric-success'><h3>${ingreso:,.2f}</h3><p>Ingresos Totales</p></div>", unsafe_allow_html=True)
-
-    # ==================== TAB 2: PRODUCCIÓN ====================
-    with tabs[1]:
-        st.subheader("🏭 Presupuesto de Producción")
-        
-        st.markdown("<div class='info-box'>💡 <b>Fórmula:</b> Unidades a Producir = Ventas + Inv. Final - Inv. Inicial</div>", unsafe_allow_html=True)
-        
-        col1, col2, col3 = st.columns(3)
-        v_est = col1.number_input("Ventas Estimadas", 
-                                  value=st.session_state.get('ventas_unidades', 63000), 
-                                  key="pp_ventas",
-                                  help="Se toma del presupuesto de ventas")
-        if_des = col2.number_input("Inventario Final Deseado", value=6000, key="pp_if",
-                                   help="Inventario que queremos tener al final del período")
-        ii_est = col3.number_input("Inventario Inicial", value=5000, key="pp_ii",
-                                   help="Inventario con el que iniciamos el período")
-        
-        prod_req = v_est + if_des - ii_est
-        st.session_state['prod_unidades'] = prod_req
-        st.session_state['prod_inv_inicial_pt'] = ii_est
-        st.session_state['prod_inv_final_pt'] = if_des
-        
-        st.markdown("---")
-        st.markdown("### Cálculo:")
-        
-        df_prod = pd.DataFrame({
-            'Concepto': [
-                'Unidades a Vender',
-                '(+) Inventario Final Deseado',
-                '(=) Total Requerido',
-                '(-) Inventario Inicial',
-                '(=) UNIDADES A PRODUCIR'
-            ],
-            'Unidades': [v_est, if_des, v_est + if_des, ii_est, prod_req]
-        })
-        
-        st.dataframe(df_prod.style.format({'Unidades': '{:,.0f}'}), hide_index=True, use_container_width=True)
-        
-        st.markdown(f"<div class='metric-card metric-success'><h3>{prod_req:,}</h3><p>Unidades a Producir</p></div>", unsafe_allow_html=True)
-
-    # ==================== TAB 3: MATERIALES (CON VALUACIÓN) ====================
-    with tabs[2]:
-        st.subheader("📦 Presupuesto de Requerimientos y Compras de Materiales")
-        
-        st.markdown("### Paso 1: Requerimientos de Materia Prima")
-        st.markdown("<div class='info-box'>💡 Calcula cuánta materia prima necesitas para la producción planeada</div>", unsafe_allow_html=True)
-        
-        # Materiales A y B
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### 🔹 Material A")
-            prod = st.number_input("Producción Requerida", 
-                                  value=st.session_state.get('prod_unidades', 64000), 
-                                  key="pm_prod_a", disabled=True)
-            std_mat_a = st.number_input("Piezas de Material A por Unidad", value=7.0, key="pm_std_a",
-                                       help="Cuántas piezas de Material A necesita cada producto")
-            req_total_a = prod * std_mat_a
-            st.metric("Requerimiento Total Material A", f"{req_total_a:,.0f} piezas")
-            
-        with col2:
-            st.markdown("#### 🔹 Material B")
-            st.number_input("Producción Requerida", 
-                           value=st.session_state.get('prod_unidades', 64000), 
-                           key="pm_prod_b", disabled=True)
-            std_mat_b = st.number_input("Piezas de Material B por Unidad", value=3.0, key="pm_std_b",
-                                       help="Cuántas piezas de Material B necesita cada producto")
-            req_total_b = prod * std_mat_b
-            st.metric("Requerimiento Total Material B", f"{req_total_b:,.0f} piezas")
-        
-        st.markdown("---")
-        st.markdown("### Paso 2: Presupuesto de Compras")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### 🔹 Material A")
-            ii_mat_a = st.number_input("Inventario Inicial (piezas)", value=40000.0, key="pm_ii_a")
-            precio_ii_a = st.number_input("Precio Unit. Inv. Inicial ($)", value=5.0, key="pm_precio_ii_a")
-            if_mat_a = st.number_input("Inventario Final Deseado (piezas)", value=35000.0, key="pm_if_a")
-            costo_mat_a = st.number_input("Precio de Compra Actual ($)", value=6.0, key="pm_costo_a")
-            
-            compras_uni_a = req_total_a + if_mat_a - ii_mat_a
-            costo_compras_a = compras_uni_a * costo_mat_a
-            
-            st.markdown(f"""
-            <div class='success-box'>
-                <b>📋 Resumen Material A:</b><br>
-                • Necesario para producción: {req_total_a:,.0f}<br>
-                • (+) Inv. Final: {if_mat_a:,.0f}<br>
-                • (-) Inv. Inicial: {ii_mat_a:,.0f}<br>
-                • = <b>A Comprar: {compras_uni_a:,.0f} piezas</b><br>
-                • <b>Costo: ${costo_compras_a:,.2f}</b>
-            </div>
-            """, unsafe_allow_html=True)
-            
-        with col2:
-            st.markdown("#### 🔹 Material B")
-            ii_mat_b = st.number_input("Inventario Inicial (piezas)", value=15000.0, key="pm_ii_b")
-            precio_ii_b = st.number_input("Precio Unit. Inv. Inicial ($)", value=11.0, key="pm_precio_ii_b")
-            if_mat_b = st.number_input("Inventario Final Deseado (piezas)", value=12000.0, key="pm_if_b")
-            costo_mat_b = st.number_input("Precio de Compra Actual ($)", value=12.0, key="pm_costo_b")
-            
-            compras_uni_b = req_total_b + if_mat_b - ii_mat_b
-            costo_compras_b = compras_uni_b * costo_mat_b
-            
-            st.markdown(f"""
-            <div class='success-box'>
-                <b>📋 Resumen Material B:</b><br>
-                • Necesario para producción: {req_total_b:,.0f}<br>
-                • (+) Inv. Final: {if_mat_b:,.0f}<br>
-                • (-) Inv. Inicial: {ii_mat_b:,.0f}<br>
-                • = <b>A Comprar: {compras_uni_b:,.0f} piezas</b><br>
-                • <b>Costo: ${costo_compras_b:,.2f}</b>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        st.markdown("---")
-        st.markdown("### Paso 3: Valuación de Inventarios")
-        st.markdown(f"<div class='warning-box'>⚙️ <b>Método aplicado: {st.session_state['metodo_valuacion']}</b></div>", unsafe_allow_html=True)
-        
-        # Función para calcular valuación según método
-        def calcular_valuacion(inv_inicial, precio_inicial, compras, precio_compras, consumo, metodo):
-            total_disponible = inv_inicial + compras
-            
-            if metodo == 'UEPS':
-                # Primero sale lo último que entró (compras)
-                if consumo <= compras:
-                    costo_consumo = consumo * precio_compras
-                    inv_final_cant = total_disponible - consumo
-                    # El inventario final es del inicial
-                    costo_inv_final = inv_final_cant * precio_inicial
-                else:
-                    # Se consumen todas las compras y parte del inicial
-                    costo_consumo = (compras * precio_compras) + ((consumo - compras) * precio_inicial)
-                    inv_final_cant = total_disponible - consumo
-                    costo_inv_final = inv_final_cant * precio_inicial
-                    
-            elif metodo == 'PEPS':
-                # Primero sale lo primero que entró (inicial)
-                if consumo <= inv_inicial:
-                    costo_consumo = consumo * precio_inicial
-                    inv_final_cant = total_disponible - consumo
-                    # Inventario final viene de compras
-                    costo_inv_final = inv_final_cant * precio_compras
-                else:
-                    # Se consume todo el inicial y parte de compras
-                    costo_consumo = (inv_inicial * precio_inicial) + ((consumo - inv_inicial) * precio_compras)
-                    inv_final_cant = total_disponible - consumo
-                    costo_inv_final = inv_final_cant * precio_compras
-                    
-            else:  # Promedio Ponderado
-                valor_total = (inv_inicial * precio_inicial) + (compras * precio_compras)
-                costo_promedio = valor_total / total_disponible
-                costo_consumo = consumo * costo_promedio
-                inv_final_cant = total_disponible - consumo
-                costo_inv_final = inv_final_cant * costo_promedio
-            
-            return costo_consumo, costo_inv_final, inv_final_cant
-        
-        # Calcular Material A
-        costo_consumo_a, costo_inv_final_a, cant_inv_final_a = calcular_valuacion(
-            ii_mat_a, precio_ii_a, compras_uni_a, costo_mat_a, req_total_a, st.session_state['metodo_valuacion']
-        )
-        
-        # Calcular Material B
-        costo_consumo_b, costo_inv_final_b, cant_inv_final_b = calcular_valuacion(
-            ii_mat_b, precio_ii_b, compras_uni_b, costo_mat_b, req_total_b, st.session_state['metodo_valuacion']
-        )
-        
-        # Guardar en sesión
-        st.session_state['mp_costo_produccion_a'] = costo_consumo_a
-        st.session_state['mp_costo_produccion_b'] = costo_consumo_b
-        st.session_state['mp_total_produccion'] = costo_consumo_a + costo_consumo_b
-        
-        # Mostrar resultados
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### 🔹 Material A")
-            st.markdown(f"""
-            <div class='metric-card'>
-                <h3>${costo_consumo_a:,.2f}</h3>
-                <p>Costo MP A en Producción</p>
-            </div>
-            """, unsafe_allow_html=True)
-            st.info(f"Inventario Final: {cant_inv_final_a:,.0f} piezas = ${costo_inv_final_a:,.2f}")
-            
-        with col2:
-            st.markdown("#### 🔹 Material B")
-            st.markdown(f"""
-            <div class='metric-card'>
-                <h3>${costo_consumo_b:,.2f}</h3>
-                <p>Costo MP B en Producción</p>
-            </div>
-            """, unsafe_allow_html=True)
-            st.info(f"Inventario Final: {cant_inv_final_b:,.0f} piezas = ${costo_inv_final_b:,.2f}")
-        
-        st.markdown(f"""
-        <div class='metric-card metric-success'>
-            <h3>${costo_consumo_a + costo_consumo_b:,.2f}</h3>
-            <p>Costo Total de Materia Prima en Producción</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-    # ==================== TAB 4: MANO DE OBRA ====================
-    with tabs[3]:
-        st.subheader("👷 Presupuesto de Mano de Obra Directa (MOD)")
-        
-        st.markdown("<div class='info-box'>💡 <b>Fórmula:</b> Costo MOD = Unidades × Horas/Unidad × Tarifa/Hora</div>", unsafe_allow_html=True)
-        
-        c1, c2, c3 = st.columns(3)
-        mod_prod = c1.number_input("Producción Requerida", 
-                                   value=st.session_state.get('prod_unidades', 64000), 
-                                   key="mod_prod", disabled=True)
-        hrs_unit = c2.number_input("Horas por Unidad", value=13.0, key="mod_hrs",
-                                   help="Horas de trabajo requeridas para producir una unidad")
-        cuota_hr = c3.number_input("Tarifa por Hora ($)", value=9.0, key="mod_costo",
-                                   help="Salario por hora del trabajador directo")
-        
-        total_horas = mod_prod * hrs_unit
-        costo_mod = total_horas * cuota_hr
-        
-        st.session_state['mod_costo_total'] = costo_mod
-        
-        st.markdown("---")
-        st.markdown("### Resultado:")
-        
-        col1, col2, col3 = st.columns(3)
-        col1.markdown(f"<div class='metric-card'><h3>{total_horas:,.0f}</h3><p>Total de Horas</p></div>", unsafe_allow_html=True)
-        col2.markdown(f"<div class='metric-card'><h3>${cuota_hr:,.2f}</h3><p>Tarifa por Hora</p></div>", unsafe_allow_html=True)
-        col3.markdown(f"<div class='metric-card metric-success'><h3>${costo_mod:,.2f}</h3><p>Costo Total MOD</p></div>", unsafe_allow_html=True)
-
-    # ==================== TAB 5: GASTOS INDIRECTOS DE FABRICACIÓN ====================
-    with tabs[4]:
-        st.subheader("🏭 Presupuesto de Gastos Indirectos de Fabricación (GIF)")
-        
-        st.markdown("<div class='info-box'>💡 Los GIF incluyen todos los costos de fabricación que no son materia prima directa ni mano de obra directa</div>", unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            mat_indirecto = st.number_input("Material Indirecto", value=1320000.0, key="gif_mat",
-                                           help="Materiales auxiliares, lubricantes, suministros, etc.")
-            moi = st.number_input("Mano de Obra Indirecta", value=2130000.0, key="gif_moi",
-                                 help="Supervisores, almacenistas, control de calidad, etc.")
-            renta = st.number_input("Renta de Planta", value=360000.0, key="gif_renta",
-                                   help="Arrendamiento o depreciación de instalaciones")
-        
-        with col2:
-            energia = st.number_input("Energía Eléctrica", value=464000.0, key="gif_energia",
-                                     help="Luz, gas, agua de la planta")
-            mantenimiento = st.number_input("Mantenimiento", value=674000.0, key="gif_mant",
-                                           help="Reparaciones y mantenimiento preventivo")
-            varios = st.number_input("Gastos Varios", value=500000.0, key="gif_varios",
-                                    help="Seguros, impuestos prediales, otros gastos")
-        
-        total_gif = mat_indirecto + moi + renta + energia + mantenimiento + varios
-        st.session_state['gif_total'] = total_gif
-        
-        st.markdown("---")
-        st.markdown("### Resumen de GIF:")
-        
-        df_gif = pd.DataFrame({
-            'Concepto': ['Material Indirecto', 'Mano de Obra Indirecta', 'Renta', 
-                        'Energía', 'Mantenimiento', 'Varios', 'TOTAL'],
-            'Importe': [mat_indirecto, moi, renta, energia, mantenimiento, varios, total_gif]
-        })
-        
-        st.dataframe(df_gif.style.format({'Importe': '${:,.2f}'}).apply(
-            lambda x: ['background-color: #e8f8f5; font-weight: bold' if x.name == len(df_gif)-1 else '' for i in x], axis=1
-        ), hide_index=True, use_container_width=True)
-        
-        st.markdown(f"<div class='metric-card metric-success'><h3>${total_gif:,.2f}</h3><p>Total Gastos Indirectos de Fabricación</p></div>", unsafe_allow_html=True)
-
-    # ==================== TAB 6: COSTO DE PRODUCCIÓN ====================
-    with tabs[5]:
-        st.subheader("💰 Cédula de Costo de Producción")
-        
-        st.markdown("<div class='info-box'>💡 <b>Costo de Producción = Materia Prima + MOD + GIF</b></div>", unsafe_allow_html=True)
-        
-        # Recuperar datos
-        mp_total = st.session_state.get('mp_total_produccion', 0)
-        mod_total = st.session_state.get('mod_costo_total', 0)
-        gif_total = st.session_state.get('gif_total', 0)
-        unidades_prod = st.session_state.get('prod_unidades', 1)
-        
-        # Validación
-        if mp_total == 0 or mod_total == 0 or gif_total == 0:
-            st.warning("⚠️ Completa las pestañas anteriores para ver el costo de producción")
-        else:
-            costo_total_prod = mp_total + mod_total + gif_total
-            costo_unitario = costo_total_prod / unidades_prod if unidades_prod > 0 else 0
-            
-            st.session_state['costo_produccion_total'] = costo_total_prod
-            st.session_state['costo_unitario'] = costo_unitario
-            
-            # Tabla resumen
-            df_costo = pd.DataFrame({
-                'Concepto': ['Materia Prima Directa', 'Mano de Obra Directa', 
-                            'Gastos Indirectos de Fabricación', 'COSTO TOTAL DE PRODUCCIÓN'],
-                'Importe': [mp_total, mod_total, gif_total, costo_total_prod]
-            })
-            
-            st.dataframe(df_costo.style.format({'Importe': '${:,.2f}'}).apply(
-                lambda x: ['background-color: #e8f8f5; font-weight: bold' if x.name == len(df_costo)-1 else '' for i in x], axis=1
-            ), hide_index=True, use_container_width=True)
-            
-            st.markdown("---")
-            st.markdown("### Resultados:")
-            
-            col1, col2, col3 = st.columns(3)
-            col1.markdown(f"<div class='metric-card metric-success'><h3>${costo_total_prod:,.2f}</h3><p>Costo Total de Producción</p></div>", unsafe_allow_html=True)
-            col2.markdown(f"<div class='metric-card'><h3>{unidades_prod:,}</h3><p>Unidades Producidas</p></div>", unsafe_allow_html=True)
-            col3.markdown(f"<div class='metric-card metric-success'><h3>${costo_unitario:,.2f}</h3><p>Costo Unitario</p></div>", unsafe_allow_html=True)
-
-    # ==================== TAB 7: COSTO DE VENTAS (CONTINUACIÓN) ====================
-    with tabs[6]:
-        st.subheader("🛒 Presupuesto de Costo de Ventas")
-        
-        st.markdown(f"<div class='warning-box'>⚙️ <b>Método de valuación: {st.session_state['metodo_valuacion']}</b></div>", unsafe_allow_html=True)
-        
-        # Inputs
-        col1, col2 = st.columns(2)
-        inv_inicial_pt = col1.number_input("Inventario Inicial PT (unidades)", 
-                                          value=st.session_state.get('prod_inv_inicial_pt', 5000), 
-                                          key="cv_ii")
-        precio_inv_inicial_pt = col2.number_input("Costo Unit. Inv. Inicial PT", value=250.0, key="cv_precio_ii",
-                                                  help="Costo unitario del inventario inicial de producto terminado")
-        
-        # Datos de producción
-        unidades_producidas = st.session_state.get('prod_unidades', 64000)
-        costo_unit_prod = st.session_state.get('costo_unitario', 279.27)
-        unidades_vendidas = st.session_state.get('ventas_unidades', 63000)
-        inv_final_pt = st.session_state.get('prod_inv_final_pt', 6000)
-        
-        # Validación
-        if costo_unit_prod == 0:
-            st.warning("⚠️ Completa la pestaña de Costo de Producción primero")
-        else:
-            # Calcular disponible
-            total_disponible = inv_inicial_pt + unidades_producidas
-            valor_inv_inicial = inv_inicial_pt * precio_inv_inicial_pt
-            valor_produccion = unidades_producidas * costo_unit_prod
-            valor_total_disponible = valor_inv_inicial + valor_produccion
-            
-            # Calcular según método de valuación
-            if st.session_state['metodo_valuacion'] == 'UEPS':
-                # Primero sale lo último que entró (producción)
-                if unidades_vendidas <= unidades_producidas:
-                    costo_ventas = unidades_vendidas * costo_unit_prod
-                    # Inv final es del inicial
-                    valor_inv_final = inv_final_pt * precio_inv_inicial_pt
-                else:
-                    # Se vende toda la producción y parte del inicial
-                    costo_ventas = (unidades_producidas * costo_unit_prod) + ((unidades_vendidas - unidades_producidas) * precio_inv_inicial_pt)
-                    valor_inv_final = inv_final_pt * precio_inv_inicial_pt
-                    
-            elif st.session_state['metodo_valuacion'] == 'PEPS':
-                # Primero sale lo primero (inicial)
-                if unidades_vendidas <= inv_inicial_pt:
-                    costo_ventas = unidades_vendidas * precio_inv_inicial_pt
-                    # Inv final viene de producción
-                    valor_inv_final = inv_final_pt * costo_unit_prod
-                else:
-                    # Se vende todo el inicial y parte de producción
-                    costo_ventas = (inv_inicial_pt * precio_inv_inicial_pt) + ((unidades_vendidas - inv_inicial_pt) * costo_unit_prod)
-                    valor_inv_final = inv_final_pt * costo_unit_prod
-                    
-            else:  # Promedio Ponderado
-                costo_promedio = valor_total_disponible / total_disponible
-                costo_ventas = unidades_vendidas * costo_promedio
-                valor_inv_final = inv_final_pt * costo_promedio
-            
-            st.session_state['costo_ventas'] = costo_ventas
-            st.session_state['valor_inv_final_pt'] = valor_inv_final
-            
-            # Mostrar tabla de valuación
-            st.markdown("### Valuación de Producto Terminado:")
-            
-            df_valuacion_pt = pd.DataFrame({
-                'Concepto': ['Inventario Inicial', 'Producción del Período', 'Total Disponible', 
-                            'Inventario Final', 'COSTO DE VENTAS'],
-                'Unidades': [inv_inicial_pt, unidades_producidas, total_disponible, 
-                            inv_final_pt, unidades_vendidas],
-                'Costo Unitario': [precio_inv_inicial_pt, costo_unit_prod, '-', 
-                                  '-', '-'],
-                'Importe': [valor_inv_inicial, valor_produccion, valor_total_disponible, 
-                           valor_inv_final, costo_ventas]
-            })
-            
-            st.dataframe(df_valuacion_pt.style.format({
-                'Unidades': '{:,.0f}',
-                'Costo Unitario': lambda x: '${:,.2f}'.format(x) if isinstance(x, (int, float)) else x,
-                'Importe': '${:,.2f}'
-            }).apply(
-                lambda x: ['background-color: #e8f8f5; font-weight: bold' if x.name == len(df_valuacion_pt)-1 else '' for i in x], axis=1
-            ), hide_index=True, use_container_width=True)
-            
-            st.markdown("---")
-            
-            # Desglose según método
-            st.markdown("### Composición del Costo de Ventas:")
-            
-            if st.session_state['metodo_valuacion'] == 'UEPS':
-                if unidades_vendidas <= unidades_producidas:
-                    st.markdown(f"""
-                    <div class='info-box'>
-                        <b>Aplicando UEPS (Últimas Entradas, Primeras Salidas):</b><br>
-                        • Se vendieron {unidades_vendidas:,} unidades<br>
-                        • Todas provienen de la producción actual<br>
-                        • {unidades_vendidas:,} unidades × ${costo_unit_prod:,.2f} = <b>${costo_ventas:,.2f}</b>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    unidades_del_inicial = unidades_vendidas - unidades_producidas
-                    st.markdown(f"""
-                    <div class='info-box'>
-                        <b>Aplicando UEPS (Últimas Entradas, Primeras Salidas):</b><br>
-                        • Toda la producción: {unidades_producidas:,} × ${costo_unit_prod:,.2f} = ${unidades_producidas * costo_unit_prod:,.2f}<br>
-                        • Del inventario inicial: {unidades_del_inicial:,} × ${precio_inv_inicial_pt:,.2f} = ${unidades_del_inicial * precio_inv_inicial_pt:,.2f}<br>
-                        • <b>Total Costo de Ventas: ${costo_ventas:,.2f}</b>
-                    </div>
-                    """, unsafe_allow_html=True)
-            
-            elif st.session_state['metodo_valuacion'] == 'PEPS':
-                if unidades_vendidas <= inv_inicial_pt:
-                    st.markdown(f"""
-                    <div class='info-box'>
-                        <b>Aplicando PEPS (Primeras Entradas, Primeras Salidas):</b><br>
-                        • Se vendieron {unidades_vendidas:,} unidades<br>
-                        • Todas provienen del inventario inicial<br>
-                        • {unidades_vendidas:,} unidades × ${precio_inv_inicial_pt:,.2f} = <b>${costo_ventas:,.2f}</b>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    unidades_de_produccion = unidades_vendidas - inv_inicial_pt
-                    st.markdown(f"""
-                    <div class='info-box'>
-                        <b>Aplicando PEPS (Primeras Entradas, Primeras Salidas):</b><br>
-                        • Todo el inv. inicial: {inv_inicial_pt:,} × ${precio_inv_inicial_pt:,.2f} = ${inv_inicial_pt * precio_inv_inicial_pt:,.2f}<br>
-                        • De la producción: {unidades_de_produccion:,} × ${costo_unit_prod:,.2f} = ${unidades_de_produccion * costo_unit_prod:,.2f}<br>
-                        • <b>Total Costo de Ventas: ${costo_ventas:,.2f}</b>
-                    </div>
-                    """, unsafe_allow_html=True)
-            
-            else:  # Promedio
-                costo_prom = valor_total_disponible / total_disponible
-                st.markdown(f"""
-                <div class='info-box'>
-                    <b>Aplicando Promedio Ponderado:</b><br>
-                    • Costo Promedio = ${valor_total_disponible:,.2f} ÷ {total_disponible:,} = ${costo_prom:,.2f}<br>
-                    • Costo de Ventas = {unidades_vendidas:,} × ${costo_prom:,.2f} = <b>${costo_ventas:,.2f}</b>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Métricas finales
-            col1, col2, col3 = st.columns(3)
-            col1.markdown(f"<div class='metric-card metric-danger'><h3>${costo_ventas:,.2f}</h3><p>Costo de Ventas</p></div>", unsafe_allow_html=True)
-            col2.markdown(f"<div class='metric-card'><h3>{unidades_vendidas:,}</h3><p>Unidades Vendidas</p></div>", unsafe_allow_html=True)
-            col3.markdown(f"<div class='metric-card'><h3>${valor_inv_final:,.2f}</h3><p>Valor Inv. Final PT</p></div>", unsafe_allow_html=True)
-
-    # ==================== TAB 8: ESTADO DE RESULTADOS ====================
-    with tabs[7]:
-        st.subheader("📊 Estado de Resultados Presupuestado")
-        
-        st.markdown("<div class='info-box'>💡 <b>Estado Financiero que muestra la utilidad o pérdida del período</b></div>", unsafe_allow_html=True)
-        
-        # Sección de Gastos de Operación
-        with st.expander("💼 Gastos de Operación", expanded=True):
-            st.markdown("#### Ingrese los Gastos de Operación:")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                comisiones = st.number_input("Comisiones a Vendedores", value=2750000.0, key="go_comisiones",
-                                            help="Comisiones pagadas al equipo de ventas")
-                sueldos = st.number_input("Sueldos Administrativos", value=1820000.0, key="go_sueldos",
-                                         help="Sueldos del personal administrativo")
-                publicidad = st.number_input("Publicidad", value=670000.0, key="go_publicidad",
-                                            help="Gastos de marketing y publicidad")
-            
-            with col2:
-                servicios = st.number_input("Servicios", value=580000.0, key="go_servicios",
-                                           help="Servicios profesionales, legales, contables, etc.")
-                diversos = st.number_input("Gastos Diversos", value=1200000.0, key="go_diversos",
-                                          help="Otros gastos operativos")
-            
-            total_gastos_op = comisiones + sueldos + publicidad + servicios + diversos
-            st.session_state['gastos_operacion'] = total_gastos_op
-            
-            # Tabla de gastos
-            df_gastos = pd.DataFrame({
-                'Concepto': ['Comisiones a Vendedores', 'Sueldos', 'Publicidad', 
-                            'Servicios', 'Diversos', 'TOTAL GASTOS DE OPERACIÓN'],
-                'Importe': [comisiones, sueldos, publicidad, servicios, diversos, total_gastos_op]
-            })
-            
-            st.dataframe(df_gastos.style.format({'Importe': '${:,.2f}'}).apply(
-                lambda x: ['background-color: #fef5e7; font-weight: bold' if x.name == len(df_gastos)-1 else '' for i in x], axis=1
-            ), hide_index=True, use_container_width=True)
-        
-        st.markdown("---")
-        
-        # Recuperar todos los datos necesarios
-        ingresos = st.session_state.get('ventas_ingresos', 0)
-        costo_ventas = st.session_state.get('costo_ventas', 0)
-        gastos_op = st.session_state.get('gastos_operacion', 0)
-        
-        # Validación
-        if ingresos == 0 or costo_ventas == 0:
-            st.warning("⚠️ Completa todas las pestañas anteriores para ver el Estado de Resultados completo")
-        else:
-            # Cálculos
-            utilidad_bruta = ingresos - costo_ventas
-            utilidad_operativa = utilidad_bruta - gastos_op
-            
-            # Guardar en sesión
-            st.session_state['utilidad_bruta'] = utilidad_bruta
-            st.session_state['utilidad_operativa'] = utilidad_operativa
-            
-            # Estado de Resultados
-            st.markdown("### Estado de Resultados Presupuestado:")
-            
-            df_edo_resultados = pd.DataFrame({
-                'Concepto': [
-                    'VENTAS',
-                    '(-) COSTO DE VENTAS',
-                    '(=) UTILIDAD BRUTA',
-                    '(-) GASTOS DE OPERACIÓN',
-                    '(=) UTILIDAD OPERATIVA'
-                ],
-                'Importe': [
-                    ingresos,
-                    costo_ventas,
-                    utilidad_bruta,
-                    gastos_op,
-                    utilidad_operativa
-                ]
-            })
-            
-            # Aplicar estilos
-            def aplicar_estilo(row):
-                if row.name == 0:  # Ventas
-                    return ['background-color: #e8f8f5; font-weight: bold'] * len(row)
-                elif row.name == 2:  # Utilidad Bruta
-                    return ['background-color: #e8f4f8; font-weight: bold'] * len(row)
-                elif row.name == 4:  # Utilidad Operativa
-                    return ['background-color: #d5f4e6; font-weight: bold; font-size: 16px'] * len(row)
-                else:
-                    return [''] * len(row)
-            
-            st.dataframe(df_edo_resultados.style.format({
-                'Importe': '${:,.2f}'
-            }).apply(aplicar_estilo, axis=1), hide_index=True, use_container_width=True)
-            
-            st.markdown("---")
-            
-            # Métricas clave
-            st.markdown("### 📈 Indicadores Clave:")
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            margen_bruto = (utilidad_bruta / ingresos * 100) if ingresos > 0 else 0
-            margen_operativo = (utilidad_operativa / ingresos * 100) if ingresos > 0 else 0
-            
-            col1.markdown(f"<div class='metric-card metric-success'><h3>${ingresos:,.2f}</h3><p>Ventas Totales</p></div>", unsafe_allow_html=True)
-            col2.markdown(f"<div class='metric-card metric-warning'><h3>${utilidad_bruta:,.2f}</h3><p>Utilidad Bruta</p></div>", unsafe_allow_html=True)
-            col3.markdown(f"<div class='metric-card metric-success'><h3>${utilidad_operativa:,.2f}</h3><p>Utilidad Operativa</p></div>", unsafe_allow_html=True)
-            col4.markdown(f"<div class='metric-card'><h3>{margen_operativo:.2f}%</h3><p>Margen Operativo</p></div>", unsafe_allow_html=True)
-            
-            st.markdown("---")
-            
-            # Análisis adicional
-            st.markdown("### 💡 Análisis de Márgenes:")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown(f"""
-                <div class='success-box'>
-                    <b>Margen Bruto:</b> {margen_bruto:.2f}%<br>
-                    <small>Por cada $100 de ventas, $  {margen_bruto:.2f} quedan después de cubrir el costo de ventas</small>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown(f"""
-                <div class='success-box'>
-                    <b>Margen Operativo:</b> {margen_operativo:.2f}%<br>
-                    <small>Por cada $100 de ventas, ${margen_operativo:.2f} quedan como utilidad operativa</small>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Botón de descarga
-            st.markdown("---")
-            
-            # Crear resumen completo para descarga
-            resumen_completo = f"""
-ESTADO DE RESULTADOS PRESUPUESTADO
-COMPAÑÍA XZ, S.A.
-{'='*60}
-
-VENTAS                           ${ingresos:>20,.2f}
-(-) COSTO DE VENTAS              ${costo_ventas:>20,.2f}
-                                 {'-'*30}
-(=) UTILIDAD BRUTA               ${utilidad_bruta:>20,.2f}
-
-(-) GASTOS DE OPERACIÓN:
-    Comisiones                   ${comisiones:>20,.2f}
-    Sueldos                      ${sueldos:>20,.2f}
-    Publicidad                   ${publicidad:>20,.2f}
-    Servicios                    ${servicios:>20,.2f}
-    Diversos                     ${diversos:>20,.2f}
-                                 {'-'*30}
-    Total Gastos de Operación    ${gastos_op:>20,.2f}
-
-(=) UTILIDAD OPERATIVA           ${utilidad_operativa:>20,.2f}
-
-{'='*60}
-INDICADORES:
-Margen Bruto:       {margen_bruto:>6.2f}%
-Margen Operativo:   {margen_operativo:>6.2f}%
-            """
-            
-            st.download_button(
-                label="📥 Descargar Estado de Resultados",
-                data=resumen_completo,
-                file_name="estado_resultados_presupuestado.txt",
-                mime="text/plain"
-            )
-
-# ==============================================================================
-#        MÓDULO 2: ANÁLISIS FINANCIERO (RAZONES)
-# ==============================================================================
-elif modulo == "2. Análisis Financiero (Razones)":
-    st.header("📊 Análisis de Razones Financieras")
-    st.info("🚧 Módulo en desarrollo - Próximamente disponible")
-    
-    st.markdown("""
-    Este módulo incluirá:
-    - Razones de Liquidez
-    - Razones de Rentabilidad
-    - Razones de Endeudamiento
-    - Razones de Actividad
-    """)
-
-# ==============================================================================
-#        MÓDULO 3: EVALUACIÓN DE INVERSIÓN
-# ==============================================================================
-elif modulo == "3. Evaluación de Inversión":
-    st.header("💼 Evaluación de Proyectos de Inversión")
-    st.info("🚧 Módulo en desarrollo - Próximamente disponible")
-    
-    st.markdown("""
-    Este módulo incluirá:
-    - Valor Presente Neto (VPN)
-    - Tasa Interna de Retorno (TIR)
-    - Período de Recuperación
-    - Índice de Rentabilidad
-
-    """)
-
-
-
-
+import streamlit as st
+import pandas as pd
+import hmac
+import io
+import math
+import os
+from datetime import datetime
+from pathlib import Path
+import altair as alt
+import numpy as np
+
+from presupuesto import METODOS_VALUACION, EntradasPresupuesto, Material
+from presupuesto.multiproducto import (
+    COLUMNAS_MATERIAL,
+    COLUMNAS_PRODUCTO,
+    cargar_catalogo,
+    catalogo_desde_entradas,
+    presupuesto_multiproducto,
+)
+from presupuesto.cache import CACHE_DISCO, CACHE_PRESUPUESTOS, persistente, presupuesto_compartido
+from presupuesto.escenarios import METRICAS_ESCENARIO, ORDENES, AlmacenEscenarios
+from presupuesto.grafo import GrafoPresupuesto
+from presupuesto.montecarlo import TIPOS_DISTRIBUCION, Distribucion, simular
+from presupuesto.movimientos import (
+    COLUMNAS_KARDEX,
+    DIRECTORIO_HISTORIALES,
+    TIPOS_MOVIMIENTO,
+    HistorialKardex,
+    construir_historial,
+    guardar_movimientos,
+)
+from presupuesto.objetivo import buscar_objetivo, punto_equilibrio
+from presupuesto.periodos import presupuesto_mensual
+from presupuesto.rendimiento import (
+    Cronometro,
+    contar_renglones,
+    detener_captura,
+    marcar_cache,
+    iniciar_captura,
+    perfil_en_bytes,
+    resumen_perfil,
+)
+from presupuesto.reportes import (
+    FORMATOS_REPORTE,
+    cedula_costo_produccion,
+    cedula_costo_ventas,
+    cedula_estado_resultados,
+    cedula_gastos,
+    cedula_gif,
+    cedula_produccion,
+    generar_reporte,
+)
+from presupuesto.sensibilidad import analisis_sensibilidad, tabla_dos_vias, tornado
+from presupuesto.variaciones import variaciones_gif, variaciones_materiales, variaciones_mod
+
+# --- CONFIGURACIÓN GLOBAL ---
+st.set_page_config(page_title="Sistema de Gestión Financiera", layout="wide")
+
+# --- PERFILADOR (SÓLO ADMINISTRADORES) ---
+# Con PRESUPUESTO_CLAVE_ADMIN definida, abrir la aplicación con ?admin=<clave>
+# muestra en la barra lateral el botón que perfila el siguiente rerun con cProfile
+CLAVE_ADMIN = os.environ.get('PRESUPUESTO_CLAVE_ADMIN', '')
+
+
+def es_admin():
+    return bool(CLAVE_ADMIN) and hmac.compare_digest(st.query_params.get('admin', ''), CLAVE_ADMIN)
+
+
+def armar_perfil():
+    st.session_state['perfil_armado'] = True
+    st.session_state.pop('perfil_pospuesto', None)
+
+
+def iniciar_perfil(en_curso=None):
+    # Un perfil que quedó activo porque su rerun se interrumpió (st.rerun) se
+    # detiene y se guarda; `en_curso` es el del rerun completo que sigue ejecutándose
+    anterior = st.session_state.get('perfil_activo')
+    if anterior is not None and anterior is not en_curso:
+        terminar_perfil(anterior, "un rerun interrumpido")
+    # El rerun que provoca el propio botón no se perfila: se espera a la siguiente interacción
+    if not st.session_state.get('perfil_armado') or st.session_state.get('perfil_armar'):
+        return None
+    perfil = iniciar_captura()
+    if perfil is None:
+        # Queda armado para la siguiente interacción; el aviso se da una vez
+        if not st.session_state.get('perfil_pospuesto'):
+            st.session_state['perfil_pospuesto'] = True
+            st.toast("🔬 Hay una captura en curso en otra sesión; se perfilará la siguiente interacción.")
+        return None
+    del st.session_state['perfil_armado']
+    st.session_state.pop('perfil_pospuesto', None)
+    st.session_state['perfil_activo'] = perfil
+    return perfil
+
+
+def terminar_perfil(perfil, alcance):
+    detener_captura(perfil)
+    st.session_state.pop('perfil_activo', None)
+    st.session_state['perfil'] = {
+        'alcance': alcance,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'resumen': resumen_perfil(perfil),
+        'archivo': perfil_en_bytes(perfil),
+    }
+
+
+PERFIL = iniciar_perfil()
+
+# Tiempos de este rerun: estilos, estado y, aparte, el fragmento de la etapa
+CRONOMETRO = Cronometro('pagina')
+
+# --- ESTILOS CSS PREMIUM EQUILIBRADO ---
+# --- ESTILOS CSS MEJORADOS ---
+ESTILOS = """
+    <style>
+    /* Importar fuente moderna */
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+    
+    /* Configuración global */
+    .main { 
+        background: linear-gradient(135deg, #f5f7fa 0%, #e8eef5 100%);
+        font-family: 'Inter', 'Segoe UI', sans-serif;
+    }
+    
+    /* Títulos principales */
+    h1 { 
+        font-family: 'Inter', sans-serif;
+        color: #1a202c;
+        font-size: 2.5rem;
+        font-weight: 700;
+        border-bottom: 3px solid #3b82f6;
+        padding-bottom: 20px;
+        margin-bottom: 30px;
+        text-shadow: 0 2px 4px rgba(0,0,0,0.05);
+    }
+    
+    h2 { 
+        font-family: 'Inter', sans-serif;
+        color: #2d3748;
+        font-size: 1.8rem;
+        font-weight: 600;
+        margin-top: 25px;
+        margin-bottom: 15px;
+    }
+    
+    h3 { 
+        font-family: 'Inter', sans-serif;
+        color: #4a5568;
+        font-size: 1.3rem;
+        font-weight: 600;
+        margin-top: 20px;
+    }
+    
+    h4 {
+        font-family: 'Inter', sans-serif;
+        color: #4a5568;
+        font-size: 1.1rem;
+        font-weight: 600;
+    }
+    
+    /* Tarjetas métricas mejoradas */
+    .metric-card {
+        background: linear-gradient(135deg, #ffffff 0%, #f8fafc 100%);
+        border: none;
+        border-radius: 12px;
+        padding: 25px;
+        box-shadow: 0 4px 6px rgba(0,0,0,0.07), 0 1px 3px rgba(0,0,0,0.06);
+        text-align: center;
+        margin-bottom: 20px;
+        transition: all 0.3s ease;
+        position: relative;
+        overflow: hidden;
+    }
+    
+    .metric-card::before {
+        content: '';
+        position: absolute;
+        top: 0;
+        left: 0;
+        right: 0;
+        height: 4px;
+        background: linear-gradient(90deg, #3b82f6, #8b5cf6);
+    }
+    
+    .metric-card:hover {
+        transform: translateY(-5px);
+        box-shadow: 0 12px 24px rgba(0,0,0,0.1), 0 4px 8px rgba(0,0,0,0.06);
+    }
+    
+    .metric-card h3 { 
+        color: #1a202c;
+        font-size: 28px;
+        margin: 10px 0;
+        font-weight: 700;
+    }
+    
+    .metric-card p { 
+        color: #64748b;
+        font-size: 13px;
+        margin-top: 8px;
+        text-transform: uppercase;
+        letter-spacing: 1px;
+        font-weight: 500;
+    }
+    
+    /* Variantes de tarjetas */
+    .metric-success::before {
+        background: linear-gradient(90deg, #10b981, #059669);
+    }
+    
+    .metric-success h3 {
+        color: #059669;
+    }
+    
+    .metric-warning::before {
+        background: linear-gradient(90deg, #f59e0b, #d97706);
+    }
+    
+    .metric-warning h3 {
+        color: #d97706;
+    }
+    
+    .metric-danger::before {
+        background: linear-gradient(90deg, #ef4444, #dc2626);
+    }
+    
+    .metric-danger h3 {
+        color: #dc2626;
+    }
+    
+    /* Botones mejorados */
+    .stButton>button {
+        background: linear-gradient(135deg, #3b82f6 0%, #2563eb 100%);
+        color: white;
+        border-radius: 8px;
+        border: none;
+        height: 3em;
+        font-weight: 600;
+        width: 100%;
+        transition: all 0.3s ease;
+        box-shadow: 0 4px 6px rgba(59, 130, 246, 0.3);
+        font-family: 'Inter', sans-serif;
+        font-size: 15px;
+        letter-spacing: 0.5px;
+    }
+    
+    .stButton>button:hover { 
+        background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%);
+        box-shadow: 0 6px 12px rgba(59, 130, 246, 0.4);
+        transform: translateY(-2px);
+    }
+    
+    .stButton>button:active {
+        transform: translateY(0);
+    }
+    
+    /* DataFrames mejorados */
+    .stDataFrame { 
+        border: 1px solid #e2e8f0;
+        border-radius: 12px;
+        overflow: hidden;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.04);
+    }
+    
+    .stDataFrame [data-testid="stDataFrameResizable"] {
+        border-radius: 12px;
+    }
+    
+    /* Cajas de información mejoradas */
+    .info-box {
+        background: linear-gradient(135deg, #dbeafe 0%, #bfdbfe 100%);
+        border-left: 5px solid #3b82f6;
+        padding: 20px;
+        margin: 15px 0;
+        border-radius: 8px;
+        box-shadow: 0 2px 4px rgba(59, 130, 246, 0.1);
+        font-family: 'Inter', sans-serif;
+    }
+    
+    .info-box b {
+        color: #1e40af;
+        font-weight: 600;
+    }
+    
+    .warning-box {
+        background: linear-gradient(135deg, #fef3c7 0%, #fde68a 100%);
+        border-left: 5px solid #f59e0b;
+        padding: 20px;
+        margin: 15px 0;
+        border-radius: 8px;
+        box-shadow: 0 2px 4px rgba(245, 158, 11, 0.1);
+        font-family: 'Inter', sans-serif;
+    }
+    
+    .warning-box b {
+        color: #d97706;
+        font-weight: 600;
+    }
+    
+    .success-box {
+        background: linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%);
+        border-left: 5px solid #10b981;
+        padding: 20px;
+        margin: 15px 0;
+        border-radius: 8px;
+        box-shadow: 0 2px 4px rgba(16, 185, 129, 0.1);
+        font-family: 'Inter', sans-serif;
+    }
+    
+    .success-box b {
+        color: #059669;
+        font-weight: 600;
+    }
+    
+    /* Sidebar mejorado */
+    [data-testid="stSidebar"] {
+        background: linear-gradient(180deg, #1e293b 0%, #0f172a 100%);
+    }
+    
+    [data-testid="stSidebar"] .stRadio label {
+        color: #e2e8f0 !important;
+        font-weight: 500;
+        padding: 12px 16px;
+        border-radius: 8px;
+        transition: all 0.2s ease;
+    }
+    
+    [data-testid="stSidebar"] .stRadio label:hover {
+        background-color: rgba(59, 130, 246, 0.1);
+        color: #93c5fd !important;
+    }
+    
+    [data-testid="stSidebar"] h2 {
+        color: #f1f5f9 !important;
+        font-weight: 600;
+        font-size: 1.2rem;
+    }
+    
+    [data-testid="stSidebar"] .stMarkdown {
+        color: #cbd5e1;
+    }
+    
+    /* Tabs mejorados */
+    .stTabs [data-baseweb="tab-list"] {
+        gap: 8px;
+        background-color: transparent;
+    }
+    
+    .stTabs [data-baseweb="tab"] {
+        height: 50px;
+        background-color: white;
+        border-radius: 8px 8px 0 0;
+        color: #64748b;
+        font-weight: 500;
+        border: 1px solid #e2e8f0;
+        border-bottom: none;
+        padding: 0 24px;
+        transition: all 0.2s ease;
+    }
+    
+    .stTabs [data-baseweb="tab"]:hover {
+        background-color: #f8fafc;
+        color: #3b82f6;
+    }
+    
+    .stTabs [aria-selected="true"] {
+        background: linear-gradient(180deg, #ffffff 0%, #f8fafc 100%);
+        color: #3b82f6 !important;
+        border-color: #3b82f6;
+        font-weight: 600;
+    }
+    
+    /* Inputs mejorados */
+    .stNumberInput input, .stTextInput input {
+        border-radius: 8px;
+        border: 2px solid #e2e8f0;
+        padding: 10px;
+        font-family: 'Inter', sans-serif;
+        transition: all 0.2s ease;
+    }
+    
+    .stNumberInput input:focus, .stTextInput input:focus {
+        border-color: #3b82f6;
+        box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.1);
+    }
+    
+    /* Expander mejorado */
+    .streamlit-expanderHeader {
+        background-color: white;
+        border-radius: 8px;
+        border: 1px solid #e2e8f0;
+        font-weight: 600;
+        color: #1a202c;
+        padding: 16px;
+        font-family: 'Inter', sans-serif;
+    }
+    
+    .streamlit-expanderHeader:hover {
+        background-color: #f8fafc;
+        border-color: #3b82f6;
+    }
+    
+    /* Radio buttons mejorados */
+    .stRadio > label {
+        font-weight: 600;
+        color: #1a202c;
+        font-family: 'Inter', sans-serif;
+    }
+    
+    /* Animaciones */
+    @keyframes fadeIn {
+        from { opacity: 0; transform: translateY(10px); }
+        to { opacity: 1; transform: translateY(0); }
+    }
+    
+    .metric-card, .info-box, .warning-box, .success-box {
+        animation: fadeIn 0.5s ease;
+    }
+    
+    /* Scrollbar personalizada */
+    ::-webkit-scrollbar {
+        width: 10px;
+        height: 10px;
+    }
+    
+    ::-webkit-scrollbar-track {
+        background: #f1f5f9;
+    }
+    
+    ::-webkit-scrollbar-thumb {
+        background: linear-gradient(180deg, #3b82f6, #2563eb);
+        border-radius: 5px;
+    }
+    
+    ::-webkit-scrollbar-thumb:hover {
+        background: linear-gradient(180deg, #2563eb, #1d4ed8);
+    }
+    </style>
+"""
+
+with CRONOMETRO.medir('estilos'):
+    st.markdown(ESTILOS, unsafe_allow_html=True)
+    st.title("Sistema Integral de Presupuestos y Finanzas - 6NM62")
+
+# Valores por omisión de los widgets y relación clave de widget -> campo del motor
+ENTRADAS_BASE = EntradasPresupuesto()
+WIDGETS_ENTRADAS = {
+    'pv_uni': 'unidades',
+    'pv_precio': 'precio',
+    'pp_if': 'inv_final_pt',
+    'pp_ii': 'inv_inicial_pt',
+    'pm_std_a': 'std_mat_a',
+    'pm_std_b': 'std_mat_b',
+    'pm_ii_a': 'ii_mat_a',
+    'pm_precio_ii_a': 'precio_ii_a',
+    'pm_if_a': 'if_mat_a',
+    'pm_costo_a': 'costo_mat_a',
+    'pm_ii_b': 'ii_mat_b',
+    'pm_precio_ii_b': 'precio_ii_b',
+    'pm_if_b': 'if_mat_b',
+    'pm_costo_b': 'costo_mat_b',
+    'mod_hrs': 'hrs_unit',
+    'mod_costo': 'cuota_hr',
+    'gif_mat': 'mat_indirecto',
+    'gif_moi': 'moi',
+    'gif_renta': 'renta',
+    'gif_energia': 'energia',
+    'gif_mant': 'mantenimiento',
+    'gif_varios': 'varios',
+    'cv_precio_ii': 'precio_inv_inicial_pt',
+    'go_comisiones': 'comisiones',
+    'go_sueldos': 'sueldos',
+    'go_publicidad': 'publicidad',
+    'go_servicios': 'servicios',
+    'go_diversos': 'diversos',
+}
+
+# Etapas del módulo 1, en orden de la cadena del presupuesto
+ETAPAS = [
+    "1️⃣ Ventas",
+    "2️⃣ Producción",
+    "3️⃣ Materiales",
+    "4️⃣ Mano de Obra",
+    "5️⃣ GIF",
+    "6️⃣ Costo Producción",
+    "7️⃣ Costo de Ventas",
+    "8️⃣ Estado de Resultados",
+    "9️⃣ Multiproducto",
+    "🔟 Mensual",
+    "🎲 Riesgo",
+    "🌪️ Sensibilidad",
+    "🧮 Tabla de Datos",
+    "🎯 Equilibrio y Metas",
+    "💾 Escenarios",
+    "📉 Variaciones",
+    "📒 Kardex",
+]
+
+# Reportes de la pestaña 8 (formato, etiqueta del botón)
+DESCARGAS = {
+    'txt': "📥 Estado de Resultados (TXT)",
+    'xlsx': "📊 Cédulas (Excel)",
+    'pdf': "📄 Cédulas (PDF)",
+    'parquet': "🗃️ Cédulas (Parquet)",
+}
+
+MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+# Materiales con captura propia en la pestaña 3 (sufijo de la key, nombre)
+MATERIALES_UI = (('a', 'Material A'), ('b', 'Material B'))
+COLUMNAS_MATERIALES_ADICIONALES = {
+    'Material': 'nombre',
+    'Piezas por Unidad': 'por_unidad',
+    'Inv. Inicial': 'inv_inicial',
+    'Precio Inv. Inicial': 'precio_inicial',
+    'Inv. Final Deseado': 'inv_final',
+    'Precio de Compra': 'precio_compra',
+}
+
+# Etiquetas de los campos del motor para tablas y gráficas de análisis
+ETIQUETAS_ENTRADAS = {
+    'unidades': 'Unidades Vendidas',
+    'precio': 'Precio de Venta',
+    'inv_final_pt': 'Inv. Final PT',
+    'inv_inicial_pt': 'Inv. Inicial PT',
+    'std_mat_a': 'Piezas Material A por Unidad',
+    'std_mat_b': 'Piezas Material B por Unidad',
+    'ii_mat_a': 'Inv. Inicial Material A',
+    'precio_ii_a': 'Precio Inv. Inicial Material A',
+    'if_mat_a': 'Inv. Final Material A',
+    'costo_mat_a': 'Costo Material A',
+    'ii_mat_b': 'Inv. Inicial Material B',
+    'precio_ii_b': 'Precio Inv. Inicial Material B',
+    'if_mat_b': 'Inv. Final Material B',
+    'costo_mat_b': 'Costo Material B',
+    'hrs_unit': 'Horas MOD por Unidad',
+    'cuota_hr': 'Cuota por Hora MOD',
+    'mat_indirecto': 'GIF Material Indirecto',
+    'moi': 'GIF Mano de Obra Indirecta',
+    'renta': 'GIF Renta',
+    'energia': 'GIF Energía',
+    'mantenimiento': 'GIF Mantenimiento',
+    'varios': 'GIF Varios',
+    'precio_inv_inicial_pt': 'Costo Unit. Inv. Inicial PT',
+    'comisiones': 'Comisiones',
+    'sueldos': 'Sueldos Administrativos',
+    'publicidad': 'Publicidad',
+    'servicios': 'Servicios',
+    'diversos': 'Gastos Diversos',
+}
+
+# Entradas inciertas de la simulación de riesgo y su variación por omisión
+VARIABLES_RIESGO = {
+    'unidades': 0.10,
+    'precio': 0.05,
+    'costo_mat_a': 0.10,
+    'costo_mat_b': 0.10,
+    'cuota_hr': 0.05,
+    'mat_indirecto': 0.05,
+    'moi': 0.05,
+    'renta': 0.0,
+    'energia': 0.10,
+    'mantenimiento': 0.10,
+    'varios': 0.10,
+}
+
+# Valores iniciales de los widgets con key. Se cargan una vez en session_state
+# y se vuelven a asignar en cada rerun para que conserven su valor aunque la
+# etapa que los dibuja no se ejecute; por eso los widgets no llevan value=.
+ESTADO_INICIAL = {
+    **{clave: getattr(ENTRADAS_BASE, campo) for clave, campo in WIDGETS_ENTRADAS.items()},
+    'etapa': ETAPAS[0],
+    'pm_periodos': 12,
+    'mc_sorteos': 100_000,
+    'mc_semilla': 2024,
+    'sens_niveles': [5, 10, 20],
+    'sens_metrica': 'utilidad_operativa',
+    'td_campo_x': 'precio',
+    'td_campo_y': 'unidades',
+    'td_variacion': 30,
+    'td_puntos': 101,
+    'td_metrica': 'utilidad_operativa',
+    'obj_campo': 'precio',
+    'obj_metrica': 'margen_operativo',
+    'obj_meta': 20.0,
+    'esc_nombre': '',
+    'esc_metodo': 'UEPS',
+    'esc_seleccion': [],
+    'esc_orden': 'creado',
+    'var_produccion': None,
+    'kx_articulo': 'Todos',
+    'kx_tipo': 'Todos',
+    'kx_orden': 'secuencia',
+    'kx_desc': False,
+    'kx_filas': 100,
+    'kx_pagina': 1,
+}
+
+
+def conservar_estado():
+    for clave, valor in ESTADO_INICIAL.items():
+        st.session_state[clave] = st.session_state.get(clave, valor)
+
+
+def editor_persistente(nombre, tabla_inicial, **opciones):
+    # st.data_editor no acepta valores por session_state: la tabla vive en
+    # session_state[nombre] y el editor se versiona para no aplicar dos veces
+    # las mismas ediciones
+    if nombre not in st.session_state:
+        st.session_state[nombre] = tabla_inicial
+    version = st.session_state.get(f'{nombre}_version', 0)
+    editados = st.data_editor(st.session_state[nombre], key=f'{nombre}_{version}', **opciones)
+    if not editados.equals(st.session_state[nombre]):
+        st.session_state[nombre] = editados
+        st.session_state[f'{nombre}_version'] = version + 1
+        st.rerun()
+    return editados
+
+
+def tabla_materiales_adicionales():
+    if 'materiales_adicionales' not in st.session_state:
+        st.session_state['materiales_adicionales'] = pd.DataFrame(
+            {col: pd.Series(dtype=str if campo == 'nombre' else float)
+             for col, campo in COLUMNAS_MATERIALES_ADICIONALES.items()}
+        )
+    return st.session_state['materiales_adicionales']
+
+
+def materiales_adicionales():
+    tabla = tabla_materiales_adicionales().rename(columns=COLUMNAS_MATERIALES_ADICIONALES)
+    tabla = tabla[tabla['nombre'].fillna('').str.strip() != '']
+    numericos = [c for c in COLUMNAS_MATERIALES_ADICIONALES.values() if c != 'nombre']
+    tabla[numericos] = tabla[numericos].fillna(0.0)
+    return tuple(Material(**fila) for fila in tabla.to_dict('records'))
+
+
+def entradas_desde_sesion(metodo):
+    # Los widgets con key ya tienen su valor en session_state al iniciar el rerun
+    valores = {campo: st.session_state[clave] for clave, campo in WIDGETS_ENTRADAS.items()
+               if clave in st.session_state}
+    return EntradasPresupuesto(metodo_valuacion=metodo, materiales_adicionales=materiales_adicionales(), **valores)
+
+
+@st.cache_data(show_spinner=False)
+def leer_catalogo(productos_csv, materiales_csv, componentes_csv):
+    # Se cachea por contenido de los archivos: sólo se vuelve a leer si cambian
+    marcar_cache('fallo')
+    return cargar_catalogo(pd.read_csv(io.BytesIO(productos_csv)),
+                           pd.read_csv(io.BytesIO(materiales_csv)),
+                           pd.read_csv(io.BytesIO(componentes_csv)))
+
+
+# Los cálculos pesados pasan primero por la caché de Streamlit (memoria) y
+# luego por la caché en disco, que sobrevive a reinicios del servidor
+
+@st.cache_data(show_spinner="Simulando...", max_entries=8)
+@persistente
+def simular_riesgo(entradas, supuestos, n, semilla):
+    # Sólo se guarda el resumen; los sorteos completos no pasan por la caché
+    distribuciones = {campo: Distribucion.relativa(tipo, getattr(entradas, campo), variacion / 100)
+                      for campo, tipo, variacion in supuestos if variacion > 0}
+    mc = simular(distribuciones, n, semilla, base=entradas)
+    conteos, bordes = mc.histograma(bins=60)
+    return {
+        'percentiles': pd.DataFrame(mc.percentiles()).rename_axis('Percentil'),
+        'prob_perdida': mc.prob_perdida,
+        'media': float(mc.utilidad_operativa.mean()),
+        'histograma': pd.DataFrame({'Sorteos': conteos},
+                                   index=pd.Index((bordes[:-1] + bordes[1:]) / 2, name='Utilidad Operativa')),
+    }
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def sensibilidad(entradas, niveles):
+    # La llave de la caché es el vector completo de entradas más los niveles
+    marcar_cache('fallo')
+    return analisis_sensibilidad(entradas, tuple(WIDGETS_ENTRADAS.values()), niveles)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+@persistente
+def tabla_de_datos(entradas, campo_x, campo_y, variacion, puntos):
+    # Se calculan ambas métricas en la malla completa; cambiar de métrica o de
+    # acercamiento sólo recorta lo que ya está en caché
+    pasos = 1 + np.linspace(-variacion, variacion, puntos)
+    return tabla_dos_vias(campo_x, getattr(entradas, campo_x) * pasos,
+                          campo_y, getattr(entradas, campo_y) * pasos, entradas)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+@persistente
+def presupuesto_catalogo(entradas, catalogo):
+    # `catalogo` son los bytes de los CSV cargados o None para el producto único
+    productos, bom = leer_catalogo(*catalogo) if catalogo else catalogo_desde_entradas(entradas)
+    return presupuesto_multiproducto(productos, bom, entradas)
+
+
+def catalogo_actual(entradas):
+    # Catálogo cargado en la etapa Multiproducto o, si no hay, el producto único
+    if 'catalogo_mp' in st.session_state:
+        return leer_catalogo(*st.session_state['catalogo_mp'])
+    return catalogo_desde_entradas(entradas)
+
+
+# Movimientos reales de la etapa Variaciones: tipo -> (etiqueta, columnas esperadas)
+MOVIMIENTOS_REALES = {
+    'materiales': ("Salidas de materiales", "material, cantidad, importe"),
+    'mod': ("Horas de MOD", "horas, importe"),
+    'gif': ("Pólizas de GIF", "concepto, importe"),
+}
+
+
+@st.cache_data(show_spinner="Calculando variaciones...", max_entries=16)
+def calcular_variaciones(tipo, nombre, contenido, entradas, produccion_real):
+    # Los movimientos se recorren por bloques aunque el archivo venga de la carga
+    marcar_cache('fallo')
+    archivo = io.BytesIO(contenido)
+    archivo.name = nombre
+    if tipo == 'materiales':
+        return variaciones_materiales(archivo, entradas, produccion_real)
+    if tipo == 'mod':
+        return variaciones_mod(archivo, entradas, produccion_real)
+    return variaciones_gif(archivo, entradas)
+
+
+@st.cache_resource(max_entries=4)
+def historial_kardex(fuente, metodo):
+    # Se valúa una vez por archivo y método; todas las sesiones comparten el memory map
+    destino = DIRECTORIO_HISTORIALES / f"{Path(fuente).stem}.{METODOS_VALUACION.index(metodo)}.arrow"
+    if destino.exists():
+        marcar_cache('disco')
+    else:
+        marcar_cache('fallo')
+        construir_historial(fuente, destino, metodo)
+    return HistorialKardex(destino)
+
+
+@st.cache_resource
+def almacen_escenarios():
+    # Un solo almacén por proceso; cada operación abre su propia conexión
+    return AlmacenEscenarios()
+
+
+def cargar_escenario(nombre):
+    # Se usa como on_click: los widgets aún no existen en este rerun y sí
+    # pueden recibir los valores guardados
+    entradas = almacen_escenarios().cargar(nombre)
+    for clave, campo in WIDGETS_ENTRADAS.items():
+        st.session_state[clave] = type(ESTADO_INICIAL[clave])(getattr(entradas, campo))
+    st.session_state['materiales_adicionales'] = pd.DataFrame(
+        [{col: getattr(m, campo) for col, campo in COLUMNAS_MATERIALES_ADICIONALES.items()}
+         for m in entradas.materiales_adicionales],
+        columns=list(COLUMNAS_MATERIALES_ADICIONALES),
+    ).astype({col: str if campo == 'nombre' else float for col, campo in COLUMNAS_MATERIALES_ADICIONALES.items()})
+    st.session_state['materiales_adicionales_version'] = st.session_state.get('materiales_adicionales_version', 0) + 1
+
+
+def borrar_escenario(nombre):
+    almacen_escenarios().borrar(nombre)
+    st.session_state['esc_seleccion'] = [n for n in st.session_state['esc_seleccion'] if n != nombre]
+
+
+def mostrar_tabla(tabla, formatos, totales=()):
+    # Cédulas Concepto/Importe: el formato va en column_config y la tabla viaja
+    # por Arrow sin Styler; los renglones de total se marcan en el Concepto
+    if totales:
+        tabla = tabla.assign(Concepto=[f"▶ {c}" if i in totales else c for i, c in enumerate(tabla['Concepto'])])
+    mostrar_dataframe(tabla, hide_index=True, use_container_width=True,
+                      column_config={col: st.column_config.NumberColumn(format=fmt) for col, fmt in formatos.items()})
+
+
+def mostrar_dataframe(datos, **opciones):
+    # st.dataframe que suma los renglones mostrados a la sección que se está midiendo
+    contar_renglones(len(datos))
+    return st.dataframe(datos, **opciones)
+
+
+def columnas_en_rejilla(n, por_fila=2):
+    # Reparte n elementos en renglones de `por_fila` columnas
+    for inicio in range(0, n, por_fila):
+        yield from st.columns(por_fila)[:n - inicio]
+
+
+with CRONOMETRO.medir('estado'):
+    conservar_estado()
+
+# --- MENÚ LATERAL ---
+st.sidebar.header("Navegación")
+modulo = st.sidebar.radio("Seleccione Módulo:", [
+    "Inicio",
+    "1. Presupuestos Operativos",
+])
+st.sidebar.markdown("---")
+st.sidebar.info("Versión Profesional 3.0 - Completo")
+ver_rendimiento = st.sidebar.toggle("⏱️ Rendimiento", key="rendimiento",
+                                    help="Tiempo de cada sección del último rerun y renglones de tabla mostrados")
+panel_rendimiento = st.sidebar.container()
+if es_admin():
+    st.sidebar.button("🔬 Perfilar el siguiente rerun", key="perfil_armar", on_click=armar_perfil,
+                      help="La siguiente interacción se ejecuta con cProfile; el resultado aparece aquí")
+panel_perfil = st.sidebar.container()
+
+# ==============================================================================
+#        MÓDULO 0: INICIO
+# ==============================================================================
+if modulo == "Inicio":
+    st.markdown("#### Panel de Control Principal")
+    st.write("Bienvenido al sistema. Seleccione una opción del menú lateral para proceder.")
+    
+    c1, c2, c3 = st.columns(3)
+    c1.markdown("<div class='metric-card'><h3>Módulo 1</h3><p>Presupuestos Maestros</p></div>", unsafe_allow_html=True)
+
+# ==============================================================================
+#        MÓDULO 1: PRESUPUESTOS OPERATIVOS 
+# ==============================================================================
+elif modulo == "1. Presupuestos Operativos":
+    st.header("🎯 Generador de Presupuestos Maestros")
+    
+    # Inicializar variables de sesión si no existen
+    if 'datos_inicializados' not in st.session_state:
+        st.session_state['datos_inicializados'] = True
+        st.session_state['metodo_valuacion'] = 'UEPS'
+    
+    # Selector de método de valuación
+    with st.expander("⚙️ Configuración del Sistema", expanded=False):
+        st.session_state['metodo_valuacion'] = st.radio(
+            "Método de Valuación de Inventarios:",
+            list(METODOS_VALUACION),
+            horizontal=True
+        )
+        st.info(f"📌 Método seleccionado: **{st.session_state['metodo_valuacion']}** - Este método se aplicará a todos los cálculos de inventarios.")
+    
+    # Sólo se ejecuta la etapa visible; las demás no construyen tablas ni reportes
+    etapa = st.radio("Etapa del presupuesto", ETAPAS, horizontal=True, key="etapa",
+                     label_visibility="collapsed")
+    
+    @st.fragment
+    def mostrar_etapa(etapa):
+        # Un cambio en los widgets de la etapa sólo vuelve a ejecutar este
+        # fragmento, no el CSS, el menú ni el encabezado; por eso se mide aparte
+        # Si sólo se vuelve a ejecutar el fragmento, aquí empieza el rerun perfilado
+        perfil = iniciar_perfil(en_curso=PERFIL)
+        crono = Cronometro('etapa')
+        try:
+            with crono.medir('etapa', etapa=etapa):
+                dibujar_etapa(etapa, crono)
+        finally:
+            # También cuando la etapa pide un rerun: la captura y los tiempos no se pierden
+            if perfil:
+                terminar_perfil(perfil, f"la etapa {etapa}")
+            st.session_state['rendimiento_etapa'] = crono.secciones
+            crono.registrar(etapa=etapa, metodo=st.session_state['metodo_valuacion'])
+        if perfil:
+            # La barra lateral sólo se dibuja en un rerun completo
+            st.rerun()
+        if st.session_state.get('rendimiento'):
+            total = next(s for s in crono.secciones if s['seccion'] == 'etapa')
+            calculos = [s for s in crono.secciones if s['seccion'].startswith('calculo')]
+            calculo_ms = sum(s['ms'] for s in calculos)
+            caches = ", ".join(f"{s['seccion'].partition('/')[2] or 'presupuesto'} {s['cache']}"
+                               for s in calculos if 'cache' in s)
+            st.caption(
+                f"⏱️ Etapa en {total['ms']:,.1f} ms: cálculo {calculo_ms:,.1f} ms "
+                f"(caché: {caches}), render {total['ms'] - calculo_ms:,.1f} ms, "
+                f"{total['renglones']:,} renglones de tabla"
+            )
+
+    def dibujar_etapa(etapa, crono):
+        # Las cifras salen del grafo de la sesión: sólo se recalcula lo que
+        # cambió y sólo se propaga a las cifras siguientes cuando un valor
+        # realmente cambia. Antes se consulta la caché del proceso, compartida
+        # con las demás sesiones.
+        with crono.medir('calculo') as calculo:
+            entradas = entradas_desde_sesion(st.session_state['metodo_valuacion'])
+            if 'grafo_presupuesto' not in st.session_state:
+                st.session_state['grafo_presupuesto'] = GrafoPresupuesto()
+            grafo = st.session_state['grafo_presupuesto']
+            calculado = []
+            res = presupuesto_compartido(entradas, lambda: calculado.append(True) or grafo.actualizar(entradas))
+            desde_cache = not calculado
+            calculo['cache'] = 'acierto' if desde_cache else 'fallo'
+        cifras = 0 if desde_cache else len(grafo.recalculados)
+        with st.expander(f"🔁 Recálculo incremental: {cifras} de {len(grafo.orden)} cifras", expanded=False):
+            if desde_cache:
+                st.caption("Presupuesto tomado de la caché compartida; no se recalculó ninguna cifra.")
+            elif grafo.recalculados:
+                st.caption("Recalculadas en esta interacción: " + " → ".join(grafo.recalculados))
+            else:
+                st.caption("Ninguna entrada cambió; se reutilizaron todas las cifras.")
+            uso = CACHE_PRESUPUESTOS.estadisticas()
+            st.caption(
+                f"Caché compartida: {uso['aciertos']:,} aciertos, {uso['fallos']:,} fallos "
+                f"({uso['tasa_aciertos']:.0%}), {uso['entradas']:,} presupuestos, "
+                f"{uso['bytes'] / 1024 ** 2:.1f} de {uso['max_bytes'] / 1024 ** 2:.0f} MB, "
+                f"{uso['desalojos']:,} desalojos"
+            )
+            disco = CACHE_DISCO.estadisticas()
+            st.caption(
+                f"Caché en disco ({CACHE_DISCO.directorio}): {disco['aciertos']:,} aciertos, "
+                f"{disco['fallos']:,} fallos, {disco['entradas']:,} resultados, "
+                f"{disco['bytes'] / 1024 ** 2:.1f} de {disco['max_bytes'] / 1024 ** 2:.0f} MB"
+            )
+    
+        # ==================== TAB 1: VENTAS ====================
+        if etapa == ETAPAS[0]:
+            st.subheader("📊 Presupuesto de Ventas")
+        
+            st.markdown("<div class='info-box'>💡 <b>Tip:</b> Este es el punto de partida de todo el presupuesto maestro.</div>", unsafe_allow_html=True)
+        
+            c1, c2 = st.columns(2)
+            unidades = c1.number_input("Unidades a vender", 0, 1000000, key="pv_uni", 
+                                       help="Cantidad de productos que se planea vender en el período")
+            precio = c2.number_input("Precio Unitario ($)", 0.0, 100000.0, key="pv_precio",
+                                     help="Precio de venta por unidad")
+        
+            st.markdown("---")
+            st.markdown("### Resultado:")
+            col1, col2, col3 = st.columns(3)
+            col1.markdown(f"<div class='metric-card metric-success'><h3>{unidades:,}</h3><p>Unidades</p></div>", unsafe_allow_html=True)
+            col2.markdown(f"<div class='metric-card'><h3>${precio:,.2f}</h3><p>Precio Unitario</p></div>", unsafe_allow_html=True)
+            col3.markdown(f"<div class='metric-card metric-success'><h3>${res.ingresos:,.2f}</h3><p>Ingresos Totales</p></div>", unsafe_allow_html=True)
+
+        # ==================== TAB 2: PRODUCCIÓN ====================
+        elif etapa == ETAPAS[1]:
+            st.subheader("🏭 Presupuesto de Producción")
+        
+            st.markdown("<div class='info-box'>💡 <b>Fórmula:</b> Unidades a Producir = Ventas + Inv. Final - Inv. Inicial</div>", unsafe_allow_html=True)
+        
+            col1, col2, col3 = st.columns(3)
+            v_est = col1.number_input("Ventas Estimadas", value=entradas.unidades, disabled=True,
+                                      help="Se toma del presupuesto de ventas")
+            if_des = col2.number_input("Inventario Final Deseado", step=1, key="pp_if",
+                                       help="Inventario que queremos tener al final del período")
+            ii_est = col3.number_input("Inventario Inicial", step=1, key="pp_ii",
+                                       help="Inventario con el que iniciamos el período")
+        
+            prod_req = res.prod_unidades
+        
+            st.markdown("---")
+            st.markdown("### Cálculo:")
+        
+            mostrar_tabla(cedula_produccion(res), {'Unidades': 'localized'})
+        
+            st.markdown(f"<div class='metric-card metric-success'><h3>{prod_req:,}</h3><p>Unidades a Producir</p></div>", unsafe_allow_html=True)
+
+        # ==================== TAB 3: MATERIALES (CON VALUACIÓN) ====================
+        elif etapa == ETAPAS[2]:
+            st.subheader("📦 Presupuesto de Requerimientos y Compras de Materiales")
+        
+            cedula_mp = res.materiales
+        
+            st.markdown("### Paso 1: Requerimientos de Materia Prima")
+            st.markdown("<div class='info-box'>💡 Calcula cuánta materia prima necesitas para la producción planeada</div>", unsafe_allow_html=True)
+        
+            st.number_input("Producción Requerida", value=res.prod_unidades, disabled=True,
+                            help="Se toma del presupuesto de producción")
+        
+            for col, (clave, nombre) in zip(st.columns(len(MATERIALES_UI)), MATERIALES_UI):
+                with col:
+                    st.markdown(f"#### 🔹 {nombre}")
+                    st.number_input(f"Piezas de {nombre} por Unidad", key=f"pm_std_{clave}", help=f"Cuántas piezas de {nombre} necesita cada producto")
+        
+            with st.expander("➕ Materiales adicionales", expanded=False):
+                st.caption("Agregue un renglón por material directo adicional de la lista de materiales.")
+                editor_persistente('materiales_adicionales', tabla_materiales_adicionales(), num_rows="dynamic",
+                                   hide_index=True, use_container_width=True)
+        
+            for col, (nombre, mat) in zip(columnas_en_rejilla(len(cedula_mp)), cedula_mp.iterrows()):
+                col.metric(f"Requerimiento Total {nombre}", f"{mat['requerimiento']:,.0f} piezas")
+        
+            st.markdown("---")
+            st.markdown("### Paso 2: Presupuesto de Compras")
+        
+            for col, (clave, nombre) in zip(st.columns(len(MATERIALES_UI)), MATERIALES_UI):
+                with col:
+                    st.markdown(f"#### 🔹 {nombre}")
+                    st.number_input("Inventario Inicial (piezas)", key=f"pm_ii_{clave}")
+                    st.number_input("Precio Unit. Inv. Inicial ($)", key=f"pm_precio_ii_{clave}")
+                    st.number_input("Inventario Final Deseado (piezas)", key=f"pm_if_{clave}")
+                    st.number_input("Precio de Compra Actual ($)", key=f"pm_costo_{clave}")
+        
+            for col, (nombre, mat) in zip(columnas_en_rejilla(len(cedula_mp)), cedula_mp.iterrows()):
+                col.markdown(f"""
+            <div class='success-box'>
+                <b>📋 Resumen {nombre}:</b><br>
+                • Necesario para producción: {mat['requerimiento']:,.0f}<br>
+                • (+) Inv. Final: {mat['inv_final_deseado']:,.0f}<br>
+                • (-) Inv. Inicial: {mat['inv_inicial']:,.0f}<br>
+                • = <b>A Comprar: {mat['compras']:,.0f} piezas</b><br>
+                • <b>Costo: ${mat['costo_compras']:,.2f}</b>
+            </div>
+            """, unsafe_allow_html=True)
+        
+            st.markdown("---")
+            st.markdown("### Paso 3: Valuación de Inventarios")
+            st.markdown(f"<div class='warning-box'>⚙️ <b>Método aplicado: {st.session_state['metodo_valuacion']}</b></div>", unsafe_allow_html=True)
+        
+            # Mostrar resultados
+            for col, (nombre, mat) in zip(columnas_en_rejilla(len(cedula_mp)), cedula_mp.iterrows()):
+                with col:
+                    st.markdown(f"#### 🔹 {nombre}")
+                    st.markdown(f"""
+                <div class='metric-card'>
+                    <h3>${mat['costo_consumo']:,.2f}</h3>
+                    <p>Costo MP {nombre.replace('Material ', '')} en Producción</p>
+                </div>
+                """, unsafe_allow_html=True)
+                    st.info(f"Inventario Final: {mat['inv_final_cant']:,.0f} piezas = ${mat['costo_inv_final']:,.2f}")
+        
+            st.markdown(f"""
+        <div class='metric-card metric-success'>
+            <h3>${res.mp_total:,.2f}</h3>
+            <p>Costo Total de Materia Prima en Producción</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # ==================== TAB 4: MANO DE OBRA ====================
+        elif etapa == ETAPAS[3]:
+            st.subheader("👷 Presupuesto de Mano de Obra Directa (MOD)")
+        
+            st.markdown("<div class='info-box'>💡 <b>Fórmula:</b> Costo MOD = Unidades × Horas/Unidad × Tarifa/Hora</div>", unsafe_allow_html=True)
+        
+            c1, c2, c3 = st.columns(3)
+            c1.number_input("Producción Requerida", value=res.prod_unidades, disabled=True)
+            c2.number_input("Horas por Unidad", key="mod_hrs",
+                            help="Horas de trabajo requeridas para producir una unidad")
+            cuota_hr = c3.number_input("Tarifa por Hora ($)", key="mod_costo",
+                                       help="Salario por hora del trabajador directo")
+        
+            st.markdown("---")
+            st.markdown("### Resultado:")
+        
+            col1, col2, col3 = st.columns(3)
+            col1.markdown(f"<div class='metric-card'><h3>{res.total_horas:,.0f}</h3><p>Total de Horas</p></div>", unsafe_allow_html=True)
+            col2.markdown(f"<div class='metric-card'><h3>${cuota_hr:,.2f}</h3><p>Tarifa por Hora</p></div>", unsafe_allow_html=True)
+            col3.markdown(f"<div class='metric-card metric-success'><h3>${res.costo_mod:,.2f}</h3><p>Costo Total MOD</p></div>", unsafe_allow_html=True)
+
+        # ==================== TAB 5: GASTOS INDIRECTOS DE FABRICACIÓN ====================
+        elif etapa == ETAPAS[4]:
+            st.subheader("🏭 Presupuesto de Gastos Indirectos de Fabricación (GIF)")
+        
+            st.markdown("<div class='info-box'>💡 Los GIF incluyen todos los costos de fabricación que no son materia prima directa ni mano de obra directa</div>", unsafe_allow_html=True)
+        
+            col1, col2 = st.columns(2)
+        
+            with col1:
+                mat_indirecto = st.number_input("Material Indirecto", key="gif_mat",
+                                               help="Materiales auxiliares, lubricantes, suministros, etc.")
+                moi = st.number_input("Mano de Obra Indirecta", key="gif_moi",
+                                     help="Supervisores, almacenistas, control de calidad, etc.")
+                renta = st.number_input("Renta de Planta", key="gif_renta",
+                                       help="Arrendamiento o depreciación de instalaciones")
+        
+            with col2:
+                energia = st.number_input("Energía Eléctrica", key="gif_energia",
+                                         help="Luz, gas, agua de la planta")
+                mantenimiento = st.number_input("Mantenimiento", key="gif_mant",
+                                               help="Reparaciones y mantenimiento preventivo")
+                varios = st.number_input("Gastos Varios", key="gif_varios",
+                                        help="Seguros, impuestos prediales, otros gastos")
+        
+            total_gif = res.total_gif
+        
+            st.markdown("---")
+            st.markdown("### Resumen de GIF:")
+        
+            df_gif = cedula_gif(res)
+            mostrar_tabla(df_gif, {'Importe': 'dollar'}, totales=(len(df_gif) - 1,))
+        
+            st.markdown(f"<div class='metric-card metric-success'><h3>${total_gif:,.2f}</h3><p>Total Gastos Indirectos de Fabricación</p></div>", unsafe_allow_html=True)
+
+        # ==================== TAB 6: COSTO DE PRODUCCIÓN ====================
+        elif etapa == ETAPAS[5]:
+            st.subheader("💰 Cédula de Costo de Producción")
+        
+            st.markdown("<div class='info-box'>💡 <b>Costo de Producción = Materia Prima + MOD + GIF</b></div>", unsafe_allow_html=True)
+        
+            mp_total = res.mp_total
+            mod_total = res.costo_mod
+            gif_total = res.total_gif
+            unidades_prod = res.prod_unidades
+        
+            # Validación
+            if mp_total == 0 or mod_total == 0 or gif_total == 0:
+                st.warning("⚠️ Completa las pestañas anteriores para ver el costo de producción")
+            else:
+                costo_total_prod = res.costo_produccion_total
+                costo_unitario = res.costo_unitario
+            
+                # Tabla resumen
+                df_costo = cedula_costo_produccion(res)
+                mostrar_tabla(df_costo, {'Importe': 'dollar'}, totales=(len(df_costo) - 1,))
+            
+                st.markdown("---")
+                st.markdown("### Resultados:")
+            
+                col1, col2, col3 = st.columns(3)
+                col1.markdown(f"<div class='metric-card metric-success'><h3>${costo_total_prod:,.2f}</h3><p>Costo Total de Producción</p></div>", unsafe_allow_html=True)
+                col2.markdown(f"<div class='metric-card'><h3>{unidades_prod:,}</h3><p>Unidades Producidas</p></div>", unsafe_allow_html=True)
+                col3.markdown(f"<div class='metric-card metric-success'><h3>${costo_unitario:,.2f}</h3><p>Costo Unitario</p></div>", unsafe_allow_html=True)
+
+        # ==================== TAB 7: COSTO DE VENTAS (CONTINUACIÓN) ====================
+        elif etapa == ETAPAS[6]:
+            st.subheader("🛒 Presupuesto de Costo de Ventas")
+        
+            st.markdown(f"<div class='warning-box'>⚙️ <b>Método de valuación: {st.session_state['metodo_valuacion']}</b></div>", unsafe_allow_html=True)
+        
+            # Inputs
+            col1, col2 = st.columns(2)
+            col1.number_input("Inventario Inicial PT (unidades)", value=entradas.inv_inicial_pt, disabled=True,
+                              help="Se toma del presupuesto de producción")
+            col2.number_input("Costo Unit. Inv. Inicial PT", key="cv_precio_ii",
+                              help="Costo unitario del inventario inicial de producto terminado")
+        
+            inv_inicial_pt = entradas.inv_inicial_pt
+            precio_inv_inicial_pt = entradas.precio_inv_inicial_pt
+            unidades_producidas = res.prod_unidades
+            costo_unit_prod = res.costo_unitario
+            unidades_vendidas = entradas.unidades
+            inv_final_pt = entradas.inv_final_pt
+        
+            # Validación
+            if costo_unit_prod == 0:
+                st.warning("⚠️ Completa la pestaña de Costo de Producción primero")
+            else:
+                total_disponible = res.total_disponible_pt
+                valor_total_disponible = res.valor_total_disponible
+                costo_ventas = res.costo_ventas
+                valor_inv_final = res.valor_inv_final_pt
+            
+                # Mostrar tabla de valuación
+                st.markdown("### Valuación de Producto Terminado:")
+            
+                df_valuacion_pt = cedula_costo_ventas(res)
+                mostrar_tabla(df_valuacion_pt, {'Unidades': 'localized', 'Costo Unitario': 'dollar', 'Importe': 'dollar'},
+                              totales=(len(df_valuacion_pt) - 1,))
+            
+                st.markdown("---")
+            
+                # Desglose según método
+                st.markdown("### Composición del Costo de Ventas:")
+            
+                if st.session_state['metodo_valuacion'] == 'UEPS':
+                    if unidades_vendidas <= unidades_producidas:
+                        st.markdown(f"""
+                    <div class='info-box'>
+                        <b>Aplicando UEPS (Últimas Entradas, Primeras Salidas):</b><br>
+                        • Se vendieron {unidades_vendidas:,} unidades<br>
+                        • Todas provienen de la producción actual<br>
+                        • {unidades_vendidas:,} unidades × ${costo_unit_prod:,.2f} = <b>${costo_ventas:,.2f}</b>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    else:
+                        unidades_del_inicial = unidades_vendidas - unidades_producidas
+                        st.markdown(f"""
+                    <div class='info-box'>
+                        <b>Aplicando UEPS (Últimas Entradas, Primeras Salidas):</b><br>
+                        • Toda la producción: {unidades_producidas:,} × ${costo_unit_prod:,.2f} = ${unidades_producidas * costo_unit_prod:,.2f}<br>
+                        • Del inventario inicial: {unidades_del_inicial:,} × ${precio_inv_inicial_pt:,.2f} = ${unidades_del_inicial * precio_inv_inicial_pt:,.2f}<br>
+                        • <b>Total Costo de Ventas: ${costo_ventas:,.2f}</b>
+                    </div>
+                    """, unsafe_allow_html=True)
+            
+                elif st.session_state['metodo_valuacion'] == 'PEPS':
+                    if unidades_vendidas <= inv_inicial_pt:
+                        st.markdown(f"""
+                    <div class='info-box'>
+                        <b>Aplicando PEPS (Primeras Entradas, Primeras Salidas):</b><br>
+                        • Se vendieron {unidades_vendidas:,} unidades<br>
+                        • Todas provienen del inventario inicial<br>
+                        • {unidades_vendidas:,} unidades × ${precio_inv_inicial_pt:,.2f} = <b>${costo_ventas:,.2f}</b>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    else:
+                        unidades_de_produccion = unidades_vendidas - inv_inicial_pt
+                        st.markdown(f"""
+                    <div class='info-box'>
+                        <b>Aplicando PEPS (Primeras Entradas, Primeras Salidas):</b><br>
+                        • Todo el inv. inicial: {inv_inicial_pt:,} × ${precio_inv_inicial_pt:,.2f} = ${inv_inicial_pt * precio_inv_inicial_pt:,.2f}<br>
+                        • De la producción: {unidades_de_produccion:,} × ${costo_unit_prod:,.2f} = ${unidades_de_produccion * costo_unit_prod:,.2f}<br>
+                        • <b>Total Costo de Ventas: ${costo_ventas:,.2f}</b>
+                    </div>
+                    """, unsafe_allow_html=True)
+            
+                else:  # Promedio
+                    costo_prom = valor_total_disponible / total_disponible
+                    st.markdown(f"""
+                <div class='info-box'>
+                    <b>Aplicando Promedio Ponderado:</b><br>
+                    • Costo Promedio = ${valor_total_disponible:,.2f} ÷ {total_disponible:,} = ${costo_prom:,.2f}<br>
+                    • Costo de Ventas = {unidades_vendidas:,} × ${costo_prom:,.2f} = <b>${costo_ventas:,.2f}</b>
+                </div>
+                """, unsafe_allow_html=True)
+            
+                # Métricas finales
+                col1, col2, col3 = st.columns(3)
+                col1.markdown(f"<div class='metric-card metric-danger'><h3>${costo_ventas:,.2f}</h3><p>Costo de Ventas</p></div>", unsafe_allow_html=True)
+                col2.markdown(f"<div class='metric-card'><h3>{unidades_vendidas:,}</h3><p>Unidades Vendidas</p></div>", unsafe_allow_html=True)
+                col3.markdown(f"<div class='metric-card'><h3>${valor_inv_final:,.2f}</h3><p>Valor Inv. Final PT</p></div>", unsafe_allow_html=True)
+
+        # ==================== TAB 8: ESTADO DE RESULTADOS ====================
+        elif etapa == ETAPAS[7]:
+            st.subheader("📊 Estado de Resultados Presupuestado")
+        
+            st.markdown("<div class='info-box'>💡 <b>Estado Financiero que muestra la utilidad o pérdida del período</b></div>", unsafe_allow_html=True)
+        
+            # Sección de Gastos de Operación
+            with st.expander("💼 Gastos de Operación", expanded=True):
+                st.markdown("#### Ingrese los Gastos de Operación:")
+            
+                col1, col2 = st.columns(2)
+            
+                with col1:
+                    comisiones = st.number_input("Comisiones a Vendedores", key="go_comisiones",
+                                                help="Comisiones pagadas al equipo de ventas")
+                    sueldos = st.number_input("Sueldos Administrativos", key="go_sueldos",
+                                             help="Sueldos del personal administrativo")
+                    publicidad = st.number_input("Publicidad", key="go_publicidad",
+                                                help="Gastos de marketing y publicidad")
+            
+                with col2:
+                    servicios = st.number_input("Servicios", key="go_servicios",
+                                               help="Servicios profesionales, legales, contables, etc.")
+                    diversos = st.number_input("Gastos Diversos", key="go_diversos",
+                                              help="Otros gastos operativos")
+            
+                total_gastos_op = res.total_gastos_op
+            
+                # Tabla de gastos
+                df_gastos = cedula_gastos(res)
+                mostrar_tabla(df_gastos, {'Importe': 'dollar'}, totales=(len(df_gastos) - 1,))
+        
+            st.markdown("---")
+        
+            ingresos = res.ingresos
+            costo_ventas = res.costo_ventas
+            gastos_op = res.total_gastos_op
+        
+            # Validación
+            if ingresos == 0 or costo_ventas == 0:
+                st.warning("⚠️ Completa todas las pestañas anteriores para ver el Estado de Resultados completo")
+            else:
+                utilidad_bruta = res.utilidad_bruta
+                utilidad_operativa = res.utilidad_operativa
+            
+                # Estado de Resultados
+                st.markdown("### Estado de Resultados Presupuestado:")
+            
+                # Se resaltan Ventas, Utilidad Bruta y Utilidad Operativa
+                mostrar_tabla(cedula_estado_resultados(res), {'Importe': 'dollar'}, totales=(0, 2, 4))
+            
+                st.markdown("---")
+            
+                # Métricas clave
+                st.markdown("### 📈 Indicadores Clave:")
+            
+                col1, col2, col3, col4 = st.columns(4)
+            
+                margen_bruto = res.margen_bruto
+                margen_operativo = res.margen_operativo
+            
+                col1.markdown(f"<div class='metric-card metric-success'><h3>${ingresos:,.2f}</h3><p>Ventas Totales</p></div>", unsafe_allow_html=True)
+                col2.markdown(f"<div class='metric-card metric-warning'><h3>${utilidad_bruta:,.2f}</h3><p>Utilidad Bruta</p></div>", unsafe_allow_html=True)
+                col3.markdown(f"<div class='metric-card metric-success'><h3>${utilidad_operativa:,.2f}</h3><p>Utilidad Operativa</p></div>", unsafe_allow_html=True)
+                col4.markdown(f"<div class='metric-card'><h3>{margen_operativo:.2f}%</h3><p>Margen Operativo</p></div>", unsafe_allow_html=True)
+            
+                st.markdown("---")
+            
+                # Análisis adicional
+                st.markdown("### 💡 Análisis de Márgenes:")
+            
+                col1, col2 = st.columns(2)
+            
+                with col1:
+                    st.markdown(f"""
+                <div class='success-box'>
+                    <b>Margen Bruto:</b> {margen_bruto:.2f}%<br>
+                    <small>Por cada $100 de ventas, $  {margen_bruto:.2f} quedan después de cubrir el costo de ventas</small>
+                </div>
+                """, unsafe_allow_html=True)
+            
+                with col2:
+                    st.markdown(f"""
+                <div class='success-box'>
+                    <b>Margen Operativo:</b> {margen_operativo:.2f}%<br>
+                    <small>Por cada $100 de ventas, ${margen_operativo:.2f} quedan como utilidad operativa</small>
+                </div>
+                """, unsafe_allow_html=True)
+            
+                # Botones de descarga
+                st.markdown("---")
+            
+                # Los reportes se generan hasta que se descargan y se reutilizan por huella de las entradas
+                st.markdown("### 📥 Descargas:")
+                for col, (formato, etiqueta) in zip(st.columns(len(DESCARGAS)), DESCARGAS.items()):
+                    extension, mime, _ = FORMATOS_REPORTE[formato]
+                    col.download_button(
+                        label=etiqueta,
+                        data=lambda formato=formato: generar_reporte(res, formato),
+                        file_name=f"{'estado_resultados_presupuestado' if formato == 'txt' else 'presupuesto_maestro'}.{extension}",
+                        mime=mime,
+                        on_click="ignore",
+                        key=f"descarga_{formato}",
+                    )
+
+        # ==================== TAB 9: MULTIPRODUCTO ====================
+        elif etapa == ETAPAS[8]:
+            st.subheader("🗂️ Presupuesto Multiproducto")
+        
+            st.markdown("<div class='info-box'>💡 Cargue su catálogo de SKU, materiales y lista de materiales para presupuestar todos los productos en una sola pasada. Los GIF se prorratean por horas de MOD; tarifa, GIF, gastos de operación y método de valuación se toman de las pestañas anteriores.</div>", unsafe_allow_html=True)
+        
+            col1, col2, col3 = st.columns(3)
+            version = st.session_state.get('catalogo_mp_version', 0)
+            archivo_productos = col1.file_uploader("Productos (CSV)", type="csv", key=f"mp_productos_{version}",
+                                                   help="Columnas: sku, " + ", ".join(COLUMNAS_PRODUCTO) + " y opcional cuota_hr")
+            archivo_materiales = col2.file_uploader("Materiales (CSV)", type="csv", key=f"mp_materiales_{version}",
+                                                    help="Columnas: material, " + ", ".join(COLUMNAS_MATERIAL))
+            archivo_componentes = col3.file_uploader("Lista de materiales (CSV)", type="csv", key=f"mp_componentes_{version}",
+                                                     help="Columnas: material, producto, cantidad")
+        
+            if archivo_productos and archivo_materiales and archivo_componentes:
+                archivos = (archivo_productos.getvalue(), archivo_materiales.getvalue(), archivo_componentes.getvalue())
+                try:
+                    with crono.medir('calculo/catalogo', cache='acierto'):
+                        leer_catalogo(*archivos)
+                except (KeyError, ValueError) as error:
+                    st.error(f"⚠️ No se pudo leer el catálogo: {error}")
+                    return
+                # Se guarda el contenido: los archivos del widget se pierden al cambiar de etapa
+                st.session_state['catalogo_mp'] = archivos
+        
+            if 'catalogo_mp' in st.session_state:
+                if st.button("🗑️ Quitar catálogo cargado", key="mp_quitar"):
+                    del st.session_state['catalogo_mp']
+                    st.session_state['catalogo_mp_version'] = version + 1
+                    st.rerun()
+            else:
+                st.info("📌 Sin catálogo cargado: se muestra el producto único de las etapas anteriores.")
+            with crono.medir('calculo/multiproducto', cache='acierto'):
+                res_mp = presupuesto_catalogo(entradas, st.session_state.get('catalogo_mp'))
+        
+            col1, col2, col3 = st.columns(3)
+            col1.markdown(f"<div class='metric-card'><h3>{len(res_mp.productos):,}</h3><p>Productos</p></div>", unsafe_allow_html=True)
+            col2.markdown(f"<div class='metric-card'><h3>{len(res_mp.materiales):,}</h3><p>Materiales</p></div>", unsafe_allow_html=True)
+            col3.markdown(f"<div class='metric-card metric-success'><h3>${res_mp.ingresos:,.2f}</h3><p>Ingresos Totales</p></div>", unsafe_allow_html=True)
+        
+            st.markdown("### Cédula por Producto:")
+            mostrar_dataframe(res_mp.productos, use_container_width=True,
+                              column_config={c: st.column_config.NumberColumn(format="dollar")
+                                             for c in res_mp.productos.columns if c not in ('unidades', 'prod_unidades', 'total_horas')})
+        
+            with st.expander("📦 Cédula de Materiales", expanded=False):
+                mostrar_dataframe(res_mp.materiales, use_container_width=True)
+        
+            st.markdown("### Estado de Resultados Consolidado:")
+            df_edo_consolidado = pd.DataFrame({
+                'Concepto': ['VENTAS', '(-) COSTO DE VENTAS', '(=) UTILIDAD BRUTA',
+                             '(-) GASTOS DE OPERACIÓN', '(=) UTILIDAD OPERATIVA'],
+                'Importe': [res_mp.ingresos, res_mp.costo_ventas, res_mp.utilidad_bruta,
+                            res_mp.total_gastos_op, res_mp.utilidad_operativa]
+            })
+            mostrar_tabla(df_edo_consolidado, {'Importe': 'dollar'})
+        
+            col1, col2 = st.columns(2)
+            col1.markdown(f"<div class='metric-card metric-success'><h3>${res_mp.utilidad_operativa:,.2f}</h3><p>Utilidad Operativa</p></div>", unsafe_allow_html=True)
+            col2.markdown(f"<div class='metric-card'><h3>{res_mp.margen_operativo:.2f}%</h3><p>Margen Operativo</p></div>", unsafe_allow_html=True)
+
+        # ==================== TAB 10: PRESUPUESTO MENSUAL ====================
+        elif etapa == ETAPAS[9]:
+            st.subheader("📅 Presupuesto Mensual")
+        
+            st.markdown("<div class='info-box'>💡 Reparte las unidades anuales por mes según la estacionalidad. El inventario final de cada mes es el inicial del siguiente, para el producto terminado y para cada material. Usa el catálogo de la pestaña Multiproducto.</div>", unsafe_allow_html=True)
+        
+            n_periodos = st.radio("Periodos", [12, 24], horizontal=True, key="pm_periodos",
+                                  format_func=lambda n: f"{n} meses")
+            with st.expander("📈 Estacionalidad de las ventas", expanded=False):
+                st.caption("Pesos relativos por mes; se normalizan para que cada año sume las unidades anuales.")
+                estacionalidad = editor_persistente(
+                    'estacionalidad', pd.DataFrame({'Peso': [1.0] * 12}, index=pd.Index(MESES, name='Mes')),
+                    use_container_width=True,
+                )['Peso'].fillna(0.0).to_numpy()
+        
+            try:
+                with crono.medir('calculo/mensual'):
+                    productos_mp, bom_mp = catalogo_actual(entradas)
+                    res_mes = presupuesto_mensual(productos_mp, bom_mp, entradas, estacionalidad, n_periodos)
+            except ValueError as error:
+                st.error(f"⚠️ {error}")
+                return
+        
+            mensual = res_mes.por_periodo
+            col1, col2, col3 = st.columns(3)
+            col1.markdown(f"<div class='metric-card metric-success'><h3>${mensual['ingresos'].sum():,.2f}</h3><p>Ingresos del Horizonte</p></div>", unsafe_allow_html=True)
+            col2.markdown(f"<div class='metric-card metric-success'><h3>${mensual['utilidad_operativa'].sum():,.2f}</h3><p>Utilidad Operativa del Horizonte</p></div>", unsafe_allow_html=True)
+            col3.markdown(f"<div class='metric-card'><h3>${mensual['valor_inv_final_pt'].iloc[-1]:,.2f}</h3><p>Valor Inv. Final PT al Cierre</p></div>", unsafe_allow_html=True)
+        
+            st.line_chart(mensual[['ingresos', 'costo_ventas', 'utilidad_operativa']])
+            mostrar_dataframe(mensual, use_container_width=True,
+                              column_config={c: st.column_config.NumberColumn(format="dollar")
+                                             for c in mensual.columns if c not in ('ventas_unidades', 'prod_unidades', 'margen_operativo')})
+
+        # ==================== TAB 11: RIESGO (MONTE CARLO) ====================
+        elif etapa == ETAPAS[10]:
+            st.subheader("🎲 Análisis de Riesgo Monte Carlo")
+        
+            st.markdown("<div class='info-box'>💡 Cada sorteo recalcula el presupuesto completo hasta la utilidad operativa con las entradas inciertas variando alrededor de los valores capturados. Con la misma semilla cada variable conserva sus números aleatorios, así que al ajustar un supuesto los resultados se comparan sorteo por sorteo.</div>", unsafe_allow_html=True)
+        
+            col1, col2 = st.columns(2)
+            n_sorteos = col1.select_slider("Número de sorteos", [10_000, 100_000, 250_000, 500_000, 1_000_000],
+                                           key="mc_sorteos", format_func=lambda n: f"{n:,}")
+            semilla = col2.number_input("Semilla", min_value=0, step=1, key="mc_semilla")
+        
+            supuestos = editor_persistente(
+                'supuestos_riesgo',
+                pd.DataFrame({
+                    'Variable': [ETIQUETAS_ENTRADAS[campo] for campo in VARIABLES_RIESGO],
+                    'Distribución': ['normal'] * len(VARIABLES_RIESGO),
+                    'Variación %': [variacion * 100 for variacion in VARIABLES_RIESGO.values()],
+                }, index=pd.Index(list(VARIABLES_RIESGO), name='campo')),
+                use_container_width=True, hide_index=True, disabled=['Variable'],
+                column_config={
+                    'Distribución': st.column_config.SelectboxColumn(options=list(TIPOS_DISTRIBUCION), required=True),
+                    'Variación %': st.column_config.NumberColumn(
+                        min_value=0.0, max_value=100.0, format="%.1f%%",
+                        help="Normal: desviación estándar; triangular y uniforme: rango ± alrededor del valor capturado"),
+                },
+            )
+            supuestos = tuple(zip(supuestos.index, supuestos['Distribución'], supuestos['Variación %'].fillna(0.0)))
+        
+            with crono.medir('calculo/riesgo', cache='acierto'):
+                riesgo = simular_riesgo(entradas, supuestos, n_sorteos, int(semilla))
+        
+            col1, col2, col3 = st.columns(3)
+            col1.markdown(f"<div class='metric-card'><h3>${riesgo['media']:,.2f}</h3><p>Utilidad Operativa Esperada</p></div>", unsafe_allow_html=True)
+            col2.markdown(f"<div class='metric-card'><h3>${riesgo['percentiles'].loc[5, 'utilidad_operativa']:,.2f}</h3><p>Utilidad Operativa P5</p></div>", unsafe_allow_html=True)
+            clase = 'metric-success' if riesgo['prob_perdida'] < 0.05 else 'metric-warning'
+            col3.markdown(f"<div class='metric-card {clase}'><h3>{riesgo['prob_perdida']:.2%}</h3><p>Probabilidad de Pérdida</p></div>", unsafe_allow_html=True)
+        
+            st.markdown("### Distribución de la Utilidad Operativa:")
+            st.bar_chart(riesgo['histograma'])
+        
+            st.markdown("### Percentiles:")
+            mostrar_dataframe(riesgo['percentiles'].rename(index=lambda p: f"P{p}"), use_container_width=True,
+                              column_config={'utilidad_operativa': st.column_config.NumberColumn("Utilidad Operativa", format="dollar"),
+                                             'margen_operativo': st.column_config.NumberColumn("Margen Operativo", format="%.2f%%")})
+
+        # ==================== TAB 12: SENSIBILIDAD (TORNADO) ====================
+        elif etapa == ETAPAS[11]:
+            st.subheader("🌪️ Análisis de Sensibilidad")
+        
+            st.markdown("<div class='info-box'>💡 Cada entrada del presupuesto se mueve hacia arriba y hacia abajo dejando las demás fijas. Las barras muestran cuánto cambia el resultado respecto al presupuesto capturado; las entradas están ordenadas de mayor a menor impacto.</div>", unsafe_allow_html=True)
+        
+            col1, col2, col3 = st.columns(3)
+            niveles_pct = col1.multiselect("Niveles de variación (%)", [1, 5, 10, 20, 30, 50],
+                                           key="sens_niveles")
+            if not niveles_pct:
+                st.warning("⚠️ Seleccione al menos un nivel de variación.")
+                return
+            nivel_pct = col2.selectbox("Nivel mostrado", sorted(niveles_pct), key="sens_nivel",
+                                       format_func=lambda n: f"±{n}%")
+            metrica = col3.radio("Métrica", ['utilidad_operativa', 'margen_operativo'], key="sens_metrica",
+                                 format_func={'utilidad_operativa': 'Utilidad Operativa',
+                                              'margen_operativo': 'Margen Operativo'}.get)
+        
+            with crono.medir('calculo/sensibilidad', cache='acierto'):
+                tabla_sens = sensibilidad(entradas, tuple(sorted(n / 100 for n in niveles_pct)))
+            impacto = tornado(tabla_sens, nivel_pct / 100, metrica)
+            impacto = impacto[impacto['rango'] > 0].rename(index=ETIQUETAS_ENTRADAS).rename_axis('Variable')
+        
+            barras = (impacto[['baja', 'alta']]
+                      .rename(columns={'baja': f"-{nivel_pct}%", 'alta': f"+{nivel_pct}%"})
+                      .reset_index()
+                      .melt('Variable', var_name='Variación', value_name='Impacto'))
+            unidad = '$' if metrica == 'utilidad_operativa' else 'puntos de margen'
+            st.altair_chart(
+                alt.Chart(barras).mark_bar(opacity=0.85).encode(
+                    x=alt.X('Impacto:Q', stack=None, title=f"Cambio en {unidad}"),
+                    y=alt.Y('Variable:N', sort=list(impacto.index), title=None),
+                    color=alt.Color('Variación:N', scale=alt.Scale(range=['#e74c3c', '#27ae60'])),
+                    tooltip=['Variable', 'Variación', alt.Tooltip('Impacto:Q', format=',.2f')],
+                ).properties(height=max(240, 24 * len(impacto))),
+                use_container_width=True,
+            )
+        
+            st.markdown("### Ranking de Impacto:")
+            formato = "dollar" if metrica == 'utilidad_operativa' else "%.2f"
+            mostrar_dataframe(impacto, use_container_width=True,
+                              column_config={c: st.column_config.NumberColumn(format=formato) for c in impacto.columns})
+
+        # ==================== TAB 13: TABLA DE DATOS DE DOS ENTRADAS ====================
+        elif etapa == ETAPAS[12]:
+            st.subheader("🧮 Tabla de Datos de Dos Entradas")
+        
+            st.markdown("<div class='info-box'>💡 Como la tabla de datos de Excel: cruza dos entradas alrededor de sus valores capturados y calcula el presupuesto completo en cada celda, con el método de valuación seleccionado.</div>", unsafe_allow_html=True)
+        
+            campos = list(ETIQUETAS_ENTRADAS)
+            col1, col2 = st.columns(2)
+            campo_x = col1.selectbox("Entrada en columnas (eje X)", campos, key="td_campo_x",
+                                     format_func=ETIQUETAS_ENTRADAS.get)
+            campo_y = col2.selectbox("Entrada en renglones (eje Y)", campos, key="td_campo_y",
+                                     format_func=ETIQUETAS_ENTRADAS.get)
+            if campo_x == campo_y:
+                st.warning("⚠️ Seleccione dos entradas distintas.")
+                return
+            variacion_pct = col1.slider("Rango de variación (±%)", 5, 90, key="td_variacion")
+            puntos = col2.slider("Puntos por eje", 11, 500, key="td_puntos")
+        
+            with crono.medir('calculo/tabla_datos', cache='acierto'):
+                tablas = tabla_de_datos(entradas, campo_x, campo_y, variacion_pct / 100, puntos)
+        
+            col1, col2, col3 = st.columns(3)
+            metrica_td = col1.radio("Métrica", ['utilidad_operativa', 'margen_operativo'], key="td_metrica",
+                                    format_func={'utilidad_operativa': 'Utilidad Operativa',
+                                                 'margen_operativo': 'Margen Operativo'}.get)
+            zoom_x = col2.slider("Acercamiento eje X (%)", -variacion_pct, variacion_pct,
+                                 (-variacion_pct, variacion_pct), key="td_zoom_x")
+            zoom_y = col3.slider("Acercamiento eje Y (%)", -variacion_pct, variacion_pct,
+                                 (-variacion_pct, variacion_pct), key="td_zoom_y")
+        
+            tabla = tablas[metrica_td]
+            # Posición relativa de cada punto de la malla (la misma en ambos ejes)
+            relativo = np.linspace(-variacion_pct, variacion_pct, puntos)
+            visible = tabla.loc[(relativo >= zoom_y[0] - 1e-9) & (relativo <= zoom_y[1] + 1e-9),
+                                (relativo >= zoom_x[0] - 1e-9) & (relativo <= zoom_x[1] + 1e-9)]
+        
+            # El mapa de calor muestra a lo más 100 × 100 celdas; la tabla conserva todas
+            paso_y, paso_x = (max(1, math.ceil(n / 100)) for n in visible.shape)
+            celdas = (visible.iloc[::paso_y, ::paso_x]
+                      .rename_axis(index='y', columns='x').stack().rename('valor').reset_index())
+            st.altair_chart(
+                alt.Chart(celdas).mark_rect().encode(
+                    x=alt.X('x:O', title=ETIQUETAS_ENTRADAS[campo_x], axis=alt.Axis(format=',.2f', labelOverlap=True)),
+                    y=alt.Y('y:O', title=ETIQUETAS_ENTRADAS[campo_y], sort='descending',
+                            axis=alt.Axis(format=',.2f', labelOverlap=True)),
+                    color=alt.Color('valor:Q', title=None, scale=alt.Scale(scheme='redyellowgreen', domainMid=0)),
+                    tooltip=[alt.Tooltip('x:Q', title=ETIQUETAS_ENTRADAS[campo_x], format=',.2f'),
+                             alt.Tooltip('y:Q', title=ETIQUETAS_ENTRADAS[campo_y], format=',.2f'),
+                             alt.Tooltip('valor:Q', format=',.2f')],
+                ).properties(height=480),
+                use_container_width=True,
+            )
+            if paso_x > 1 or paso_y > 1:
+                st.caption(f"Mapa de calor con una de cada {paso_x} columnas y {paso_y} renglones; la tabla completa está abajo.")
+        
+            with st.expander("📋 Tabla completa", expanded=False):
+                mostrar_dataframe(visible, use_container_width=True)
+
+        # ==================== TAB 14: PUNTO DE EQUILIBRIO Y BÚSQUEDA DE OBJETIVO ====================
+        elif etapa == ETAPAS[13]:
+            st.subheader("🎯 Punto de Equilibrio y Búsqueda de Objetivo")
+        
+            st.markdown("<div class='info-box'>💡 Calcula directamente el valor de una entrada que lleva el resultado a la meta, dejando fijas las demás entradas capturadas. Se resuelve a la vez con los tres métodos de valuación.</div>", unsafe_allow_html=True)
+        
+            metodos = np.array(METODOS_VALUACION)
+            por_metodo = {'metodo_valuacion': metodos}
+            with crono.medir('calculo/equilibrio'):
+                equilibrio = pd.DataFrame({
+                    'Unidades de Equilibrio': punto_equilibrio('unidades', por_metodo, entradas),
+                    'Precio de Equilibrio': punto_equilibrio('precio', por_metodo, entradas),
+                }, index=pd.Index(metodos, name='Método'))
+        
+            actual = equilibrio.loc[entradas.metodo_valuacion]
+            col1, col2, col3 = st.columns(3)
+            col1.markdown(f"<div class='metric-card'><h3>{actual['Unidades de Equilibrio']:,.0f}</h3><p>Unidades de Equilibrio ({entradas.metodo_valuacion})</p></div>", unsafe_allow_html=True)
+            col2.markdown(f"<div class='metric-card'><h3>${actual['Precio de Equilibrio']:,.2f}</h3><p>Precio de Equilibrio ({entradas.metodo_valuacion})</p></div>", unsafe_allow_html=True)
+            holgura = 1 - actual['Unidades de Equilibrio'] / entradas.unidades if entradas.unidades else 0.0
+            col3.markdown(f"<div class='metric-card {'metric-success' if holgura > 0 else 'metric-warning'}'><h3>{holgura:.2%}</h3><p>Margen de Seguridad en Unidades</p></div>", unsafe_allow_html=True)
+            mostrar_dataframe(equilibrio, use_container_width=True,
+                              column_config={'Unidades de Equilibrio': st.column_config.NumberColumn(format="%.0f"),
+                                             'Precio de Equilibrio': st.column_config.NumberColumn(format="dollar")})
+        
+            st.markdown("### Búsqueda de Objetivo:")
+            campos = list(ETIQUETAS_ENTRADAS)
+            col1, col2, col3 = st.columns(3)
+            campo_obj = col1.selectbox("Entrada a despejar", campos, key="obj_campo",
+                                       format_func=ETIQUETAS_ENTRADAS.get)
+            metrica_obj = col2.radio("Meta sobre", ['margen_operativo', 'utilidad_operativa'], key="obj_metrica",
+                                     format_func={'utilidad_operativa': 'Utilidad Operativa ($)',
+                                                  'margen_operativo': 'Margen Operativo (%)'}.get)
+            meta = col3.number_input("Meta", key="obj_meta")
+        
+            with crono.medir('calculo/objetivo'):
+                solucion = buscar_objetivo(campo_obj, metrica_obj, meta, por_metodo, entradas)
+            mostrar_dataframe(
+                pd.DataFrame({ETIQUETAS_ENTRADAS[campo_obj]: solucion,
+                              'Valor Capturado': getattr(entradas, campo_obj),
+                              'Cambio %': (solucion / getattr(entradas, campo_obj) - 1) * 100 if getattr(entradas, campo_obj) else np.nan},
+                             index=pd.Index(metodos, name='Método')),
+                use_container_width=True,
+                column_config={'Cambio %': st.column_config.NumberColumn(format="%.2f%%")},
+            )
+            if np.isnan(solucion).any():
+                st.warning("⚠️ Con algunos métodos no existe un valor no negativo de la entrada que alcance la meta.")
+
+        # ==================== TAB 15: ESCENARIOS GUARDADOS ====================
+        elif etapa == ETAPAS[14]:
+            st.subheader("💾 Escenarios Guardados")
+        
+            st.markdown("<div class='info-box'>💡 Guarde las entradas capturadas como escenario; se almacenan junto con sus resultados con los tres métodos de valuación, así que la comparación no recalcula ningún presupuesto.</div>", unsafe_allow_html=True)
+        
+            almacen = almacen_escenarios()
+            col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
+            nombre = col1.text_input("Nombre del escenario", key="esc_nombre",
+                                     help="Si ya existe un escenario con ese nombre se reemplaza")
+            if col2.button("💾 Guardar escenario actual", key="esc_guardar", disabled=not nombre.strip(),
+                           use_container_width=True):
+                almacen.guardar(nombre, entradas)
+                st.success(f"✅ Escenario '{nombre.strip()}' guardado.")
+        
+            nombres = almacen.nombres()
+            if not nombres:
+                st.info("📌 Aún no hay escenarios guardados.")
+            else:
+                col1, col2 = st.columns(2)
+                metodo_esc = col1.selectbox("Método de valuación", list(METODOS_VALUACION), key="esc_metodo")
+                referencia = col2.selectbox("Escenario de referencia", nombres, key="esc_referencia")
+                seleccion = st.multiselect("Escenarios a comparar (vacío: todos)", nombres, key="esc_seleccion")
+        
+                comparacion = almacen.comparar(seleccion or None, metodo_esc, referencia)
+                mejor = comparacion['utilidad_operativa'].idxmax()
+                col1, col2, col3 = st.columns(3)
+                col1.markdown(f"<div class='metric-card'><h3>{len(comparacion):,}</h3><p>Escenarios Comparados</p></div>", unsafe_allow_html=True)
+                col2.markdown(f"<div class='metric-card metric-success'><h3>{mejor}</h3><p>Mayor Utilidad Operativa</p></div>", unsafe_allow_html=True)
+                col3.markdown(f"<div class='metric-card'><h3>${comparacion.loc[mejor, 'utilidad_operativa']:,.2f}</h3><p>Utilidad Operativa de {mejor}</p></div>", unsafe_allow_html=True)
+        
+                st.markdown(f"### Diferencias contra '{referencia}':")
+                st.bar_chart(comparacion['delta_utilidad_operativa'].rename('Δ Utilidad Operativa'))
+                mostrar_dataframe(
+                    comparacion, use_container_width=True,
+                    column_config={
+                        **{c: st.column_config.NumberColumn(format="%.2f%%")
+                           for c in comparacion.columns if 'margen' in c},
+                        **{c: st.column_config.NumberColumn(format="dollar")
+                           for c in comparacion.columns if c.removeprefix('delta_') in METRICAS_ESCENARIO and 'margen' not in c},
+                        'cambios': st.column_config.TextColumn("Entradas que cambian"),
+                    },
+                )
+        
+                col1, col2 = st.columns(2)
+                col1.button(f"📂 Cargar '{referencia}' en las etapas", key="esc_cargar",
+                            on_click=cargar_escenario, args=(referencia,), use_container_width=True)
+                col2.button(f"🗑️ Borrar '{referencia}'", key="esc_borrar",
+                            on_click=borrar_escenario, args=(referencia,), use_container_width=True)
+        
+                with st.expander(f"📋 Escenarios guardados ({len(nombres):,})", expanded=False):
+                    orden = st.selectbox("Ordenar por", ORDENES, key="esc_orden",
+                                         format_func=lambda c: c.replace('_', ' ').capitalize())
+                    mostrar_dataframe(almacen.listar(metodo_esc, orden, descendente=orden != 'nombre'),
+                                      use_container_width=True, hide_index=True,
+                                      column_config={
+                                          **{c: st.column_config.NumberColumn(format="%.2f%%")
+                                             for c in METRICAS_ESCENARIO if 'margen' in c},
+                                          **{c: st.column_config.NumberColumn(format="dollar")
+                                             for c in METRICAS_ESCENARIO if 'margen' not in c},
+                                      })
+
+        # ==================== TAB 16: VARIACIONES CONTRA REALES ====================
+        elif etapa == ETAPAS[15]:
+            st.subheader("📉 Variaciones: Presupuesto contra Real")
+        
+            st.markdown("<div class='info-box'>💡 Cargue los movimientos reales del periodo (CSV o Parquet). Se leen por bloques y se comparan contra los estándares capturados en las etapas anteriores. Una variación positiva es desfavorable.</div>", unsafe_allow_html=True)
+        
+            produccion_real = st.number_input("Producción real (unidades)", min_value=0.0, step=1.0, key="var_produccion",
+                                              placeholder=f"Presupuestada: {res.prod_unidades:,.0f}",
+                                              help="Unidades realmente producidas; vacío usa la producción presupuestada")
+        
+            version = st.session_state.get('variaciones_version', 0)
+            cargados = st.session_state.setdefault('variaciones_archivos', {})
+            for col, (tipo, (etiqueta, columnas)) in zip(st.columns(len(MOVIMIENTOS_REALES)), MOVIMIENTOS_REALES.items()):
+                archivo = col.file_uploader(etiqueta, type=["csv", "parquet"], key=f"var_{tipo}_{version}",
+                                            help=f"Columnas: {columnas}")
+                if archivo:
+                    # Se guarda el contenido: los archivos del widget se pierden al cambiar de etapa
+                    cargados[tipo] = (archivo.name, archivo.getvalue())
+        
+            if not cargados:
+                st.info("📌 Cargue al menos un archivo de movimientos para calcular variaciones.")
+            elif st.button("🗑️ Quitar archivos cargados", key="var_quitar"):
+                del st.session_state['variaciones_archivos']
+                st.session_state['variaciones_version'] = version + 1
+                st.rerun()
+        
+            variaciones = {}
+            for tipo, (nombre, contenido) in cargados.items():
+                try:
+                    with crono.medir(f'calculo/variaciones_{tipo}', cache='acierto'):
+                        variaciones[tipo] = calcular_variaciones(tipo, nombre, contenido, entradas, produccion_real)
+                except (KeyError, ValueError) as error:
+                    st.error(f"⚠️ No se pudo leer {nombre}: {error}")
+        
+            totales = {
+                'Materiales': variaciones['materiales']['variacion_total'].sum() if 'materiales' in variaciones else None,
+                'Mano de Obra': variaciones['mod']['variacion_total'] if 'mod' in variaciones else None,
+                'GIF': variaciones['gif']['variacion_gasto'].sum() if 'gif' in variaciones else None,
+            }
+            if variaciones:
+                for col, (concepto, total) in zip(st.columns(len(totales)), totales.items()):
+                    if total is not None:
+                        clase = 'metric-warning' if total > 0 else 'metric-success'
+                        col.markdown(f"<div class='metric-card {clase}'><h3>${total:,.2f}</h3><p>Variación {concepto} ({'Desfavorable' if total > 0 else 'Favorable'})</p></div>", unsafe_allow_html=True)
+        
+            if 'materiales' in variaciones:
+                st.markdown("### Materiales: Precio y Cantidad")
+                mostrar_dataframe(variaciones['materiales'], use_container_width=True,
+                                  column_config={c: st.column_config.NumberColumn(format="dollar")
+                                                 for c in variaciones['materiales'].columns if c not in ('cantidad', 'cantidad_estandar')})
+            if 'mod' in variaciones:
+                st.markdown("### Mano de Obra Directa: Tarifa y Eficiencia")
+                mod = variaciones['mod']
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Horas reales", f"{mod['horas']:,.0f}", f"{mod['horas'] - mod['horas_estandar']:+,.0f} vs estándar", delta_color="inverse")
+                col2.metric("Tarifa real", f"${mod['tarifa_real']:,.2f}", f"{mod['tarifa_real'] - mod['tarifa_estandar']:+,.2f} vs estándar", delta_color="inverse")
+                col3.metric("Variación de Tarifa / Eficiencia", f"${mod['variacion_tarifa']:,.0f} / ${mod['variacion_eficiencia']:,.0f}")
+            if 'gif' in variaciones:
+                st.markdown("### GIF: Variación de Gasto")
+                mostrar_dataframe(variaciones['gif'], use_container_width=True,
+                                  column_config={c: st.column_config.NumberColumn(format="dollar") for c in variaciones['gif'].columns})
+
+        # ==================== TAB 17: KARDEX DE MOVIMIENTOS ====================
+        elif etapa == ETAPAS[16]:
+            st.subheader("📒 Kardex de Movimientos")
+        
+            st.markdown(f"<div class='info-box'>💡 Cargue el historial de movimientos de inventario; se valúa con <b>{entradas.metodo_valuacion}</b> y se guarda en disco. La tabla sólo lee los renglones de la página visible, así que funciona igual con millones de movimientos.</div>", unsafe_allow_html=True)
+        
+            version = st.session_state.get('kardex_version', 0)
+            archivo = st.file_uploader("Movimientos (CSV o Parquet)", type=["csv", "parquet"], key=f"kx_archivo_{version}",
+                                       help="Columnas: articulo, cantidad (positiva en entradas, negativa en salidas), costo_unitario y opcional fecha")
+            if archivo:
+                # Se guarda en disco por contenido: la sesión sólo conserva la ruta
+                fuente = guardar_movimientos(archivo.getvalue(), Path(archivo.name).suffix)
+                st.session_state['kardex_fuente'] = str(fuente)
+        
+            if 'kardex_fuente' not in st.session_state:
+                st.info("📌 Cargue un archivo de movimientos para consultar su kardex.")
+                return
+            if st.button("🗑️ Quitar movimientos", key="kx_quitar"):
+                del st.session_state['kardex_fuente']
+                st.session_state['kardex_version'] = version + 1
+                st.rerun()
+            try:
+                with st.spinner("Valuando movimientos..."), crono.medir('calculo/kardex', cache='acierto'):
+                    historial = historial_kardex(st.session_state['kardex_fuente'], entradas.metodo_valuacion)
+            except FileNotFoundError:
+                # Se desalojó por el techo de la carpeta de kardex
+                del st.session_state['kardex_fuente']
+                st.warning("⚠️ El archivo de movimientos ya no está en disco; vuelva a cargarlo.")
+                return
+            except (KeyError, ValueError) as error:
+                st.error(f"⚠️ No se pudo valuar el archivo: {error}")
+                return
+        
+            opciones_articulo = ['Todos', *historial.articulos]
+            if st.session_state['kx_articulo'] not in opciones_articulo:
+                st.session_state['kx_articulo'] = 'Todos'
+            col1, col2, col3, col4 = st.columns([2, 2, 2, 1], vertical_alignment="bottom")
+            articulo_kx = col1.selectbox("Artículo", opciones_articulo, key="kx_articulo")
+            tipo_kx = col2.radio("Movimientos", ['Todos', *TIPOS_MOVIMIENTO], horizontal=True, key="kx_tipo")
+            orden_kx = col3.selectbox("Ordenar por", list(COLUMNAS_KARDEX), key="kx_orden")
+            descendente_kx = col4.checkbox("Descendente", key="kx_desc")
+            articulo_kx = None if articulo_kx == 'Todos' else articulo_kx
+            tipo_kx = None if tipo_kx == 'Todos' else tipo_kx
+        
+            resumen_kx = historial.resumen(articulo_kx)
+            col1, col2, col3 = st.columns(3)
+            col1.markdown(f"<div class='metric-card'><h3>{resumen_kx['movimientos']:,}</h3><p>Movimientos</p></div>", unsafe_allow_html=True)
+            col2.markdown(f"<div class='metric-card'><h3>${resumen_kx['costo_salidas']:,.2f}</h3><p>Costo de las Salidas</p></div>", unsafe_allow_html=True)
+            if 'valor' in resumen_kx:
+                col3.markdown(f"<div class='metric-card metric-success'><h3>${resumen_kx['valor']:,.2f}</h3><p>Valor Final ({resumen_kx['existencia']:,.2f} uds.)</p></div>", unsafe_allow_html=True)
+            else:
+                col3.markdown(f"<div class='metric-card'><h3>{len(historial.articulos):,}</h3><p>Artículos</p></div>", unsafe_allow_html=True)
+        
+            total_kx = historial.contar(articulo_kx, tipo_kx)
+            filas_kx = st.session_state['kx_filas']
+            paginas = max(1, math.ceil(total_kx / filas_kx))
+            st.session_state['kx_pagina'] = min(st.session_state['kx_pagina'], paginas)
+            col1, col2 = st.columns([1, 3], vertical_alignment="bottom")
+            col1.selectbox("Renglones por página", [50, 100, 250, 500], key="kx_filas")
+            pagina = col2.number_input(f"Página (de {paginas:,})", min_value=1, max_value=paginas, step=1, key="kx_pagina")
+        
+            inicio_kx = (pagina - 1) * filas_kx
+            visible_kx, _ = historial.ventana(inicio_kx, filas_kx, articulo_kx, tipo_kx, orden_kx, descendente_kx)
+            mostrar_dataframe(visible_kx, hide_index=True, use_container_width=True,
+                              column_config={c: st.column_config.NumberColumn(format="dollar")
+                                             for c in ('costo_unitario', 'costo_salida', 'valor')})
+            if total_kx:
+                st.caption(f"Movimientos {inicio_kx + 1:,}–{inicio_kx + len(visible_kx):,} de {total_kx:,} · "
+                           f"Valuado con {historial.metodo}")
+            else:
+                st.info("📌 Ningún movimiento cumple el filtro.")
+    
+    mostrar_etapa(etapa)
+
+
+# ==============================================================================
+#        MÓDULO 2: ANÁLISIS FINANCIERO (RAZONES)
+# ==============================================================================
+elif modulo == "2. Análisis Financiero (Razones)":
+    st.header("📊 Análisis de Razones Financieras")
+    st.info("🚧 Módulo en desarrollo - Próximamente disponible")
+    
+    st.markdown("""
+    Este módulo incluirá:
+    - Razones de Liquidez
+    - Razones de Rentabilidad
+    - Razones de Endeudamiento
+    - Razones de Actividad
+    """)
+
+# ==============================================================================
+#        MÓDULO 3: EVALUACIÓN DE INVERSIÓN
+# ==============================================================================
+elif modulo == "3. Evaluación de Inversión":
+    st.header("💼 Evaluación de Proyectos de Inversión")
+    st.info("🚧 Módulo en desarrollo - Próximamente disponible")
+    
+    st.markdown("""
+    Este módulo incluirá:
+    - Valor Presente Neto (VPN)
+    - Tasa Interna de Retorno (TIR)
+    - Período de Recuperación
+    - Índice de Rentabilidad
+
+    """)
+
+
+# ==============================================================================
+#        RENDIMIENTO DEL RERUN
+# ==============================================================================
+if PERFIL:
+    terminar_perfil(PERFIL, "la página")
+CRONOMETRO.registrar(modulo=modulo)
+if ver_rendimiento:
+    with panel_rendimiento:
+        st.caption(f"Página: {CRONOMETRO.total_ms:,.1f} ms en total")
+        secciones = CRONOMETRO.secciones
+        if modulo == "1. Presupuestos Operativos":
+            secciones = secciones + st.session_state.get('rendimiento_etapa', [])
+        st.dataframe(
+            pd.DataFrame(secciones, columns=['seccion', 'ms', 'renglones', 'cache']).set_index('seccion'),
+            use_container_width=True,
+            column_config={'ms': st.column_config.NumberColumn(format="%.1f")},
+        )
+if es_admin():
+    with panel_perfil:
+        if st.session_state.get('perfil_armado'):
+            st.info("🔬 Se perfilará la siguiente interacción.")
+        if 'perfil' in st.session_state:
+            perfil = st.session_state['perfil']
+            st.caption(f"Perfil del rerun de {perfil['alcance']} ({perfil['fecha']}), funciones con más tiempo propio:")
+            st.dataframe(
+                perfil['resumen'], hide_index=True, use_container_width=True,
+                column_config={c: st.column_config.NumberColumn(format="%.2f") for c in ('propio_ms', 'acumulado_ms')},
+            )
+            st.download_button("📥 Descargar perfil (.prof)", perfil['archivo'],
+                               file_name=f"rerun_{perfil['fecha'].replace(':', '')}.prof",
+                               mime="application/octet-stream", on_click="ignore", key="perfil_descargar",
+                               help="Formato de pstats; se abre con snakeviz o flameprof")
@@ -0,0 +1,34 @@
+"""Cálculo del presupuesto maestro sin dependencia de la interfaz."""
+from .bom import ListaMateriales, Material
+from .motor import (
+    CAMPOS_NUMERICOS,
+    METODOS_VALUACION,
+    EntradasPresupuesto,
+    ResultadoPresupuesto,
+    calcular_valuacion,
+    compute_master_budget,
+    lista_materiales,
+)
+from .lote import evaluar_arrays, evaluar_escenarios
+from .kardex import CapasCosto, ExistenciaInsuficiente, valuar_movimientos
+from .montecarlo import Distribucion, ResultadoMonteCarlo, simular
+
+__all__ = [
+    'CAMPOS_NUMERICOS',
+    'METODOS_VALUACION',
+    'CapasCosto',
+    'Distribucion',
+    'ExistenciaInsuficiente',
+    'EntradasPresupuesto',
+    'ListaMateriales',
+    'Material',
+    'ResultadoMonteCarlo',
+    'ResultadoPresupuesto',
+    'calcular_valuacion',
+    'compute_master_budget',
+    'evaluar_arrays',
+    'evaluar_escenarios',
+    'lista_materiales',
+    'simular',
+    'valuar_movimientos',
+]
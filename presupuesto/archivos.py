@@ -0,0 +1,69 @@
+"""Lectura y escritura por bloques de archivos CSV y Parquet.
+
+Los archivos de escenarios y de movimientos reales pueden tener millones de
+renglones; se recorren por bloques para que la memoria no dependa del
+tamaño del archivo.
+"""
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+TAMANO_BLOQUE = 100_000
+FORMATOS = ('csv', 'parquet')
+
+
+def formato_de(ruta, formato=None):
+    """Formato explícito o deducido de la extensión del archivo."""
+    formato = formato or {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet'}.get(Path(ruta).suffix.lower())
+    if formato not in FORMATOS:
+        raise ValueError(f"No se reconoce el formato de {ruta}; indique csv o parquet")
+    return formato
+
+
+def leer_bloques(fuente, tamano_bloque=TAMANO_BLOQUE, formato=None, columnas=None):
+    """Itera un archivo en ``DataFrame`` de a lo más ``tamano_bloque`` renglones.
+
+    ``fuente`` es una ruta o un archivo abierto en modo binario (con
+    ``name`` si no se indica ``formato``). Con ``columnas`` sólo se leen
+    esas columnas.
+    """
+    if formato_de(getattr(fuente, 'name', fuente), formato) == 'csv':
+        yield from pd.read_csv(fuente, chunksize=tamano_bloque, usecols=columnas)
+    else:
+        for lote in pq.ParquetFile(fuente).iter_batches(batch_size=tamano_bloque, columns=columnas):
+            yield lote.to_pandas()
+
+
+class EscritorBloques:
+    """Escribe bloques de resultados en CSV o Parquet sin juntarlos en memoria."""
+
+    def __init__(self, ruta, formato=None):
+        self.ruta = ruta
+        self.formato = formato_de(ruta, formato)
+        self._parquet = None
+        self._primero = True
+
+    def escribir(self, bloque):
+        if self.formato == 'csv':
+            bloque.to_csv(self.ruta, mode='w' if self._primero else 'a', header=self._primero, index=False)
+        else:
+            tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.ruta, tabla.schema)
+            self._parquet.write_table(tabla.cast(self._parquet.schema))
+        self._primero = False
+
+    def cerrar(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        elif self._primero and self.formato == 'csv':
+            # Archivo de entrada vacío: se deja la salida vacía
+            open(self.ruta, 'w').close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -0,0 +1,144 @@
+"""Lista de materiales (BOM) dispersa para N materiales y M productos.
+
+La BOM se guarda como matriz dispersa en formato CSR (una fila por material,
+una columna por producto, el valor es el consumo estándar por unidad). El
+requerimiento de todos los materiales es un solo producto matriz-vector con
+el vector de producción; compras y valuación se calculan después sobre
+arreglos, un elemento por material.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .valuacion import codificar_metodos, valuacion_vectorizada
+
+
+@dataclass(frozen=True)
+class Material:
+    """Datos de inventario y compra de un material directo."""
+
+    nombre: str
+    inv_inicial: float = 0.0
+    precio_inicial: float = 0.0
+    inv_final: float = 0.0
+    precio_compra: float = 0.0
+    # Consumo estándar por unidad cuando el presupuesto tiene un solo producto
+    por_unidad: float = 0.0
+
+
+class ListaMateriales:
+    """Matriz dispersa material × producto de consumos estándar."""
+
+    def __init__(self, materiales, productos, filas, columnas, cantidades):
+        self.materiales = tuple(materiales)
+        self.productos = tuple(productos)
+        filas = np.asarray(filas, dtype=np.intp)
+        columnas = np.asarray(columnas, dtype=np.intp)
+        cantidades = np.asarray(cantidades, dtype=float)
+        if filas.size and (filas.max() >= len(self.materiales) or columnas.max() >= len(self.productos)):
+            raise IndexError("La BOM hace referencia a un material o producto inexistente")
+
+        orden = np.lexsort((columnas, filas))
+        self.filas = filas[orden]
+        self.indices = columnas[orden]
+        self.datos = cantidades[orden]
+        conteo = np.bincount(filas, minlength=len(self.materiales))
+        self.indptr = np.concatenate(([0], np.cumsum(conteo)))
+
+        # Arreglos de inventario y precios, uno por material
+        self.inv_inicial = np.array([m.inv_inicial for m in self.materiales], dtype=float)
+        self.precio_inicial = np.array([m.precio_inicial for m in self.materiales], dtype=float)
+        self.inv_final = np.array([m.inv_final for m in self.materiales], dtype=float)
+        self.precio_compra = np.array([m.precio_compra for m in self.materiales], dtype=float)
+
+    @classmethod
+    def de_un_producto(cls, materiales, producto='PT'):
+        """BOM de un solo producto usando ``Material.por_unidad`` como consumo estándar."""
+        materiales = tuple(materiales)
+        filas = np.arange(len(materiales))
+        return cls(materiales, (producto,), filas, np.zeros_like(filas),
+                   [m.por_unidad for m in materiales])
+
+    @classmethod
+    def desde_tabla(cls, materiales, componentes, productos=None):
+        """Construye la BOM desde un catálogo de materiales y una tabla de componentes.
+
+        ``componentes`` tiene columnas ``material``, ``producto`` y ``cantidad``
+        (una fila por par con consumo distinto de cero). ``materiales`` es una
+        secuencia de ``Material`` cuyo ``nombre`` coincide con la columna
+        ``material``.
+        """
+        materiales = tuple(materiales)
+        if productos is None:
+            productos = pd.unique(componentes['producto'])
+        pos_mat = pd.Index([m.nombre for m in materiales]).get_indexer(componentes['material'])
+        pos_prod = pd.Index(productos).get_indexer(componentes['producto'])
+        if (pos_mat < 0).any() or (pos_prod < 0).any():
+            raise KeyError("La tabla de componentes tiene materiales o productos fuera del catálogo")
+        return cls(materiales, productos, pos_mat, pos_prod, componentes['cantidad'].to_numpy())
+
+    @property
+    def forma(self):
+        return len(self.materiales), len(self.productos)
+
+    @property
+    def nombres(self):
+        return [m.nombre for m in self.materiales]
+
+    def explotar(self, produccion):
+        """Requerimiento por material: ``BOM @ produccion``.
+
+        ``produccion`` tiene un renglón por producto; puede tener más ejes
+        (escenarios, periodos) y el resultado conserva esos ejes.
+        """
+        produccion = np.asarray(produccion, dtype=float)
+        if produccion.shape[0] != len(self.productos):
+            raise ValueError(f"Se esperaban {len(self.productos)} productos, hay {produccion.shape[0]}")
+        aportes = self.datos.reshape((-1,) + (1,) * (produccion.ndim - 1)) * produccion[self.indices]
+        requerimiento = np.zeros((len(self.materiales),) + produccion.shape[1:])
+        con_datos = np.diff(self.indptr) > 0
+        if con_datos.any():
+            requerimiento[con_datos] = np.add.reduceat(aportes, self.indptr[:-1][con_datos], axis=0)
+        return requerimiento
+
+    def costo_por_producto(self, costo_por_pieza):
+        """Costo de materiales por unidad de cada producto: ``BOMᵀ @ costo_por_pieza``.
+
+        ``costo_por_pieza`` tiene un renglón por material y, como en
+        ``explotar``, puede tener ejes adicionales.
+        """
+        costo_por_pieza = np.asarray(costo_por_pieza, dtype=float)
+        if costo_por_pieza.ndim == 1:
+            return np.bincount(self.indices, weights=self.datos * costo_por_pieza[self.filas],
+                               minlength=len(self.productos))
+        # Orden por producto (CSC) para sumar por segmentos con reduceat
+        orden = np.argsort(self.indices, kind='stable')
+        aportes = self.datos[orden].reshape((-1,) + (1,) * (costo_por_pieza.ndim - 1)) * costo_por_pieza[self.filas[orden]]
+        conteo = np.bincount(self.indices, minlength=len(self.productos))
+        inicio = np.concatenate(([0], np.cumsum(conteo)[:-1]))
+        costo = np.zeros((len(self.productos),) + costo_por_pieza.shape[1:])
+        con_datos = conteo > 0
+        if con_datos.any():
+            costo[con_datos] = np.add.reduceat(aportes, inicio[con_datos], axis=0)
+        return costo
+
+    def presupuestar(self, produccion, metodo):
+        """Cédula de requerimientos, compras y valuación de todos los materiales."""
+        requerimiento = self.explotar(produccion)
+        compras = requerimiento + self.inv_final - self.inv_inicial
+        costo_consumo, costo_inv_final, inv_final_cant = valuacion_vectorizada(
+            self.inv_inicial, self.precio_inicial, compras, self.precio_compra,
+            requerimiento, codificar_metodos(metodo)
+        )
+        return pd.DataFrame({
+            'requerimiento': requerimiento,
+            'inv_final_deseado': self.inv_final,
+            'inv_inicial': self.inv_inicial,
+            'compras': compras,
+            'precio_compra': self.precio_compra,
+            'costo_compras': compras * self.precio_compra,
+            'costo_consumo': costo_consumo,
+            'inv_final_cant': inv_final_cant,
+            'costo_inv_final': costo_inv_final,
+        }, index=pd.Index(self.nombres, name='material'))
@@ -0,0 +1,353 @@
+"""Cachés de resultados: en memoria para el proceso y en disco entre reinicios.
+
+Todas las sesiones de Streamlit viven en el mismo proceso, así que un
+presupuesto con entradas idénticas (por ejemplo, los valores por omisión) se
+calcula una sola vez por servidor. La llave es una huella canónica del
+vector de entradas, los materiales adicionales y el método de valuación; el
+desalojo es LRU con un techo de memoria configurable.
+
+Los cálculos pesados (Monte Carlo, tablas de datos, presupuestos
+multiproducto) se guardan además en disco con ``persistente``: cada
+resultado es una carpeta con sus tablas en Parquet, sus arreglos en ``.npy``
+y un ``manifiesto.json`` con la estructura. La llave incluye la versión del
+motor y el código de la función decorada, así que un cambio en el paquete o
+en la propia función invalida lo anterior.
+
+Los resultados guardados se comparten entre sesiones y no deben modificarse.
+"""
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .motor import compute_master_budget
+from .rendimiento import marcar_cache
+
+# Techo por omisión de la caché de presupuestos, en MB
+MEMORIA_MB = float(os.environ.get('PRESUPUESTO_CACHE_MB', 64))
+# Carpeta y techo de la caché en disco
+DIRECTORIO_DISCO = Path(os.environ.get('PRESUPUESTO_CACHE_DIR', Path.home() / '.cache' / 'presupuesto'))
+DISCO_MB = float(os.environ.get('PRESUPUESTO_CACHE_DISCO_MB', 512))
+MANIFIESTO = 'manifiesto.json'
+
+
+def _version_motor():
+    # Huella del código del paquete: cualquier cambio en el motor invalida la caché en disco
+    contenido = hashlib.sha256()
+    for archivo in sorted(Path(__file__).parent.glob('*.py')):
+        contenido.update(archivo.name.encode())
+        contenido.update(archivo.read_bytes())
+    return contenido.hexdigest()[:16]
+
+
+VERSION_MOTOR = _version_motor()
+
+
+def _canonico(valor):
+    # Representación estable: 63000 y 63000.0 dan la misma huella
+    if is_dataclass(valor):
+        return (type(valor).__name__,) + tuple((f.name, _canonico(getattr(valor, f.name))) for f in fields(valor))
+    if isinstance(valor, (tuple, list)):
+        return tuple(_canonico(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _canonico(v)) for k, v in valor.items()))
+    if isinstance(valor, bytes):
+        # Archivos cargados: basta su huella
+        return hashlib.sha256(valor).hexdigest()
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        contenido = pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes()
+        columnas = tuple(valor.columns) if isinstance(valor, pd.DataFrame) else valor.name
+        return ('tabla', _canonico(columnas), hashlib.sha256(contenido).hexdigest())
+    if isinstance(valor, np.ndarray):
+        return ('arreglo', valor.shape, str(valor.dtype), hashlib.sha256(np.ascontiguousarray(valor).tobytes()).hexdigest())
+    if isinstance(valor, (bool, np.bool_)):
+        return bool(valor)
+    if isinstance(valor, (int, float, np.number)):
+        return float(valor).hex()
+    return valor
+
+
+def huella(*partes):
+    """Huella SHA-256 canónica de entradas (``EntradasPresupuesto`` u otros valores simples)."""
+    return hashlib.sha256(repr(_canonico(partes)).encode()).hexdigest()
+
+
+def tamano(valor):
+    """Estimación en bytes de la memoria que ocupa un resultado."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(uso, pd.Series) else uso)
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if is_dataclass(valor):
+        return sys.getsizeof(valor) + sum(tamano(getattr(valor, f.name)) for f in fields(valor))
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(tamano(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano(k) + tamano(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Caché LRU segura entre hilos con techo de memoria y contadores."""
+
+    def __init__(self, memoria_mb=MEMORIA_MB):
+        self.max_bytes = int(memoria_mb * 1024 * 1024)
+        self._datos = OrderedDict()  # llave -> (valor, bytes)
+        self._candado = threading.Lock()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __contains__(self, llave):
+        return llave in self._datos
+
+    def obtener(self, llave, calcular):
+        """Regresa el valor de ``llave``; si no está, lo calcula con ``calcular()`` y lo guarda."""
+        with self._candado:
+            if llave in self._datos:
+                self._datos.move_to_end(llave)
+                self.aciertos += 1
+                return self._datos[llave][0]
+            self.fallos += 1
+        # Se calcula fuera del candado para no bloquear a las demás sesiones
+        valor = calcular()
+        self.guardar(llave, valor)
+        return valor
+
+    def guardar(self, llave, valor):
+        peso = tamano(valor)
+        with self._candado:
+            if llave in self._datos:
+                self.bytes -= self._datos.pop(llave)[1]
+            if peso > self.max_bytes:
+                return
+            self._datos[llave] = (valor, peso)
+            self.bytes += peso
+            while self.bytes > self.max_bytes:
+                _, (_, liberado) = self._datos.popitem(last=False)
+                self.bytes -= liberado
+                self.desalojos += 1
+
+    def limpiar(self):
+        with self._candado:
+            self._datos.clear()
+            self.bytes = 0
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._datos),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'desalojos': self.desalojos,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+        }
+
+
+CACHE_PRESUPUESTOS = CacheLRU()
+
+
+def presupuesto_compartido(entradas, calcular=None):
+    """``compute_master_budget`` a través de la caché del proceso.
+
+    ``calcular`` sustituye al cálculo en caso de fallo (por ejemplo, el grafo
+    incremental de la sesión).
+    """
+    return CACHE_PRESUPUESTOS.obtener(huella(entradas), calcular or (lambda: compute_master_budget(entradas)))
+
+
+def _escribir(valor, carpeta, nombre):
+    # Guarda tablas y arreglos en archivos propios; regresa su descripción para el manifiesto
+    if isinstance(valor, pd.DataFrame):
+        descripcion = {'tipo': 'tabla', 'archivo': f'{nombre}.parquet', 'nombre_columnas': valor.columns.name}
+        if not all(isinstance(c, str) for c in valor.columns):
+            # Parquet sólo acepta encabezados de texto (la tabla de datos usa números)
+            descripcion['columnas'] = np.asarray(valor.columns).tolist()
+            valor = valor.set_axis([str(i) for i in range(valor.shape[1])], axis=1)
+        valor.to_parquet(carpeta / descripcion['archivo'])
+        return descripcion
+    if isinstance(valor, np.ndarray):
+        np.save(carpeta / f'{nombre}.npy', valor, allow_pickle=False)
+        return {'tipo': 'arreglo', 'archivo': f'{nombre}.npy'}
+    if is_dataclass(valor):
+        clase = type(valor)
+        return {'tipo': 'clase', 'clase': f'{clase.__module__}:{clase.__qualname__}',
+                'campos': {f.name: _escribir(getattr(valor, f.name), carpeta, f'{nombre}.{f.name}')
+                           for f in fields(valor)}}
+    if isinstance(valor, dict) and all(isinstance(k, str) for k in valor):
+        return {'tipo': 'dict', 'valores': {k: _escribir(v, carpeta, f'{nombre}.{k}') for k, v in valor.items()}}
+    if isinstance(valor, (tuple, list)):
+        return {'tipo': 'tupla', 'valores': [_escribir(v, carpeta, f'{nombre}.{i}') for i, v in enumerate(valor)]}
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return {'tipo': 'valor', 'valor': valor}
+    raise TypeError(f"No se puede guardar en disco un valor de tipo {type(valor).__name__}")
+
+
+def _leer(descripcion, carpeta):
+    tipo = descripcion['tipo']
+    if tipo == 'tabla':
+        tabla = pd.read_parquet(carpeta / descripcion['archivo'])
+        if 'columnas' in descripcion:
+            tabla.columns = descripcion['columnas']
+        tabla.columns.name = descripcion['nombre_columnas']
+        return tabla
+    if tipo == 'arreglo':
+        return np.load(carpeta / descripcion['archivo'], allow_pickle=False)
+    if tipo == 'clase':
+        modulo, nombre = descripcion['clase'].split(':')
+        if modulo.split('.')[0] != __package__:
+            raise ValueError(f"Clase fuera del paquete en la caché: {descripcion['clase']}")
+        clase = getattr(importlib.import_module(modulo), nombre)
+        return clase(**{k: _leer(v, carpeta) for k, v in descripcion['campos'].items()})
+    if tipo == 'dict':
+        return {k: _leer(v, carpeta) for k, v in descripcion['valores'].items()}
+    if tipo == 'tupla':
+        return tuple(_leer(v, carpeta) for v in descripcion['valores'])
+    return descripcion['valor']
+
+
+class CacheDisco:
+    """Caché persistente en disco con desalojo por tamaño (el menos usado primero)."""
+
+    def __init__(self, directorio=DIRECTORIO_DISCO, disco_mb=DISCO_MB, version=VERSION_MOTOR):
+        self.directorio = Path(directorio)
+        self.max_bytes = int(disco_mb * 1024 * 1024)
+        self.version = version
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def llave(self, *partes):
+        return huella(self.version, *partes)
+
+    def leer(self, llave):
+        """Regresa el valor guardado; ``KeyError`` si no existe o no se puede leer."""
+        carpeta = self.directorio / llave
+        try:
+            descripcion = json.loads((carpeta / MANIFIESTO).read_text())
+            valor = _leer(descripcion, carpeta)
+            # La fecha de modificación del manifiesto marca el último uso
+            os.utime(carpeta / MANIFIESTO)
+        except FileNotFoundError:
+            raise KeyError(llave) from None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # Entrada dañada o de otra versión del formato: se descarta
+            shutil.rmtree(carpeta, ignore_errors=True)
+            raise KeyError(llave) from None
+        return valor
+
+    def guardar(self, llave, valor):
+        temporal = self.directorio / f'.{llave}.{uuid.uuid4().hex}'
+        try:
+            temporal.mkdir(parents=True)
+            descripcion = _escribir(valor, temporal, 'valor')
+            (temporal / MANIFIESTO).write_text(json.dumps(descripcion))
+            # El renombrado es atómico: otro proceso nunca ve una entrada a medias
+            temporal.rename(self.directorio / llave)
+        except OSError:
+            # Ya existe (otro proceso la escribió) o el disco no está disponible
+            return
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+        self.desalojar()
+
+    def obtener(self, llave, calcular):
+        try:
+            valor = self.leer(llave)
+        except KeyError:
+            with self._candado:
+                self.fallos += 1
+            valor = calcular()
+            self.guardar(llave, valor)
+            return valor
+        with self._candado:
+            self.aciertos += 1
+        return valor
+
+    def _entradas(self):
+        # (último uso, bytes, carpeta) de cada entrada completa
+        entradas = []
+        for carpeta in self.directorio.glob('[!.]*'):
+            try:
+                uso = (carpeta / MANIFIESTO).stat().st_mtime
+                peso = sum(a.stat().st_size for a in carpeta.iterdir())
+            except OSError:
+                continue
+            entradas.append((uso, peso, carpeta))
+        return entradas
+
+    def desalojar(self):
+        """Borra las entradas menos usadas hasta quedar debajo del techo."""
+        with self._candado:
+            entradas = sorted(self._entradas())
+            total = sum(peso for _, peso, _ in entradas)
+            for _, peso, carpeta in entradas:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(carpeta, ignore_errors=True)
+                total -= peso
+                self.desalojos += 1
+
+    def limpiar(self):
+        """Borra las entradas de la caché; lo demás en la carpeta (los historiales de kardex) se queda."""
+        with self._candado:
+            for _, _, carpeta in self._entradas():
+                shutil.rmtree(carpeta, ignore_errors=True)
+
+    def estadisticas(self):
+        entradas = self._entradas()
+        return {
+            'entradas': len(entradas),
+            'bytes': sum(peso for _, peso, _ in entradas),
+            'max_bytes': self.max_bytes,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'desalojos': self.desalojos,
+        }
+
+
+CACHE_DISCO = CacheDisco()
+
+
+def _codigo(funcion):
+    # Fuente de la función; sin archivo (por ejemplo, definida con exec), su bytecode
+    try:
+        return inspect.getsource(funcion)
+    except (OSError, TypeError):
+        return funcion.__code__.co_code.hex()
+
+
+def persistente(funcion):
+    """Decorador: guarda en ``CACHE_DISCO`` el resultado de ``funcion`` por sus argumentos."""
+    codigo = _codigo(funcion)
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        llave = CACHE_DISCO.llave(funcion.__module__, funcion.__qualname__, codigo, args, kwargs)
+        calculado = []
+        valor = CACHE_DISCO.obtener(llave, lambda: calculado.append(True) or funcion(*args, **kwargs))
+        marcar_cache('fallo' if calculado else 'disco')
+        return valor
+    return envoltura
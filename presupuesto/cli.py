@@ -0,0 +1,107 @@
+"""Evaluación por lotes desde la línea de comandos.
+
+    python -m presupuesto escenarios.csv resultados.parquet --procesos 8
+
+Cada renglón del archivo de entrada es un escenario con columnas de
+``EntradasPresupuesto`` (y opcionalmente ``metodo_valuacion``); los campos
+ausentes se toman de los valores por omisión. Las columnas que no son
+entradas (un identificador, por ejemplo) pasan tal cual a la salida.
+
+El archivo se lee por bloques, los bloques se evalúan en un pool de procesos
+y los resultados se escriben en orden conforme terminan, con a lo más unos
+cuantos bloques en memoria a la vez.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .archivos import FORMATOS, TAMANO_BLOQUE, EscritorBloques, formato_de, leer_bloques
+from .lote import CAMPOS_RESULTADO, evaluar_escenarios
+from .motor import CAMPOS_NUMERICOS, METODOS_VALUACION, EntradasPresupuesto
+
+_CAMPOS_ENTRADA = set(CAMPOS_NUMERICOS) | {'metodo_valuacion'}
+
+
+def evaluar_bloque(bloque, base, metricas=CAMPOS_RESULTADO):
+    """Columnas de paso del bloque seguidas de las ``metricas`` de cada escenario."""
+    entradas = [c for c in bloque.columns if c in _CAMPOS_ENTRADA]
+    resultado = evaluar_escenarios(bloque[entradas], base)[list(metricas)]
+    paso = bloque.drop(columns=entradas)
+    return pd.concat([paso, resultado], axis=1)
+
+
+def evaluar_archivo(entrada, salida, base=None, procesos=None, tamano_bloque=TAMANO_BLOQUE,
+                    metricas=CAMPOS_RESULTADO, formato_entrada=None, formato_salida=None):
+    """Evalúa todos los escenarios de ``entrada`` y escribe ``salida``; regresa cuántos fueron."""
+    base = base or EntradasPresupuesto()
+    procesos = procesos or os.cpu_count() or 1
+    bloques = leer_bloques(entrada, tamano_bloque, formato_entrada)
+    total = 0
+    with EscritorBloques(salida, formato_salida) as escritor:
+        if procesos == 1:
+            for bloque in bloques:
+                escritor.escribir(evaluar_bloque(bloque, base, metricas))
+                total += len(bloque)
+            return total
+        # A lo más dos bloques en vuelo por proceso: la memoria no crece con el archivo
+        pendientes = deque()
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            for bloque in bloques:
+                pendientes.append(pool.submit(evaluar_bloque, bloque, base, metricas))
+                if len(pendientes) >= 2 * procesos:
+                    resultado = pendientes.popleft().result()
+                    escritor.escribir(resultado)
+                    total += len(resultado)
+            while pendientes:
+                resultado = pendientes.popleft().result()
+                escritor.escribir(resultado)
+                total += len(resultado)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m presupuesto',
+        description="Evalúa un archivo de escenarios del presupuesto maestro (CSV o Parquet).",
+    )
+    parser.add_argument('entrada', help="Archivo de escenarios, un renglón por escenario")
+    parser.add_argument('salida', help="Archivo de resultados (.csv o .parquet)")
+    parser.add_argument('--procesos', type=int, default=None,
+                        help="Procesos del pool (por omisión, todos los núcleos)")
+    parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE,
+                        help=f"Renglones por bloque (por omisión, {TAMANO_BLOQUE:,})")
+    parser.add_argument('--metricas', default=None,
+                        help="Cifras de salida separadas por comas (por omisión, todas)")
+    parser.add_argument('--metodo', choices=METODOS_VALUACION, default=EntradasPresupuesto.metodo_valuacion,
+                        help="Método de valuación si el archivo no trae la columna metodo_valuacion")
+    parser.add_argument('--formato-entrada', choices=FORMATOS, default=None)
+    parser.add_argument('--formato-salida', choices=FORMATOS, default=None)
+    args = parser.parse_args(argv)
+
+    metricas = CAMPOS_RESULTADO
+    if args.metricas:
+        metricas = tuple(m.strip() for m in args.metricas.split(',') if m.strip())
+        desconocidas = set(metricas) - set(CAMPOS_RESULTADO)
+        if desconocidas:
+            parser.error(f"Métricas desconocidas: {sorted(desconocidas)}")
+    if args.tamano_bloque <= 0:
+        parser.error("El tamaño de bloque debe ser positivo")
+    try:
+        formato_de(args.entrada, args.formato_entrada)
+        formato_de(args.salida, args.formato_salida)
+    except ValueError as error:
+        parser.error(str(error))
+
+    inicio = time.perf_counter()
+    total = evaluar_archivo(
+        args.entrada, args.salida, EntradasPresupuesto(metodo_valuacion=args.metodo), args.procesos,
+        args.tamano_bloque, metricas, args.formato_entrada, args.formato_salida,
+    )
+    print(f"{total:,} escenarios evaluados en {time.perf_counter() - inicio:.1f} s -> {args.salida}",
+          file=sys.stderr)
+    return 0
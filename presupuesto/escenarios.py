@@ -0,0 +1,176 @@
+"""Almacén de escenarios del presupuesto en SQLite.
+
+Cada escenario guarda su vector de entradas y las cifras clave del estado de
+resultados con un renglón por método de valuación, así que comparar cientos
+de escenarios es una sola consulta sobre columnas indexadas y no hace falta
+recalcular ninguno.
+"""
+import json
+import os
+import sqlite3
+from contextlib import closing
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .bom import Material
+from .lote import evaluar_arrays
+from .motor import CAMPOS_NUMERICOS, METODOS_VALUACION, EntradasPresupuesto
+
+RUTA_ESCENARIOS = Path(os.environ.get('PRESUPUESTO_ESCENARIOS_DB',
+                                      Path.home() / '.local' / 'share' / 'presupuesto' / 'escenarios.db'))
+METRICAS_ESCENARIO = (
+    'ingresos', 'costo_unitario', 'costo_ventas', 'utilidad_bruta', 'utilidad_operativa',
+    'margen_bruto', 'margen_operativo',
+)
+# Columnas por las que se puede ordenar un listado
+ORDENES = ('nombre', 'creado', *METRICAS_ESCENARIO)
+
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS escenarios (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    creado TEXT NOT NULL,
+    metodo_valuacion TEXT NOT NULL,
+    {', '.join(f'{c} REAL NOT NULL' for c in CAMPOS_NUMERICOS)},
+    materiales_adicionales TEXT NOT NULL,
+    {', '.join(f'{m} REAL' for m in METRICAS_ESCENARIO)},
+    UNIQUE (nombre, metodo_valuacion)
+);
+CREATE INDEX IF NOT EXISTS ix_escenarios_nombre ON escenarios (nombre);
+CREATE INDEX IF NOT EXISTS ix_escenarios_creado ON escenarios (creado);
+CREATE INDEX IF NOT EXISTS ix_escenarios_utilidad_operativa ON escenarios (metodo_valuacion, utilidad_operativa);
+CREATE INDEX IF NOT EXISTS ix_escenarios_margen_operativo ON escenarios (metodo_valuacion, margen_operativo);
+CREATE INDEX IF NOT EXISTS ix_escenarios_costo_unitario ON escenarios (metodo_valuacion, costo_unitario);
+"""
+
+# Nombres de las entradas que difieren de la referencia, calculados en la consulta
+_CAMBIOS = "rtrim(" + " || ".join(
+    f"(CASE WHEN e.{c} IS NOT r.{c} THEN '{c}, ' ELSE '' END)" for c in CAMPOS_NUMERICOS
+) + " || (CASE WHEN e.materiales_adicionales IS NOT r.materiales_adicionales "\
+    "THEN 'materiales_adicionales, ' ELSE '' END), ', ')"
+
+
+class AlmacenEscenarios:
+    """Escenarios guardados en un archivo SQLite (se crea al primer uso)."""
+
+    def __init__(self, ruta=RUTA_ESCENARIOS):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._conectar()) as con:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.executescript(_ESQUEMA)
+
+    def _conectar(self):
+        # Una conexión por operación: las sesiones de Streamlit corren en hilos distintos
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def guardar(self, nombre, entradas, metodos=METODOS_VALUACION):
+        """Guarda (o reemplaza) el escenario ``nombre`` con un renglón por método."""
+        nombre = nombre.strip()
+        if not nombre:
+            raise ValueError("El escenario necesita un nombre")
+        metodos = list(metodos)
+        r = evaluar_arrays({'metodo_valuacion': np.array(metodos)}, entradas)
+        creado = datetime.now().isoformat(timespec='seconds')
+        materiales = json.dumps([asdict(m) for m in entradas.materiales_adicionales])
+        columnas = ('nombre', 'creado', 'metodo_valuacion', *CAMPOS_NUMERICOS,
+                    'materiales_adicionales', *METRICAS_ESCENARIO)
+        renglones = [
+            (nombre, creado, metodo, *(float(getattr(entradas, c)) for c in CAMPOS_NUMERICOS),
+             materiales, *(float(r[m][i]) for m in METRICAS_ESCENARIO))
+            for i, metodo in enumerate(metodos)
+        ]
+        with closing(self._conectar()) as con, con:
+            con.execute('DELETE FROM escenarios WHERE nombre = ?', (nombre,))
+            con.executemany(
+                f"INSERT INTO escenarios ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                renglones,
+            )
+        return len(renglones)
+
+    def borrar(self, nombre):
+        with closing(self._conectar()) as con, con:
+            return con.execute('DELETE FROM escenarios WHERE nombre = ?', (nombre,)).rowcount
+
+    def nombres(self):
+        with closing(self._conectar()) as con:
+            return [n for (n,) in con.execute('SELECT DISTINCT nombre FROM escenarios ORDER BY nombre')]
+
+    def listar(self, metodo=None, orden='creado', descendente=True, limite=None):
+        """Escenarios guardados con sus cifras clave, sin entradas."""
+        if orden not in ORDENES:
+            raise ValueError(f"No se puede ordenar por {orden!r}")
+        consulta = (
+            f"SELECT nombre, creado, metodo_valuacion, {', '.join(METRICAS_ESCENARIO)} FROM escenarios "
+            "WHERE :metodo IS NULL OR metodo_valuacion = :metodo "
+            f"ORDER BY {orden} {'DESC' if descendente else 'ASC'}, nombre LIMIT :limite"
+        )
+        with closing(self._conectar()) as con:
+            return pd.read_sql_query(consulta, con, params={'metodo': metodo, 'limite': -1 if limite is None else limite})
+
+    def cargar(self, nombre, metodo=None):
+        """Regresa las ``EntradasPresupuesto`` guardadas del escenario."""
+        consulta = (
+            f"SELECT metodo_valuacion, {', '.join(CAMPOS_NUMERICOS)}, materiales_adicionales FROM escenarios "
+            "WHERE nombre = :nombre AND (:metodo IS NULL OR metodo_valuacion = :metodo) LIMIT 1"
+        )
+        with closing(self._conectar()) as con:
+            renglon = con.execute(consulta, {'nombre': nombre, 'metodo': metodo}).fetchone()
+        if renglon is None:
+            raise KeyError(f"No existe el escenario {nombre!r}")
+        return _entradas(*renglon)
+
+    def iterar(self, nombres=None, metodo='UEPS'):
+        """Genera ``(nombre, EntradasPresupuesto)`` de cada escenario en una sola consulta.
+
+        Los renglones se leen conforme se consumen, así que recorrer cientos
+        de escenarios no los carga todos a la vez.
+        """
+        consulta = (
+            f"SELECT nombre, metodo_valuacion, {', '.join(CAMPOS_NUMERICOS)}, materiales_adicionales "
+            "FROM escenarios WHERE metodo_valuacion = :metodo "
+            "AND (:nombres IS NULL OR nombre IN (SELECT value FROM json_each(:nombres))) ORDER BY nombre"
+        )
+        parametros = {'metodo': metodo, 'nombres': None if nombres is None else json.dumps(list(nombres))}
+        with closing(self._conectar()) as con:
+            for nombre, *renglon in con.execute(consulta, parametros):
+                yield nombre, _entradas(*renglon)
+
+    def comparar(self, nombres=None, metodo='UEPS', referencia=None):
+        """Compara escenarios guardados contra ``referencia`` en una sola consulta.
+
+        Regresa un ``DataFrame`` indexado por nombre con las cifras clave,
+        su diferencia contra la referencia (``delta_*``) y la lista de
+        entradas que cambian. Sin ``nombres`` se comparan todos.
+        """
+        consulta = (
+            f"SELECT e.nombre, e.creado, {', '.join(f'e.{m}' for m in METRICAS_ESCENARIO)}, "
+            f"{', '.join(f'e.{m} - r.{m} AS delta_{m}' for m in METRICAS_ESCENARIO)}, "
+            f"CASE WHEN r.id IS NULL THEN NULL ELSE {_CAMBIOS} END AS cambios "
+            "FROM escenarios e LEFT JOIN escenarios r "
+            "ON r.nombre = :referencia AND r.metodo_valuacion = e.metodo_valuacion "
+            "WHERE e.metodo_valuacion = :metodo "
+            "AND (:nombres IS NULL OR e.nombre IN (SELECT value FROM json_each(:nombres))) "
+            "ORDER BY e.nombre"
+        )
+        parametros = {
+            'metodo': metodo,
+            'referencia': referencia,
+            'nombres': None if nombres is None else json.dumps(list(nombres)),
+        }
+        with closing(self._conectar()) as con:
+            return pd.read_sql_query(consulta, con, params=parametros, index_col='nombre')
+
+
+def _entradas(metodo, *renglon):
+    # Renglón (método, campos numéricos..., materiales en JSON) -> EntradasPresupuesto
+    *valores, materiales = renglon
+    return EntradasPresupuesto(
+        metodo_valuacion=metodo,
+        materiales_adicionales=tuple(Material(**m) for m in json.loads(materiales)),
+        **dict(zip(CAMPOS_NUMERICOS, valores)),
+    )
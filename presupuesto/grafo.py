@@ -0,0 +1,177 @@
+"""Grafo de dependencias del presupuesto con recálculo incremental.
+
+Cada cifra del presupuesto es un nodo que declara de qué campos de
+``EntradasPresupuesto`` o de qué otros nodos depende. ``GrafoPresupuesto``
+guarda el último valor de cada nodo; al recibir entradas nuevas sólo
+recalcula los nodos alcanzables desde los campos que cambiaron, y si un nodo
+recalculado da el mismo valor que antes, sus dependientes ya no se tocan.
+Cambiar una línea de GIF recalcula ``total_gif → costo_produccion_total →
+costo_unitario → … → utilidades`` y nada de ventas, producción ni materiales.
+"""
+from dataclasses import dataclass, fields
+from types import SimpleNamespace
+from typing import Callable
+
+import pandas as pd
+
+from .motor import (
+    EntradasPresupuesto,
+    ResultadoPresupuesto,
+    costo_de_ventas,
+    costo_produccion,
+    estado_resultados,
+    gastos_operacion,
+    lista_materiales,
+    presupuesto_gif,
+    presupuesto_produccion,
+    presupuesto_ventas,
+)
+
+CAMPOS_ENTRADA = tuple(f.name for f in fields(EntradasPresupuesto))
+CAMPOS_BOM = (
+    'std_mat_a', 'ii_mat_a', 'precio_ii_a', 'if_mat_a', 'costo_mat_a',
+    'std_mat_b', 'ii_mat_b', 'precio_ii_b', 'if_mat_b', 'costo_mat_b',
+    'materiales_adicionales',
+)
+
+
+@dataclass(frozen=True)
+class Nodo:
+    """Cifra del presupuesto: ``funcion`` recibe los valores de ``dependencias`` en orden."""
+
+    nombre: str
+    funcion: Callable
+    dependencias: tuple
+
+
+def _lista_materiales(*valores):
+    # lista_materiales sólo lee atributos; basta con los campos de la BOM
+    return lista_materiales(SimpleNamespace(**dict(zip(CAMPOS_BOM, valores))))
+
+
+# Cifras de los materiales A y B tomadas de la cédula: prefijo -> columna
+_COLUMNAS_CEDULA = {
+    'req_total': 'requerimiento',
+    'compras_uni': 'compras',
+    'costo_compras': 'costo_compras',
+    'costo_consumo': 'costo_consumo',
+    'costo_inv_final': 'costo_inv_final',
+    'cant_inv_final': 'inv_final_cant',
+}
+
+
+def _renglon(material, columna):
+    return Nodo(f'{columna}_{material}',
+                lambda cedula: float(cedula.iloc['ab'.index(material)][_COLUMNAS_CEDULA[columna]]),
+                ('cedula_mp',))
+
+
+NODOS = (
+    Nodo('ingresos', presupuesto_ventas, ('unidades', 'precio')),
+    Nodo('prod_unidades', presupuesto_produccion, ('unidades', 'inv_final_pt', 'inv_inicial_pt')),
+    Nodo('bom', _lista_materiales, CAMPOS_BOM),
+    Nodo('cedula_mp', lambda bom, prod, metodo: bom.presupuestar([prod], metodo),
+         ('bom', 'prod_unidades', 'metodo_valuacion')),
+    *(_renglon(m, c) for c in _COLUMNAS_CEDULA for m in 'ab'),
+    Nodo('mp_total', lambda cedula: float(cedula['costo_consumo'].sum()), ('cedula_mp',)),
+    Nodo('total_horas', lambda prod, hrs: prod * hrs, ('prod_unidades', 'hrs_unit')),
+    Nodo('costo_mod', lambda horas, cuota: horas * cuota, ('total_horas', 'cuota_hr')),
+    Nodo('total_gif', presupuesto_gif, ('mat_indirecto', 'moi', 'renta', 'energia', 'mantenimiento', 'varios')),
+    Nodo('costo_produccion', costo_produccion, ('mp_total', 'costo_mod', 'total_gif', 'prod_unidades')),
+    Nodo('costo_produccion_total', lambda c: c[0], ('costo_produccion',)),
+    Nodo('costo_unitario', lambda c: c[1], ('costo_produccion',)),
+    Nodo('total_disponible_pt', lambda ii, prod: ii + prod, ('inv_inicial_pt', 'prod_unidades')),
+    Nodo('valor_inv_inicial_pt', lambda ii, precio: ii * precio, ('inv_inicial_pt', 'precio_inv_inicial_pt')),
+    Nodo('valor_produccion', lambda prod, costo: prod * costo, ('prod_unidades', 'costo_unitario')),
+    Nodo('valor_total_disponible', lambda inicial, prod: inicial + prod,
+         ('valor_inv_inicial_pt', 'valor_produccion')),
+    Nodo('valuacion_pt', costo_de_ventas, ('inv_inicial_pt', 'precio_inv_inicial_pt', 'prod_unidades',
+                                            'costo_unitario', 'unidades', 'metodo_valuacion')),
+    Nodo('costo_ventas', lambda v: v[0], ('valuacion_pt',)),
+    Nodo('valor_inv_final_pt', lambda v: v[1], ('valuacion_pt',)),
+    Nodo('total_gastos_op', gastos_operacion, ('comisiones', 'sueldos', 'publicidad', 'servicios', 'diversos')),
+    Nodo('utilidades', estado_resultados, ('ingresos', 'costo_ventas', 'total_gastos_op')),
+    Nodo('utilidad_bruta', lambda u: u[0], ('utilidades',)),
+    Nodo('utilidad_operativa', lambda u: u[1], ('utilidades',)),
+    Nodo('margen_bruto', lambda u: u[2], ('utilidades',)),
+    Nodo('margen_operativo', lambda u: u[3], ('utilidades',)),
+)
+
+
+def _iguales(a, b):
+    if isinstance(a, pd.DataFrame) or isinstance(b, pd.DataFrame):
+        return isinstance(a, pd.DataFrame) and isinstance(b, pd.DataFrame) and a.equals(b)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+def _orden_topologico(nodos):
+    pendientes = {n.nombre: {d for d in n.dependencias if d in nodos} for n in nodos.values()}
+    orden = []
+    while pendientes:
+        listos = [nombre for nombre, deps in pendientes.items() if not deps]
+        if not listos:
+            raise ValueError(f"El grafo tiene un ciclo entre: {sorted(pendientes)}")
+        for nombre in listos:
+            orden.append(nombre)
+            del pendientes[nombre]
+        for deps in pendientes.values():
+            deps.difference_update(listos)
+    return tuple(orden)
+
+
+class GrafoPresupuesto:
+    """Presupuesto maestro que sólo recalcula los nodos afectados por cada cambio."""
+
+    def __init__(self, nodos=NODOS):
+        self.nodos = {n.nombre: n for n in nodos}
+        desconocidas = {d for n in nodos for d in n.dependencias} - set(self.nodos) - set(CAMPOS_ENTRADA)
+        if desconocidas:
+            raise ValueError(f"Dependencias desconocidas: {sorted(desconocidas)}")
+        self.orden = _orden_topologico(self.nodos)
+        self.entradas = None
+        self.valores = {}
+        # Nodos evaluados y nodos cuyo valor cambió en la última actualización
+        self.recalculados = ()
+        self.cambiados = ()
+
+    def dependientes(self, nombre):
+        """Nodos que dependen, directa o indirectamente, de un campo o nodo."""
+        alcanzados = {nombre}
+        for n in self.orden:
+            if alcanzados.intersection(self.nodos[n].dependencias):
+                alcanzados.add(n)
+        alcanzados.discard(nombre)
+        return [n for n in self.orden if n in alcanzados]
+
+    def actualizar(self, entradas):
+        """Lleva el grafo a ``entradas`` y regresa el ``ResultadoPresupuesto``."""
+        if self.entradas is None:
+            sucios = set(CAMPOS_ENTRADA)
+        else:
+            sucios = {c for c in CAMPOS_ENTRADA if not _iguales(getattr(entradas, c), getattr(self.entradas, c))}
+        self.entradas = entradas
+
+        recalculados, cambiados = [], []
+        for nombre in self.orden:
+            nodo = self.nodos[nombre]
+            if not sucios.intersection(nodo.dependencias):
+                continue
+            argumentos = (self.valores[d] if d in self.nodos else getattr(entradas, d) for d in nodo.dependencias)
+            valor = nodo.funcion(*argumentos)
+            recalculados.append(nombre)
+            if nombre not in self.valores or not _iguales(valor, self.valores[nombre]):
+                # Sólo un valor distinto propaga el cambio a los dependientes
+                sucios.add(nombre)
+                cambiados.append(nombre)
+            self.valores[nombre] = valor
+        self.recalculados = tuple(recalculados)
+        self.cambiados = tuple(cambiados)
+        return self.resultado()
+
+    def resultado(self):
+        cifras = {f.name: self.valores[f.name] for f in fields(ResultadoPresupuesto)
+                  if f.name not in ('entradas', 'materiales')}
+        return ResultadoPresupuesto(entradas=self.entradas, materiales=self.valores['cedula_mp'], **cifras)
@@ -0,0 +1,217 @@
+"""Kardex por capas de costo para UEPS, PEPS y Promedio Ponderado móvil.
+
+``CapasCosto`` lleva las capas de un artículo en un ``deque``: cada entrada
+agrega una capa al final y cada salida consume capas desde el frente (PEPS)
+o desde el final (UEPS). Cada capa se agrega y se elimina una sola vez, así
+que el costo amortizado por movimiento es O(1).
+
+``valuar_movimientos`` valúa una secuencia completa de movimientos (cientos
+de miles o millones) sobre arreglos: PEPS se resuelve sin ciclo a partir de
+la curva de costo acumulado de las entradas; UEPS y Promedio recorren los
+movimientos una vez.
+
+``calcular_valuacion`` y ``costo_de_ventas`` del motor son el caso de dos
+capas (inventario inicial + una compra o lote de producción) seguido de una
+sola salida.
+"""
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from .valuacion import METODOS_VALUACION
+
+# Tolerancia para comparar existencias en punto flotante
+_EPS = 1e-9
+
+
+class ExistenciaInsuficiente(ValueError):
+    """Una salida pide más unidades de las que hay en existencia."""
+
+
+class CapasCosto:
+    """Existencia de un artículo valuada por capas."""
+
+    def __init__(self, metodo='PEPS'):
+        if metodo not in METODOS_VALUACION:
+            raise ValueError(f"Método de valuación desconocido: {metodo!r}")
+        self.metodo = metodo
+        self._capas = deque()  # [cantidad, costo_unitario]
+        self.existencia = 0.0
+        self.valor = 0.0
+
+    @property
+    def costo_promedio(self):
+        return self.valor / self.existencia if self.existencia > _EPS else 0.0
+
+    @property
+    def capas(self):
+        """Capas vigentes como tuplas ``(cantidad, costo_unitario)``, de la más antigua a la más reciente."""
+        if self.metodo == 'Promedio Ponderado':
+            return [(self.existencia, self.costo_promedio)] if self.existencia > _EPS else []
+        return [tuple(c) for c in self._capas]
+
+    def entrada(self, cantidad, costo_unitario):
+        if cantidad < 0:
+            raise ValueError("La cantidad de una entrada no puede ser negativa")
+        if cantidad == 0:
+            return
+        self.existencia += cantidad
+        self.valor += cantidad * costo_unitario
+        if self.metodo != 'Promedio Ponderado':
+            self._capas.append([cantidad, costo_unitario])
+
+    def salida(self, cantidad):
+        """Registra una salida y regresa su costo."""
+        if cantidad < 0:
+            raise ValueError("La cantidad de una salida no puede ser negativa")
+        if cantidad > self.existencia + _EPS:
+            raise ExistenciaInsuficiente(
+                f"Salida de {cantidad:,.2f} con existencia de {self.existencia:,.2f}"
+            )
+
+        if self.metodo == 'Promedio Ponderado':
+            costo = cantidad * self.costo_promedio
+        else:
+            # PEPS consume desde el frente; UEPS desde el final
+            tomar = self._capas.popleft if self.metodo == 'PEPS' else self._capas.pop
+            devolver = self._capas.appendleft if self.metodo == 'PEPS' else self._capas.append
+            costo = 0.0
+            pendiente = cantidad
+            while pendiente > _EPS and self._capas:
+                capa = tomar()
+                usado = min(capa[0], pendiente)
+                costo += usado * capa[1]
+                pendiente -= usado
+                if capa[0] - usado > _EPS:
+                    capa[0] -= usado
+                    devolver(capa)
+
+        self.existencia -= cantidad
+        self.valor -= costo
+        if self.existencia <= _EPS:
+            self.existencia = self.valor = 0.0
+        return costo
+
+
+@dataclass(frozen=True)
+class ResultadoKardex:
+    """Valuación de una secuencia de movimientos, un elemento por movimiento."""
+
+    costo_salida: np.ndarray  # costo de cada salida (0 en entradas)
+    existencia: np.ndarray  # existencia después del movimiento
+    valor: np.ndarray  # valor del inventario después del movimiento
+
+    @property
+    def costo_total_salidas(self):
+        return float(self.costo_salida.sum())
+
+
+def _validar_existencia(existencia, cantidades):
+    faltantes = np.flatnonzero(existencia < -_EPS * np.maximum(1.0, np.abs(cantidades)))
+    if faltantes.size:
+        i = faltantes[0]
+        raise ExistenciaInsuficiente(f"El movimiento {i} deja la existencia en {existencia[i]:,.2f}")
+
+
+def _peps(cantidades, costos, existencia_inicial, costo_inicial, existencia):
+    # Curva de costo acumulado de todas las entradas, en orden de llegada.
+    # Con existencia no negativa, lo salido hasta el movimiento t son siempre
+    # las primeras S_t unidades de esa curva, sin importar entradas posteriores.
+    es_entrada = cantidades > 0
+    cant_entradas = np.concatenate(([existencia_inicial], cantidades[es_entrada]))
+    valor_entradas = np.concatenate(([existencia_inicial * costo_inicial],
+                                     cantidades[es_entrada] * costos[es_entrada]))
+    eje_cantidad = np.concatenate(([0.0], np.cumsum(cant_entradas)))
+    eje_valor = np.concatenate(([0.0], np.cumsum(valor_entradas)))
+
+    salido = np.cumsum(np.where(es_entrada, 0.0, -cantidades))
+    costo_acumulado = np.interp(salido, eje_cantidad, eje_valor)
+    costo_salida = np.diff(costo_acumulado, prepend=0.0)
+    costo_salida[es_entrada] = 0.0
+
+    entrado = existencia_inicial * costo_inicial + np.cumsum(np.where(es_entrada, cantidades * costos, 0.0))
+    valor = entrado - costo_acumulado
+    valor[existencia <= _EPS] = 0.0
+    return costo_salida, valor
+
+
+def _ueps(cantidades, costos, existencia_inicial, costo_inicial):
+    n = len(cantidades)
+    costo_salida = np.zeros(n)
+    valor = np.empty(n)
+    # Pila de capas en dos listas paralelas; el tope es la capa más reciente
+    pila_cant = [existencia_inicial] if existencia_inicial > 0 else []
+    pila_costo = [costo_inicial] if existencia_inicial > 0 else []
+    v = existencia_inicial * costo_inicial
+    for i, (q, c) in enumerate(zip(cantidades.tolist(), costos.tolist())):
+        if q > 0:
+            pila_cant.append(q)
+            pila_costo.append(c)
+            v += q * c
+        elif q < 0:
+            pendiente = -q
+            costo = 0.0
+            while pendiente > _EPS:
+                if not pila_cant:
+                    raise ExistenciaInsuficiente(f"El movimiento {i} deja la existencia negativa")
+                tope = pila_cant[-1]
+                if tope <= pendiente + _EPS:
+                    costo += tope * pila_costo[-1]
+                    pendiente -= tope
+                    pila_cant.pop()
+                    pila_costo.pop()
+                else:
+                    costo += pendiente * pila_costo[-1]
+                    pila_cant[-1] = tope - pendiente
+                    pendiente = 0.0
+            costo_salida[i] = costo
+            v = v - costo if pila_cant else 0.0
+        valor[i] = v
+    return costo_salida, valor
+
+
+def _promedio(cantidades, costos, existencia_inicial, costo_inicial):
+    n = len(cantidades)
+    costo_salida = np.zeros(n)
+    valor = np.empty(n)
+    s = existencia_inicial
+    v = existencia_inicial * costo_inicial
+    for i, (q, c) in enumerate(zip(cantidades.tolist(), costos.tolist())):
+        if q > 0:
+            s += q
+            v += q * c
+        elif q < 0:
+            if -q > s + _EPS:
+                raise ExistenciaInsuficiente(f"El movimiento {i} deja la existencia negativa")
+            costo = -q * v / s
+            costo_salida[i] = costo
+            s += q
+            v = v - costo if s > _EPS else 0.0
+        valor[i] = v
+    return costo_salida, valor
+
+
+def valuar_movimientos(cantidades, costos_unitarios, metodo, existencia_inicial=0.0, costo_inicial=0.0):
+    """Valúa una secuencia de movimientos de un artículo.
+
+    ``cantidades`` son positivas para entradas y negativas para salidas;
+    ``costos_unitarios`` sólo se usa en las entradas. Regresa un
+    ``ResultadoKardex`` con el costo de cada salida y la existencia y el
+    valor después de cada movimiento.
+    """
+    if metodo not in METODOS_VALUACION:
+        raise ValueError(f"Método de valuación desconocido: {metodo!r}")
+    cantidades = np.asarray(cantidades, dtype=float)
+    costos = np.broadcast_to(np.asarray(costos_unitarios, dtype=float), cantidades.shape)
+
+    existencia = existencia_inicial + np.cumsum(cantidades)
+    _validar_existencia(existencia, cantidades)
+
+    if metodo == 'PEPS':
+        costo_salida, valor = _peps(cantidades, costos, existencia_inicial, costo_inicial, existencia)
+    elif metodo == 'UEPS':
+        costo_salida, valor = _ueps(cantidades, costos, existencia_inicial, costo_inicial)
+    else:
+        costo_salida, valor = _promedio(cantidades, costos, existencia_inicial, costo_inicial)
+    return ResultadoKardex(costo_salida=costo_salida, existencia=existencia, valor=valor)
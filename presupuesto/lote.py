@@ -0,0 +1,114 @@
+"""Evaluación vectorizada del presupuesto maestro para muchos escenarios.
+
+Cada entrada de ``EntradasPresupuesto`` puede ser un escalar o un arreglo;
+todos se combinan por *broadcasting* y la cadena completa se evalúa con
+operaciones de NumPy. Las ramas UEPS/PEPS/Promedio se resuelven con
+``np.where``/``np.select`` en lugar de un ``if`` por escenario.
+"""
+import numpy as np
+import pandas as pd
+
+from .bom import ListaMateriales
+from .motor import CAMPOS_NUMERICOS, EntradasPresupuesto
+from .valuacion import _dividir, codificar_metodos, valuacion_vectorizada
+
+# Columnas de salida, en el mismo orden que ResultadoPresupuesto
+CAMPOS_RESULTADO = (
+    'ingresos', 'prod_unidades',
+    'req_total_a', 'req_total_b', 'compras_uni_a', 'compras_uni_b',
+    'costo_compras_a', 'costo_compras_b', 'costo_consumo_a', 'costo_consumo_b',
+    'costo_inv_final_a', 'costo_inv_final_b', 'cant_inv_final_a', 'cant_inv_final_b',
+    'mp_total', 'total_horas', 'costo_mod', 'total_gif',
+    'costo_produccion_total', 'costo_unitario',
+    'total_disponible_pt', 'valor_inv_inicial_pt', 'valor_produccion', 'valor_total_disponible',
+    'costo_ventas', 'valor_inv_final_pt',
+    'total_gastos_op', 'utilidad_bruta', 'utilidad_operativa', 'margen_bruto', 'margen_operativo',
+)
+
+
+def evaluar_arrays(columnas, base=None):
+    """Evalúa la cadena completa sobre columnas de escenarios.
+
+    ``columnas`` es un mapeo campo -> escalar o arreglo (cualquier forma
+    compatible por broadcasting). Los campos ausentes se toman de ``base``
+    (por omisión, los valores de la UI). Regresa un ``dict`` campo -> arreglo.
+    """
+    base = base or EntradasPresupuesto()
+    desconocidos = set(columnas) - set(CAMPOS_NUMERICOS) - {'metodo_valuacion'}
+    if desconocidos:
+        raise KeyError(f"Campos desconocidos: {sorted(desconocidos)}")
+
+    e = {c: np.asarray(columnas.get(c, getattr(base, c)), dtype=float) for c in CAMPOS_NUMERICOS}
+    metodo = codificar_metodos(columnas.get('metodo_valuacion', base.metodo_valuacion))
+
+    r = {}
+    r['ingresos'] = e['unidades'] * e['precio']
+    prod = r['prod_unidades'] = e['unidades'] + e['inv_final_pt'] - e['inv_inicial_pt']
+
+    for m in ('a', 'b'):
+        req = r[f'req_total_{m}'] = prod * e[f'std_mat_{m}']
+        compras = r[f'compras_uni_{m}'] = req + e[f'if_mat_{m}'] - e[f'ii_mat_{m}']
+        r[f'costo_compras_{m}'] = compras * e[f'costo_mat_{m}']
+        (r[f'costo_consumo_{m}'], r[f'costo_inv_final_{m}'],
+         r[f'cant_inv_final_{m}']) = valuacion_vectorizada(
+            e[f'ii_mat_{m}'], e[f'precio_ii_{m}'], compras, e[f'costo_mat_{m}'], req, metodo
+        )
+    r['mp_total'] = r['costo_consumo_a'] + r['costo_consumo_b']
+    if base.materiales_adicionales:
+        # Los materiales adicionales de la base tienen los mismos datos en todos los escenarios
+        extra = ListaMateriales.de_un_producto(base.materiales_adicionales)
+        # El eje de materiales va antes de todos los ejes de escenarios, incluido el del método
+        escenarios = np.broadcast_to(prod, np.broadcast_shapes(prod.shape, metodo.shape))
+        por_material = (-1,) + (1,) * escenarios.ndim
+        req = extra.explotar(escenarios[np.newaxis])
+        compras = req + (extra.inv_final - extra.inv_inicial).reshape(por_material)
+        consumo, _, _ = valuacion_vectorizada(
+            extra.inv_inicial.reshape(por_material), extra.precio_inicial.reshape(por_material),
+            compras, extra.precio_compra.reshape(por_material), req, metodo
+        )
+        r['mp_total'] = r['mp_total'] + consumo.sum(axis=0)
+
+    r['total_horas'] = prod * e['hrs_unit']
+    r['costo_mod'] = r['total_horas'] * e['cuota_hr']
+    r['total_gif'] = (e['mat_indirecto'] + e['moi'] + e['renta'] + e['energia']
+                      + e['mantenimiento'] + e['varios'])
+    r['costo_produccion_total'] = r['mp_total'] + r['costo_mod'] + r['total_gif']
+    r['costo_unitario'] = np.where(prod > 0, _dividir(r['costo_produccion_total'], prod), 0.0)
+
+    r['total_disponible_pt'] = e['inv_inicial_pt'] + prod
+    r['valor_inv_inicial_pt'] = e['inv_inicial_pt'] * e['precio_inv_inicial_pt']
+    r['valor_produccion'] = prod * r['costo_unitario']
+    r['valor_total_disponible'] = r['valor_inv_inicial_pt'] + r['valor_produccion']
+    # Producto terminado: mismas dos capas (inventario inicial + producción)
+    r['costo_ventas'], r['valor_inv_final_pt'], _ = valuacion_vectorizada(
+        e['inv_inicial_pt'], e['precio_inv_inicial_pt'], prod, r['costo_unitario'], e['unidades'], metodo
+    )
+
+    r['total_gastos_op'] = e['comisiones'] + e['sueldos'] + e['publicidad'] + e['servicios'] + e['diversos']
+    r['utilidad_bruta'] = r['ingresos'] - r['costo_ventas']
+    r['utilidad_operativa'] = r['utilidad_bruta'] - r['total_gastos_op']
+    positivos = r['ingresos'] > 0
+    r['margen_bruto'] = np.where(positivos, _dividir(r['utilidad_bruta'], r['ingresos']) * 100, 0.0)
+    r['margen_operativo'] = np.where(positivos, _dividir(r['utilidad_operativa'], r['ingresos']) * 100, 0.0)
+
+    forma = np.broadcast_shapes(*(v.shape for v in r.values()), metodo.shape)
+    return {c: np.broadcast_to(r[c], forma) for c in CAMPOS_RESULTADO}
+
+
+def evaluar_escenarios(escenarios, base=None):
+    """Evalúa un ``DataFrame`` (o mapeo de columnas 1-D) de escenarios.
+
+    Regresa un ``DataFrame`` con una fila por escenario y una columna por cifra
+    de ``ResultadoPresupuesto``, alineado con el índice de la entrada.
+    """
+    if isinstance(escenarios, pd.DataFrame):
+        indice = escenarios.index
+        columnas = {c: escenarios[c].to_numpy() for c in escenarios.columns}
+    else:
+        columnas = dict(escenarios)
+        indice = None
+    resultado = evaluar_arrays(columnas, base)
+    forma = next(iter(resultado.values())).shape
+    if len(forma) > 1:
+        raise ValueError("evaluar_escenarios espera columnas 1-D; use evaluar_arrays para mallas")
+    return pd.DataFrame(resultado, index=indice)
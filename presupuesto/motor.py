@@ -0,0 +1,249 @@
+"""Motor del presupuesto maestro, independiente de Streamlit.
+
+Reproduce la cadena de cálculo de ``finanzas.py``: ventas → producción →
+materiales → mano de obra → GIF → costo de producción → costo de ventas →
+estado de resultados. Cada etapa es una función pura; ``compute_master_budget``
+las encadena a partir de un único objeto de entradas.
+"""
+from dataclasses import dataclass, field, fields, replace
+
+import pandas as pd
+
+from .bom import ListaMateriales, Material
+from .valuacion import METODOS_VALUACION, calcular_valuacion
+
+
+@dataclass(frozen=True)
+class EntradasPresupuesto:
+    """Entradas del presupuesto maestro; los valores por omisión son los de la UI."""
+
+    # Tab 1: Ventas
+    unidades: float = 63000
+    precio: float = 420.0
+    # Tab 2: Producción
+    inv_final_pt: float = 6000
+    inv_inicial_pt: float = 5000
+    # Tab 3: Materiales
+    std_mat_a: float = 7.0
+    std_mat_b: float = 3.0
+    ii_mat_a: float = 40000.0
+    precio_ii_a: float = 5.0
+    if_mat_a: float = 35000.0
+    costo_mat_a: float = 6.0
+    ii_mat_b: float = 15000.0
+    precio_ii_b: float = 11.0
+    if_mat_b: float = 12000.0
+    costo_mat_b: float = 12.0
+    # Tab 4: Mano de obra
+    hrs_unit: float = 13.0
+    cuota_hr: float = 9.0
+    # Tab 5: GIF
+    mat_indirecto: float = 1320000.0
+    moi: float = 2130000.0
+    renta: float = 360000.0
+    energia: float = 464000.0
+    mantenimiento: float = 674000.0
+    varios: float = 500000.0
+    # Tab 7: Costo de ventas
+    precio_inv_inicial_pt: float = 250.0
+    # Tab 8: Gastos de operación
+    comisiones: float = 2750000.0
+    sueldos: float = 1820000.0
+    publicidad: float = 670000.0
+    servicios: float = 580000.0
+    diversos: float = 1200000.0
+    # Materiales directos además de A y B (tupla de ``bom.Material``)
+    materiales_adicionales: tuple = ()
+    # Configuración
+    metodo_valuacion: str = 'UEPS'
+
+    def __post_init__(self):
+        if self.metodo_valuacion not in METODOS_VALUACION:
+            raise ValueError(f"Método de valuación desconocido: {self.metodo_valuacion!r}")
+
+    def con(self, **cambios):
+        """Copia de las entradas con los campos indicados reemplazados."""
+        return replace(self, **cambios)
+
+
+# Campos numéricos en el orden de captura de la UI
+CAMPOS_NUMERICOS = tuple(
+    f.name for f in fields(EntradasPresupuesto)
+    if f.name not in ('materiales_adicionales', 'metodo_valuacion')
+)
+
+
+@dataclass(frozen=True)
+class ResultadoPresupuesto:
+    """Todas las cifras intermedias y finales del presupuesto maestro."""
+
+    entradas: EntradasPresupuesto
+    # Ventas
+    ingresos: float
+    # Producción
+    prod_unidades: float
+    # Materiales
+    req_total_a: float
+    req_total_b: float
+    compras_uni_a: float
+    compras_uni_b: float
+    costo_compras_a: float
+    costo_compras_b: float
+    costo_consumo_a: float
+    costo_consumo_b: float
+    costo_inv_final_a: float
+    costo_inv_final_b: float
+    cant_inv_final_a: float
+    cant_inv_final_b: float
+    mp_total: float
+    # Mano de obra
+    total_horas: float
+    costo_mod: float
+    # GIF
+    total_gif: float
+    # Costo de producción
+    costo_produccion_total: float
+    costo_unitario: float
+    # Costo de ventas
+    total_disponible_pt: float
+    valor_inv_inicial_pt: float
+    valor_produccion: float
+    valor_total_disponible: float
+    costo_ventas: float
+    valor_inv_final_pt: float
+    # Estado de resultados
+    total_gastos_op: float
+    utilidad_bruta: float
+    utilidad_operativa: float
+    margen_bruto: float
+    margen_operativo: float
+    # Cédula de materiales (un renglón por material, ver ``ListaMateriales.presupuestar``)
+    materiales: pd.DataFrame = field(default=None, compare=False, repr=False)
+
+    def como_dict(self):
+        datos = {f.name: getattr(self, f.name) for f in fields(self)}
+        datos.pop('entradas')
+        datos.pop('materiales')
+        return datos
+
+
+# ==================== ETAPAS ====================
+
+def presupuesto_ventas(unidades, precio):
+    return unidades * precio
+
+
+def presupuesto_produccion(ventas, inv_final, inv_inicial):
+    # Unidades a Producir = Ventas + Inv. Final - Inv. Inicial
+    return ventas + inv_final - inv_inicial
+
+
+def lista_materiales(entradas):
+    """BOM de un producto con los materiales A y B más los adicionales."""
+    e = entradas
+    materiales = (
+        Material('Material A', e.ii_mat_a, e.precio_ii_a, e.if_mat_a, e.costo_mat_a, e.std_mat_a),
+        Material('Material B', e.ii_mat_b, e.precio_ii_b, e.if_mat_b, e.costo_mat_b, e.std_mat_b),
+    ) + tuple(e.materiales_adicionales)
+    return ListaMateriales.de_un_producto(materiales)
+
+
+def presupuesto_mod(produccion, hrs_unit, cuota_hr):
+    total_horas = produccion * hrs_unit
+    return total_horas, total_horas * cuota_hr
+
+
+def presupuesto_gif(mat_indirecto, moi, renta, energia, mantenimiento, varios):
+    return mat_indirecto + moi + renta + energia + mantenimiento + varios
+
+
+def costo_produccion(mp_total, mod_total, gif_total, unidades_prod):
+    costo_total_prod = mp_total + mod_total + gif_total
+    costo_unitario = costo_total_prod / unidades_prod if unidades_prod > 0 else 0
+    return costo_total_prod, costo_unitario
+
+
+def costo_de_ventas(inv_inicial_pt, precio_inv_inicial_pt, unidades_producidas, costo_unit_prod,
+                    unidades_vendidas, metodo):
+    """Valuación de producto terminado; regresa ``(costo_ventas, valor_inv_final)``."""
+    costo_ventas, valor_inv_final, _ = calcular_valuacion(
+        inv_inicial_pt, precio_inv_inicial_pt, unidades_producidas, costo_unit_prod,
+        unidades_vendidas, metodo
+    )
+    return costo_ventas, valor_inv_final
+
+
+def gastos_operacion(comisiones, sueldos, publicidad, servicios, diversos):
+    return comisiones + sueldos + publicidad + servicios + diversos
+
+
+def estado_resultados(ingresos, costo_ventas, gastos_op):
+    utilidad_bruta = ingresos - costo_ventas
+    utilidad_operativa = utilidad_bruta - gastos_op
+    margen_bruto = (utilidad_bruta / ingresos * 100) if ingresos > 0 else 0
+    margen_operativo = (utilidad_operativa / ingresos * 100) if ingresos > 0 else 0
+    return utilidad_bruta, utilidad_operativa, margen_bruto, margen_operativo
+
+
+# ==================== PRESUPUESTO MAESTRO ====================
+
+def compute_master_budget(inputs):
+    """Calcula el presupuesto maestro completo para un ``EntradasPresupuesto``."""
+    e = inputs
+    metodo = e.metodo_valuacion
+
+    ingresos = presupuesto_ventas(e.unidades, e.precio)
+    prod_req = presupuesto_produccion(e.unidades, e.inv_final_pt, e.inv_inicial_pt)
+
+    cedula = lista_materiales(e).presupuestar([prod_req], metodo)
+    mat_a, mat_b = cedula.iloc[0], cedula.iloc[1]
+    mp_total = float(cedula['costo_consumo'].sum())
+
+    total_horas, costo_mod = presupuesto_mod(prod_req, e.hrs_unit, e.cuota_hr)
+    total_gif = presupuesto_gif(e.mat_indirecto, e.moi, e.renta, e.energia, e.mantenimiento, e.varios)
+    costo_total_prod, costo_unitario = costo_produccion(mp_total, costo_mod, total_gif, prod_req)
+
+    costo_ventas, valor_inv_final = costo_de_ventas(
+        e.inv_inicial_pt, e.precio_inv_inicial_pt, prod_req, costo_unitario, e.unidades, metodo
+    )
+
+    total_gastos_op = gastos_operacion(e.comisiones, e.sueldos, e.publicidad, e.servicios, e.diversos)
+    utilidad_bruta, utilidad_operativa, margen_bruto, margen_operativo = estado_resultados(
+        ingresos, costo_ventas, total_gastos_op
+    )
+
+    return ResultadoPresupuesto(
+        entradas=e,
+        ingresos=ingresos,
+        prod_unidades=prod_req,
+        req_total_a=float(mat_a['requerimiento']),
+        req_total_b=float(mat_b['requerimiento']),
+        compras_uni_a=float(mat_a['compras']),
+        compras_uni_b=float(mat_b['compras']),
+        costo_compras_a=float(mat_a['costo_compras']),
+        costo_compras_b=float(mat_b['costo_compras']),
+        costo_consumo_a=float(mat_a['costo_consumo']),
+        costo_consumo_b=float(mat_b['costo_consumo']),
+        costo_inv_final_a=float(mat_a['costo_inv_final']),
+        costo_inv_final_b=float(mat_b['costo_inv_final']),
+        cant_inv_final_a=float(mat_a['inv_final_cant']),
+        cant_inv_final_b=float(mat_b['inv_final_cant']),
+        mp_total=mp_total,
+        total_horas=total_horas,
+        costo_mod=costo_mod,
+        total_gif=total_gif,
+        costo_produccion_total=costo_total_prod,
+        costo_unitario=costo_unitario,
+        total_disponible_pt=e.inv_inicial_pt + prod_req,
+        valor_inv_inicial_pt=e.inv_inicial_pt * e.precio_inv_inicial_pt,
+        valor_produccion=prod_req * costo_unitario,
+        valor_total_disponible=e.inv_inicial_pt * e.precio_inv_inicial_pt + prod_req * costo_unitario,
+        costo_ventas=costo_ventas,
+        valor_inv_final_pt=valor_inv_final,
+        total_gastos_op=total_gastos_op,
+        utilidad_bruta=utilidad_bruta,
+        utilidad_operativa=utilidad_operativa,
+        margen_bruto=margen_bruto,
+        margen_operativo=margen_operativo,
+        materiales=cedula,
+    )
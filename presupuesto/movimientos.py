@@ -0,0 +1,243 @@
+"""Historial de movimientos de inventario en disco para consultar kardex grandes.
+
+``construir_historial`` valúa un archivo de movimientos (uno o muchos
+artículos, millones de renglones) con ``valuar_movimientos`` y lo guarda en
+formato Arrow IPC, ordenado por artículo y secuencia. ``HistorialKardex``
+abre ese archivo con *memory map*: no se carga en memoria, y cada consulta
+lee sólo la ventana de renglones que se muestra.
+
+Cada artículo ocupa un tramo contiguo del archivo, así que filtrar por
+artículo es un corte sin copia. Los filtros por tipo de movimiento y el
+ordenamiento se resuelven con ``pyarrow.compute`` sobre una sola columna y
+se guardan como arreglo de posiciones para paginar sin repetirlos.
+
+Los archivos cargados se guardan con ``guardar_movimientos`` por su huella;
+la carpeta tiene un techo (``PRESUPUESTO_KARDEX_MB``) y al rebasarlo se
+borran los archivos menos usados junto con sus historiales.
+"""
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .archivos import TAMANO_BLOQUE, leer_bloques
+from .cache import DIRECTORIO_DISCO, huella
+from .kardex import valuar_movimientos
+from .valuacion import METODOS_VALUACION
+
+# Archivos de movimientos cargados y sus historiales; la caché en disco no los desaloja
+DIRECTORIO_HISTORIALES = DIRECTORIO_DISCO / 'kardex'
+# Techo de esa carpeta, en MB
+HISTORIALES_MB = float(os.environ.get('PRESUPUESTO_KARDEX_MB', 1024))
+COLUMNAS_MOVIMIENTO = ('articulo', 'cantidad', 'costo_unitario')
+COLUMNAS_KARDEX = ('secuencia', 'articulo', 'cantidad', 'costo_unitario', 'costo_salida', 'existencia', 'valor')
+TIPOS_MOVIMIENTO = ('Entradas', 'Salidas')
+# Renglones por record batch del archivo: una ventana toca pocos batches
+RENGLONES_BATCH = 65_536
+# Consultas (filtro + orden) cuyas posiciones se conservan para paginar
+CONSULTAS_EN_MEMORIA = 8
+
+
+def construir_historial(fuente, destino, metodo, tamano_bloque=TAMANO_BLOQUE):
+    """Valúa los movimientos de ``fuente`` y escribe el historial en ``destino``.
+
+    ``fuente`` es una ruta, un archivo abierto o un ``DataFrame`` con
+    columnas ``articulo``, ``cantidad`` (positiva en entradas, negativa en
+    salidas), ``costo_unitario`` y opcionalmente ``fecha``. Regresa el
+    número de movimientos.
+    """
+    if metodo not in METODOS_VALUACION:
+        raise ValueError(f"Método de valuación desconocido: {metodo!r}")
+    bloques = [fuente] if isinstance(fuente, pd.DataFrame) else leer_bloques(fuente, tamano_bloque)
+    partes = []
+    for bloque in bloques:
+        faltantes = set(COLUMNAS_MOVIMIENTO) - set(bloque.columns)
+        if faltantes:
+            raise KeyError(f"Faltan columnas en los movimientos: {sorted(faltantes)}")
+        columnas = [*COLUMNAS_MOVIMIENTO, *(['fecha'] if 'fecha' in bloque.columns else [])]
+        partes.append(pa.Table.from_pandas(
+            bloque[columnas].astype({'articulo': str, 'cantidad': float, 'costo_unitario': float}),
+            preserve_index=False,
+        ))
+    if not partes:
+        raise ValueError("El archivo de movimientos está vacío")
+    tabla = pa.concat_tables(partes, promote_options='default')
+    tabla = tabla.append_column('secuencia', pa.array(np.arange(len(tabla))))
+    tabla = tabla.take(pc.sort_indices(tabla, [('articulo', 'ascending'), ('secuencia', 'ascending')]))
+
+    cantidades = tabla['cantidad'].to_numpy()
+    costos = tabla['costo_unitario'].to_numpy()
+    costo_salida, existencia, valor = (np.empty(len(tabla)) for _ in range(3))
+    inicio = 0
+    for largo in pc.value_counts(tabla['articulo']).field('counts').to_numpy():
+        tramo = slice(inicio, inicio + largo)
+        r = valuar_movimientos(cantidades[tramo], costos[tramo], metodo)
+        costo_salida[tramo], existencia[tramo], valor[tramo] = r.costo_salida, r.existencia, r.valor
+        inicio += largo
+    for nombre, datos in (('costo_salida', costo_salida), ('existencia', existencia), ('valor', valor)):
+        tabla = tabla.append_column(nombre, pa.array(datos))
+    extra = [c for c in tabla.column_names if c not in COLUMNAS_KARDEX]
+    tabla = tabla.select([*COLUMNAS_KARDEX, *extra]).replace_schema_metadata({'metodo': metodo})
+
+    # Se escribe aparte y se renombra: otra sesión nunca abre un archivo a medias
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_name(f'.{destino.name}.{uuid.uuid4().hex}')
+    with pa.OSFile(str(temporal), 'wb') as archivo, pa.ipc.new_file(archivo, tabla.schema) as escritor:
+        escritor.write_table(tabla, max_chunksize=RENGLONES_BATCH)
+    temporal.replace(destino)
+    return len(tabla)
+
+
+_CANDADO_HISTORIALES = threading.Lock()
+
+
+def guardar_movimientos(contenido, extension, directorio=DIRECTORIO_HISTORIALES, max_mb=HISTORIALES_MB):
+    """Guarda el contenido de un archivo de movimientos por su huella y regresa la ruta.
+
+    Si la carpeta rebasa ``max_mb`` se borran los archivos menos usados con sus
+    historiales; el archivo recién guardado nunca se borra.
+    """
+    directorio = Path(directorio)
+    fuente = directorio / f"{huella(contenido)}{extension.lower()}"
+    with _CANDADO_HISTORIALES:
+        if fuente.exists():
+            # La fecha de modificación marca el último uso
+            os.utime(fuente)
+        else:
+            directorio.mkdir(parents=True, exist_ok=True)
+            temporal = fuente.with_name(f'.{fuente.name}.{uuid.uuid4().hex}')
+            temporal.write_bytes(contenido)
+            temporal.replace(fuente)
+    desalojar_movimientos(directorio, int(max_mb * 1024 * 1024), conservar=fuente)
+    return fuente
+
+
+def desalojar_movimientos(directorio, max_bytes, conservar=None):
+    """Borra los archivos cargados menos usados, con sus historiales, hasta quedar debajo del techo.
+
+    Un archivo y sus historiales (``<huella>.csv``, ``<huella>.0.arrow``, ...)
+    se borran juntos; regresa cuántos archivos cargados se borraron.
+    """
+    directorio = Path(directorio)
+    protegido = Path(conservar).name.split('.')[0] if conservar else None
+    with _CANDADO_HISTORIALES:
+        grupos = {}
+        for archivo in directorio.glob('[!.]*'):
+            try:
+                datos = archivo.stat()
+            except OSError:
+                continue
+            clave = archivo.name.split('.')[0]
+            uso, peso = grupos.get(clave, (0.0, 0))
+            grupos[clave] = (max(uso, datos.st_mtime), peso + datos.st_size)
+        total = sum(peso for _, peso in grupos.values())
+        borrados = 0
+        for clave, (_, peso) in sorted(grupos.items(), key=lambda grupo: grupo[1][0]):
+            if total <= max_bytes:
+                break
+            if clave == protegido:
+                continue
+            # Los historiales abiertos con memory map siguen siendo legibles después de borrarlos
+            for archivo in directorio.glob(f'{clave}.*'):
+                archivo.unlink(missing_ok=True)
+            total -= peso
+            borrados += 1
+    return borrados
+
+
+class HistorialKardex:
+    """Kardex de un archivo Arrow abierto con *memory map*, consultado por ventanas."""
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.tabla = pa.ipc.open_file(pa.memory_map(str(self.ruta))).read_all()
+        self.metodo = self.tabla.schema.metadata[b'metodo'].decode()
+        conteo = pc.value_counts(self.tabla['articulo'])
+        largos = conteo.field('counts').to_numpy()
+        inicios = np.concatenate(([0], np.cumsum(largos)[:-1]))
+        # Tramo contiguo de cada artículo: (inicio, largo)
+        self.tramos = dict(zip(conteo.field('values').to_pylist(), zip(inicios.tolist(), largos.tolist())))
+        self._consultas = OrderedDict()
+        self._candado = threading.Lock()
+
+    def __len__(self):
+        return len(self.tabla)
+
+    @property
+    def articulos(self):
+        return list(self.tramos)
+
+    def _articulo(self, articulo):
+        if articulo is None:
+            return self.tabla
+        if articulo not in self.tramos:
+            raise KeyError(f"Artículo desconocido: {articulo!r}")
+        return self.tabla.slice(*self.tramos[articulo])
+
+    def _posiciones(self, articulo, tipo, orden, descendente):
+        # Posiciones (dentro del tramo del artículo) que cumplen el filtro, en el orden pedido.
+        # None significa "todas, en el orden del archivo" y no requiere arreglo.
+        llave = (articulo, tipo, orden, descendente)
+        with self._candado:
+            if llave in self._consultas:
+                self._consultas.move_to_end(llave)
+                return self._consultas[llave]
+        tabla = self._articulo(articulo)
+        posiciones = None
+        if tipo is not None:
+            if tipo not in TIPOS_MOVIMIENTO:
+                raise ValueError(f"Tipo de movimiento desconocido: {tipo!r}")
+            comparar = pc.greater if tipo == 'Entradas' else pc.less
+            posiciones = pc.indices_nonzero(comparar(tabla['cantidad'], 0))
+        if orden is not None and (orden != 'secuencia' or descendente):
+            columna = tabla[orden] if posiciones is None else tabla[orden].take(posiciones)
+            ordenado = pc.array_sort_indices(columna, order='descending' if descendente else 'ascending')
+            posiciones = ordenado if posiciones is None else posiciones.take(ordenado)
+        with self._candado:
+            self._consultas[llave] = posiciones
+            while len(self._consultas) > CONSULTAS_EN_MEMORIA:
+                self._consultas.popitem(last=False)
+        return posiciones
+
+    def contar(self, articulo=None, tipo=None):
+        posiciones = self._posiciones(articulo, tipo, None, False)
+        return len(self._articulo(articulo)) if posiciones is None else len(posiciones)
+
+    def ventana(self, inicio=0, filas=100, articulo=None, tipo=None, orden=None, descendente=False):
+        """Regresa ``(DataFrame, total)``: los renglones ``inicio:inicio + filas`` de la consulta.
+
+        ``tipo`` filtra ``'Entradas'`` o ``'Salidas'``; ``orden`` es el
+        nombre de una columna. Sólo se leen del archivo los renglones de la
+        ventana.
+        """
+        tabla = self._articulo(articulo)
+        posiciones = self._posiciones(articulo, tipo, orden, descendente)
+        if posiciones is None:
+            total = len(tabla)
+            vista = tabla.slice(inicio, filas)
+        else:
+            total = len(posiciones)
+            vista = tabla.take(posiciones.slice(inicio, filas))
+        return vista.to_pandas(), total
+
+    def resumen(self, articulo=None):
+        """Totales del artículo (o de todo el historial) sin pasar por pandas."""
+        tabla = self._articulo(articulo)
+        cantidad = tabla['cantidad']
+        resumen = {
+            'movimientos': len(tabla),
+            'entradas': pc.sum(pc.if_else(pc.greater(cantidad, 0), cantidad, 0.0)).as_py() or 0.0,
+            'salidas': -(pc.sum(pc.if_else(pc.less(cantidad, 0), cantidad, 0.0)).as_py() or 0.0),
+            'costo_salidas': pc.sum(tabla['costo_salida']).as_py() or 0.0,
+        }
+        if articulo is not None and len(tabla):
+            resumen['existencia'] = tabla['existencia'][-1].as_py()
+            resumen['valor'] = tabla['valor'][-1].as_py()
+        return resumen
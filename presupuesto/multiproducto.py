@@ -0,0 +1,146 @@
+"""Presupuesto maestro de varios productos (SKU) calculado por columnas.
+
+Ventas, producción, mano de obra y costo de ventas se calculan sobre una
+tabla con un renglón por SKU; los materiales se explotan con la
+``ListaMateriales`` y sus costos regresan a cada SKU con ``BOMᵀ``. Los GIF
+se prorratean entre SKU según las horas de MOD. Los totales alimentan el
+mismo estado de resultados del presupuesto de un producto.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .bom import ListaMateriales, Material
+from .motor import EntradasPresupuesto, estado_resultados, lista_materiales
+from .valuacion import _dividir, codificar_metodos, valuacion_vectorizada
+
+# Columnas por SKU; las opcionales se toman de las entradas generales si faltan
+COLUMNAS_PRODUCTO = ('unidades', 'precio', 'inv_final_pt', 'inv_inicial_pt', 'hrs_unit', 'precio_inv_inicial_pt')
+COLUMNAS_OPCIONALES = ('cuota_hr',)
+COLUMNAS_MATERIAL = ('inv_inicial', 'precio_inicial', 'inv_final', 'precio_compra')
+
+
+@dataclass(frozen=True)
+class ResultadoMultiproducto:
+    """Cédulas por SKU y por material más el estado de resultados consolidado."""
+
+    productos: pd.DataFrame
+    materiales: pd.DataFrame
+    ingresos: float
+    costo_ventas: float
+    total_gastos_op: float
+    total_gif: float
+    utilidad_bruta: float
+    utilidad_operativa: float
+    margen_bruto: float
+    margen_operativo: float
+
+
+def materiales_desde_tabla(tabla):
+    """Catálogo de ``Material`` desde un ``DataFrame`` con columna ``material``."""
+    faltantes = set(('material',) + COLUMNAS_MATERIAL) - set(tabla.columns)
+    if faltantes:
+        raise KeyError(f"Faltan columnas en el catálogo de materiales: {sorted(faltantes)}")
+    columnas = tabla[['material', *COLUMNAS_MATERIAL]].rename(columns={'material': 'nombre'})
+    return tuple(Material(**fila) for fila in columnas.to_dict('records'))
+
+
+def catalogo_desde_entradas(entradas):
+    """Tabla de un SKU y su BOM a partir de las entradas del presupuesto de un producto."""
+    productos = pd.DataFrame(
+        {c: [getattr(entradas, c)] for c in COLUMNAS_PRODUCTO + COLUMNAS_OPCIONALES},
+        index=pd.Index(['PT'], name='sku'),
+    )
+    return productos, lista_materiales(entradas)
+
+
+def presupuesto_multiproducto(productos, bom, entradas=None):
+    """Calcula el presupuesto de todos los SKU en una sola pasada.
+
+    ``productos`` tiene un renglón por SKU (el índice es la clave del SKU, en
+    el mismo orden que ``bom.productos``) y las columnas ``COLUMNAS_PRODUCTO``.
+    ``entradas`` aporta la tarifa de MOD, los GIF, los gastos de operación y el
+    método de valuación comunes a todos los SKU.
+    """
+    e = entradas or EntradasPresupuesto()
+    faltantes = set(COLUMNAS_PRODUCTO) - set(productos.columns)
+    if faltantes:
+        raise KeyError(f"Faltan columnas en la tabla de productos: {sorted(faltantes)}")
+    if list(productos.index) != list(bom.productos):
+        productos = productos.reindex(bom.productos)
+        if productos[list(COLUMNAS_PRODUCTO)].isna().any().any():
+            raise KeyError("La BOM tiene productos que no están en la tabla de productos")
+
+    col = {c: productos[c].to_numpy(dtype=float) for c in COLUMNAS_PRODUCTO}
+    cuota_hr = (productos['cuota_hr'].to_numpy(dtype=float) if 'cuota_hr' in productos
+                else np.full(len(productos), float(e.cuota_hr)))
+    metodo = codificar_metodos(e.metodo_valuacion)
+
+    # Ventas y producción
+    ingresos = col['unidades'] * col['precio']
+    prod = col['unidades'] + col['inv_final_pt'] - col['inv_inicial_pt']
+
+    # Materiales: explosión de la BOM y costo por pieza consumida de regreso a cada SKU
+    cedula_mp = bom.presupuestar(prod, e.metodo_valuacion)
+    costo_pieza = _dividir(cedula_mp['costo_consumo'].to_numpy(), cedula_mp['requerimiento'].to_numpy())
+    costo_mp = prod * bom.costo_por_producto(costo_pieza)
+
+    # Mano de obra y GIF prorrateados por horas
+    horas = prod * col['hrs_unit']
+    costo_mod = horas * cuota_hr
+    total_gif = e.mat_indirecto + e.moi + e.renta + e.energia + e.mantenimiento + e.varios
+    gif = total_gif * _dividir(horas, horas.sum())
+
+    costo_total = costo_mp + costo_mod + gif
+    costo_unitario = np.where(prod > 0, _dividir(costo_total, prod), 0.0)
+
+    # Costo de ventas: dos capas por SKU (inventario inicial + producción)
+    costo_ventas, valor_inv_final, _ = valuacion_vectorizada(
+        col['inv_inicial_pt'], col['precio_inv_inicial_pt'], prod, costo_unitario, col['unidades'], metodo
+    )
+
+    tabla = pd.DataFrame({
+        'unidades': col['unidades'],
+        'ingresos': ingresos,
+        'prod_unidades': prod,
+        'costo_mp': costo_mp,
+        'total_horas': horas,
+        'costo_mod': costo_mod,
+        'gif_asignado': gif,
+        'costo_produccion_total': costo_total,
+        'costo_unitario': costo_unitario,
+        'costo_ventas': costo_ventas,
+        'valor_inv_final_pt': valor_inv_final,
+        'utilidad_bruta': ingresos - costo_ventas,
+    }, index=productos.index)
+
+    total_ingresos = float(ingresos.sum())
+    total_costo_ventas = float(costo_ventas.sum())
+    total_gastos_op = e.comisiones + e.sueldos + e.publicidad + e.servicios + e.diversos
+    utilidad_bruta, utilidad_operativa, margen_bruto, margen_operativo = estado_resultados(
+        total_ingresos, total_costo_ventas, total_gastos_op
+    )
+    return ResultadoMultiproducto(
+        productos=tabla,
+        materiales=cedula_mp,
+        ingresos=total_ingresos,
+        costo_ventas=total_costo_ventas,
+        total_gastos_op=total_gastos_op,
+        total_gif=total_gif,
+        utilidad_bruta=utilidad_bruta,
+        utilidad_operativa=utilidad_operativa,
+        margen_bruto=margen_bruto,
+        margen_operativo=margen_operativo,
+    )
+
+
+def cargar_catalogo(productos, materiales, componentes):
+    """Arma la tabla de productos y la BOM desde tres tablas planas.
+
+    ``productos`` tiene columna ``sku``; ``materiales`` columna ``material``;
+    ``componentes`` columnas ``material``, ``producto`` y ``cantidad``.
+    """
+    productos = productos.set_index('sku')
+    bom = ListaMateriales.desde_tabla(materiales_desde_tabla(materiales), componentes, productos.index)
+    return productos, bom
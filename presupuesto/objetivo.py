@@ -0,0 +1,127 @@
+"""Búsqueda de objetivo y punto de equilibrio sobre la cadena del presupuesto.
+
+Resuelve preguntas como "¿qué precio da 20 % de margen operativo?" o "¿cuántas
+unidades dejan la utilidad operativa en cero?" para muchos objetivos a la vez
+(uno por SKU, por método de valuación, por meta...).
+
+* Precios, costos, tarifas, GIF y gastos entran de forma afín a toda la
+  cadena (las ramas de valuación sólo dependen de cantidades), así que se
+  despejan en forma cerrada con dos evaluaciones.
+* Unidades, inventarios y consumos estándar cambian la producción y con ella
+  la rama de valuación; se resuelven con falsa posición (variante Illinois)
+  sobre un intervalo, vectorizada sobre todos los objetivos.
+"""
+import numpy as np
+
+from .lote import CAMPOS_RESULTADO, evaluar_arrays
+from .motor import CAMPOS_NUMERICOS, EntradasPresupuesto
+
+# Campos en los que todas las cifras del presupuesto son afines
+CAMPOS_LINEALES = (
+    'precio', 'precio_ii_a', 'costo_mat_a', 'precio_ii_b', 'costo_mat_b', 'hrs_unit', 'cuota_hr',
+    'mat_indirecto', 'moi', 'renta', 'energia', 'mantenimiento', 'varios', 'precio_inv_inicial_pt',
+    'comisiones', 'sueldos', 'publicidad', 'servicios', 'diversos',
+)
+# Márgenes: utilidad / ingresos × 100
+MARGENES = {'margen_bruto': 'utilidad_bruta', 'margen_operativo': 'utilidad_operativa'}
+
+MAX_ITERACIONES = 100
+AMPLIACIONES = 20
+
+
+def _forma_lineal(campo, metrica, objetivo, columnas, base):
+    # Cada cifra vale a + b·x; con márgenes se despeja a + b·x = t/100 · (c + d·x)
+    cero = evaluar_arrays({**columnas, campo: 0.0}, base)
+    uno = evaluar_arrays({**columnas, campo: 1.0}, base)
+    cifra = MARGENES.get(metrica, metrica)
+    a, b = cero[cifra], uno[cifra] - cero[cifra]
+    if metrica in MARGENES:
+        c, d = cero['ingresos'], uno['ingresos'] - cero['ingresos']
+        numerador, denominador = objetivo * c / 100 - a, b - objetivo * d / 100
+    else:
+        numerador, denominador = objetivo - a, b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominador != 0, numerador / denominador, np.nan)
+
+
+def _falsa_posicion(f, inferior, superior, tolerancia, max_iter):
+    # Amplía el intervalo hacia arriba hasta encontrar cambio de signo
+    lo, hi = inferior.copy(), superior.copy()
+    flo, fhi = f(lo), f(hi)
+    for _ in range(AMPLIACIONES):
+        sin_cambio = (np.sign(flo) == np.sign(fhi)) & (flo != 0)
+        if not sin_cambio.any():
+            break
+        ancho = hi - lo
+        lo = np.where(sin_cambio, hi, lo)
+        flo = np.where(sin_cambio, fhi, flo)
+        hi = np.where(sin_cambio, hi + 2 * ancho, hi)
+        fhi = np.where(sin_cambio, f(hi), fhi)
+    valido = (np.sign(flo) != np.sign(fhi)) | (flo == 0) | (fhi == 0)
+
+    x = np.where(flo == 0, lo, hi)
+    activo = valido & (flo != 0) & (fhi != 0)
+    lado = np.zeros(x.shape, dtype=np.int8)
+    for _ in range(max_iter):
+        if not activo.any():
+            break
+        with np.errstate(divide='ignore', invalid='ignore'):
+            nuevo = np.where(fhi != flo, (lo * fhi - hi * flo) / (fhi - flo), (lo + hi) / 2)
+        x = np.where(activo, nuevo, x)
+        fx = f(x)
+        mueve_hi = activo & (np.sign(fx) == np.sign(fhi))
+        mueve_lo = activo & ~mueve_hi
+        # Illinois: si un extremo se queda quieto dos veces seguidas se divide su valor entre dos
+        flo = np.where(mueve_hi & (lado == 1), flo / 2, flo)
+        fhi = np.where(mueve_lo & (lado == -1), fhi / 2, fhi)
+        hi, fhi = np.where(mueve_hi, x, hi), np.where(mueve_hi, fx, fhi)
+        lo, flo = np.where(mueve_lo, x, lo), np.where(mueve_lo, fx, flo)
+        lado = np.where(mueve_hi, 1, np.where(mueve_lo, -1, lado)).astype(np.int8)
+        activo &= (fx != 0) & (np.abs(hi - lo) > tolerancia * np.maximum(1.0, np.abs(x)))
+    return np.where(valido, x, np.nan)
+
+
+def buscar_objetivo(campo, metrica, objetivo, columnas=None, base=None, minimo=0.0, maximo=None,
+                    tolerancia=1e-10, max_iter=MAX_ITERACIONES):
+    """Valor de ``campo`` que lleva ``metrica`` a ``objetivo``.
+
+    ``objetivo`` y los valores de ``columnas`` (otros campos, incluido
+    ``metodo_valuacion``) pueden ser arreglos; se combinan por
+    *broadcasting* y se resuelve un problema por elemento. Regresa un
+    arreglo con la solución, o ``nan`` donde no hay una solución mayor o
+    igual a ``minimo``. ``maximo`` es el extremo inicial del intervalo de
+    búsqueda para campos no lineales (por omisión, 10 veces el valor base);
+    el intervalo se amplía si no contiene la solución.
+    """
+    base = base or EntradasPresupuesto()
+    columnas = dict(columnas or {})
+    if campo not in CAMPOS_NUMERICOS:
+        raise KeyError(f"Campo desconocido: {campo!r}")
+    if metrica not in CAMPOS_RESULTADO:
+        raise KeyError(f"Métrica desconocida: {metrica!r}")
+    if campo in columnas:
+        raise ValueError(f"{campo!r} es la incógnita; no puede ir también en columnas")
+    objetivo = np.asarray(objetivo, dtype=float)
+
+    if campo in CAMPOS_LINEALES:
+        x = _forma_lineal(campo, metrica, objetivo, columnas, base)
+        return np.where(x >= minimo, x, np.nan)
+
+    forma = np.broadcast_shapes(objetivo.shape, *(np.shape(v) for v in columnas.values()))
+    if maximo is None:
+        maximo = 10 * max(abs(getattr(base, campo)), 1.0)
+    if metrica in MARGENES:
+        # Sin ingresos el margen vale 0 por convención; se arranca justo arriba del mínimo
+        minimo = minimo + 1e-9 * (maximo - minimo)
+    inferior = np.broadcast_to(np.asarray(minimo, dtype=float), forma)
+    superior = np.broadcast_to(np.asarray(maximo, dtype=float), forma)
+
+    def f(x):
+        return evaluar_arrays({**columnas, campo: x}, base)[metrica] - objetivo
+
+    return _falsa_posicion(f, inferior, superior, tolerancia, max_iter)
+
+
+def punto_equilibrio(campo='unidades', columnas=None, base=None, **opciones):
+    """Valor de ``campo`` con utilidad operativa igual a cero."""
+    return buscar_objetivo(campo, 'utilidad_operativa', 0.0, columnas, base, **opciones)
@@ -0,0 +1,138 @@
+"""Paquetes de reportes de muchos escenarios guardados en un solo zip.
+
+    python -m presupuesto.paquetes cierre.zip --procesos 8 --formatos txt,pdf
+
+Cada escenario del almacén se calcula y se convierte en sus reportes (los
+mismos de la pestaña 8) en un pool de procesos. El zip se escribe conforme
+terminan, en orden de nombre, con a lo más unos cuantos escenarios en
+memoria a la vez; cada escenario es una carpeta dentro del zip.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .escenarios import RUTA_ESCENARIOS, AlmacenEscenarios
+from .motor import METODOS_VALUACION, EntradasPresupuesto, compute_master_budget
+from .reportes import FORMATOS_REPORTE
+
+# Nombre de cada reporte dentro de la carpeta del escenario
+ARCHIVOS_REPORTE = {
+    'txt': 'estado_resultados.txt',
+    'xlsx': 'cedulas.xlsx',
+    'pdf': 'cedulas.pdf',
+    'parquet': 'cedulas.parquet',
+}
+# Excel y Parquet ya vienen comprimidos
+_SIN_COMPRIMIR = {'xlsx', 'parquet'}
+
+
+def _carpeta(nombre):
+    # Nombre de escenario como carpeta válida en cualquier sistema
+    return re.sub(r'[^\w.-]+', '_', nombre).strip('._') or 'escenario'
+
+
+def reportes_escenario(entradas, formatos):
+    """Regresa ``{formato: bytes}`` con los reportes de un escenario."""
+    res = compute_master_budget(entradas)
+    return {formato: FORMATOS_REPORTE[formato][2](res) for formato in formatos}
+
+
+def exportar_paquete(destino, escenarios, formatos=tuple(ARCHIVOS_REPORTE), procesos=None, progreso=None):
+    """Escribe en el zip ``destino`` los reportes de ``escenarios``; regresa cuántos fueron.
+
+    ``escenarios`` es un iterable de ``(nombre, EntradasPresupuesto)``, por
+    ejemplo ``AlmacenEscenarios.iterar()``. ``progreso(hechos)`` se llama
+    después de escribir cada escenario.
+    """
+    formatos = tuple(formatos)
+    desconocidos = set(formatos) - set(ARCHIVOS_REPORTE)
+    if desconocidos:
+        raise ValueError(f"Formatos de reporte desconocidos: {sorted(desconocidos)}")
+    procesos = procesos or os.cpu_count() or 1
+    hechos = 0
+    carpetas = set()
+
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as paquete:
+        def escribir(nombre, reportes):
+            nonlocal hechos
+            carpeta = _carpeta(nombre)
+            # Dos nombres que se limpian igual no deben pisarse
+            sufijo = 1
+            while carpeta in carpetas:
+                sufijo += 1
+                carpeta = f'{_carpeta(nombre)}_{sufijo}'
+            carpetas.add(carpeta)
+            for formato, contenido in reportes.items():
+                tipo = zipfile.ZIP_STORED if formato in _SIN_COMPRIMIR else zipfile.ZIP_DEFLATED
+                paquete.writestr(f'{carpeta}/{ARCHIVOS_REPORTE[formato]}', contenido, compress_type=tipo)
+            hechos += 1
+            if progreso:
+                progreso(hechos)
+
+        if procesos == 1:
+            for nombre, entradas in escenarios:
+                escribir(nombre, reportes_escenario(entradas, formatos))
+            return hechos
+        # A lo más dos escenarios en vuelo por proceso: la memoria no crece con el paquete
+        pendientes = deque()
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            for nombre, entradas in escenarios:
+                pendientes.append((nombre, pool.submit(reportes_escenario, entradas, formatos)))
+                if len(pendientes) >= 2 * procesos:
+                    nombre, futuro = pendientes.popleft()
+                    escribir(nombre, futuro.result())
+            while pendientes:
+                nombre, futuro = pendientes.popleft()
+                escribir(nombre, futuro.result())
+    return hechos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m presupuesto.paquetes',
+        description="Genera en un zip los reportes del estado de resultados de los escenarios guardados.",
+    )
+    parser.add_argument('salida', help="Archivo .zip de salida")
+    parser.add_argument('--escenarios', default=None,
+                        help="Nombres separados por comas (por omisión, todos los guardados)")
+    parser.add_argument('--metodo', choices=METODOS_VALUACION, default=EntradasPresupuesto.metodo_valuacion,
+                        help="Método de valuación con el que se generan los reportes")
+    parser.add_argument('--formatos', default=','.join(ARCHIVOS_REPORTE),
+                        help=f"Reportes separados por comas (por omisión, {','.join(ARCHIVOS_REPORTE)})")
+    parser.add_argument('--procesos', type=int, default=None,
+                        help="Procesos del pool (por omisión, todos los núcleos)")
+    parser.add_argument('--almacen', default=RUTA_ESCENARIOS,
+                        help="Base de datos de escenarios (por omisión, la de la aplicación)")
+    args = parser.parse_args(argv)
+
+    formatos = tuple(f.strip() for f in args.formatos.split(',') if f.strip())
+    desconocidos = set(formatos) - set(ARCHIVOS_REPORTE)
+    if not formatos or desconocidos:
+        parser.error(f"Formatos desconocidos: {sorted(desconocidos)}")
+    almacen = AlmacenEscenarios(args.almacen)
+    nombres = None
+    if args.escenarios:
+        nombres = [n.strip() for n in args.escenarios.split(',') if n.strip()]
+        faltantes = set(nombres) - set(almacen.nombres())
+        if faltantes:
+            parser.error(f"Escenarios inexistentes: {sorted(faltantes)}")
+    total = len(nombres) if nombres is not None else len(almacen.nombres())
+
+    inicio = time.perf_counter()
+
+    def progreso(hechos):
+        print(f"\r{hechos:,} de {total:,} escenarios", end='', file=sys.stderr, flush=True)
+
+    hechos = exportar_paquete(args.salida, almacen.iterar(nombres, args.metodo), formatos, args.procesos, progreso)
+    print(f"\r{hechos:,} escenarios exportados en {time.perf_counter() - inicio:.1f} s -> {args.salida}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Presupuesto mensual (12, 24 o más periodos) vectorizado por periodo.
+
+Todas las cifras son arreglos con el periodo en el último eje (``SKU × T``
+para productos, ``material × T`` para materiales). El inventario final de
+cada mes es el inicial del siguiente: los saldos se obtienen con sumas
+acumuladas y la valuación entre meses (UEPS, PEPS o Promedio) se resuelve con
+operaciones acumuladas sobre la matriz de periodos, sin recorrer los meses en
+Python.
+
+Por omisión cada mes termina con el inventario final deseado de las entradas
+anuales; así, con estacionalidad plana, las unidades del año cuadran con el
+presupuesto anual.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .motor import EntradasPresupuesto
+from .multiproducto import catalogo_desde_entradas
+from .valuacion import METODOS_VALUACION, _dividir
+
+MESES_POR_ANIO = 12
+
+
+def _interp_por_renglon(x, xp, fp):
+    # np.interp sobre muchos renglones a la vez: cada renglón se desplaza a su
+    # propio tramo del eje para que la curva completa siga siendo creciente
+    renglones = xp.shape[0]
+    tramo = np.abs(xp).max() + np.abs(x).max() + 1.0
+    desplazamiento = (np.arange(renglones) * tramo)[:, None]
+    return np.interp((x + desplazamiento).ravel(), (xp + desplazamiento).ravel(),
+                     fp.ravel()).reshape(x.shape)
+
+
+def _producto_acumulado(a):
+    # G[..., k, t] = a[k+1] · a[k+2] · … · a[t] para t ≥ k (1 cuando t == k; 0 si t < k)
+    n = a.shape[-1]
+    k, t = np.indices((n, n))
+    factores = np.where(t > k, a[..., None, :], 1.0)
+    return np.where(t >= k, np.cumprod(factores, axis=-1), 0.0)
+
+
+def valuar_periodos(inv_inicial, costo_inicial, entradas, costo_entradas, salidas, metodo):
+    """Valuación de inventarios a lo largo de T periodos.
+
+    En cada periodo primero entra ``entradas`` (compras o producción, a
+    ``costo_entradas``) y después sale ``salidas``. Las entradas deben ser no
+    negativas. Regresa ``(costo_salidas, valor_final)``, ambos con la forma de
+    ``entradas``.
+    """
+    if metodo not in METODOS_VALUACION:
+        raise ValueError(f"Método de valuación desconocido: {metodo!r}")
+    entradas = np.asarray(entradas, dtype=float)
+    salidas = np.broadcast_to(np.asarray(salidas, dtype=float), entradas.shape)
+    costo_entradas = np.broadcast_to(np.asarray(costo_entradas, dtype=float), entradas.shape)
+    lote = entradas.shape[:-1]
+    ii = np.broadcast_to(np.asarray(inv_inicial, dtype=float), lote)[..., None]
+    ci = np.broadcast_to(np.asarray(costo_inicial, dtype=float), lote)[..., None]
+
+    existencia = ii + np.cumsum(entradas - salidas, axis=-1)
+    valor_entradas = entradas * costo_entradas
+
+    if metodo == 'PEPS':
+        # El inventario final son las últimas unidades recibidas: C(R_t) - C(R_t - S_t)
+        recibido = ii + np.cumsum(entradas, axis=-1)
+        valor_recibido = ii * ci + np.cumsum(valor_entradas, axis=-1)
+        eje_cant = np.concatenate((np.zeros_like(ii), ii, recibido), axis=-1)
+        eje_valor = np.concatenate((np.zeros_like(ii), ii * ci, valor_recibido), axis=-1)
+        forma = recibido.shape
+        salido = (recibido - existencia).reshape(-1, forma[-1])
+        costo_salido = _interp_por_renglon(salido, eje_cant.reshape(-1, forma[-1] + 2),
+                                           eje_valor.reshape(-1, forma[-1] + 2)).reshape(forma)
+        valor_final = valor_recibido - costo_salido
+
+    elif metodo == 'UEPS':
+        # Capa 0 = inventario inicial, capa k = entrada del periodo k. Las
+        # unidades de las capas ≤ k que quedan al cierre de t son el mínimo de
+        # la existencia entre k y t; la diferencia entre capas da su tamaño.
+        saldo = np.concatenate((ii, existencia), axis=-1)
+        costos = np.concatenate((ci, costo_entradas), axis=-1)
+        n = saldo.shape[-1]
+        k, t = np.indices((n, n))
+        minimo = np.minimum.accumulate(
+            np.where(t >= k, saldo[..., None, :], np.inf), axis=-1
+        )
+        hasta_capa = np.where(t >= k, minimo, saldo[..., None, :])
+        por_capa = np.diff(hasta_capa, axis=-2, prepend=0.0)
+        valor_final = np.einsum('...kt,...k->...t', por_capa, costos)[..., 1:]
+
+    else:  # Promedio Ponderado por periodo
+        # V_t = a_t (V_{t-1} + E_t c_t) con a_t = fracción del disponible que queda
+        disponible = np.concatenate((ii, existencia[..., :-1]), axis=-1) + entradas
+        a = _dividir(existencia, disponible)
+        a = np.concatenate((np.ones_like(ii), a), axis=-1)
+        b = np.concatenate((ii * ci, a[..., 1:] * valor_entradas), axis=-1)
+        valor_final = np.einsum('...kt,...k->...t', _producto_acumulado(a), b)[..., 1:]
+
+    valor_inicial = np.concatenate((ii * ci, valor_final[..., :-1]), axis=-1)
+    costo_salidas = valor_inicial + valor_entradas - valor_final
+    return costo_salidas, valor_final
+
+
+def distribuir_estacionalidad(estacionalidad, n_periodos):
+    """Pesos por periodo: el patrón de 12 meses se normaliza a 1 y se repite."""
+    if estacionalidad is None:
+        estacionalidad = np.ones(MESES_POR_ANIO)
+    pesos = np.asarray(estacionalidad, dtype=float)
+    if pesos.shape[-1] != MESES_POR_ANIO or (pesos < 0).any() or not (pesos.sum(axis=-1) > 0).all():
+        raise ValueError("La estacionalidad debe tener 12 pesos no negativos con suma positiva")
+    pesos = pesos / pesos.sum(axis=-1, keepdims=True)
+    repeticiones = -(-n_periodos // MESES_POR_ANIO)
+    return np.tile(pesos, repeticiones)[..., :n_periodos]
+
+
+def _por_periodo(valor, renglones, n_periodos):
+    # Escalar, un valor por renglón o una matriz renglón × periodo
+    valor = np.asarray(valor, dtype=float)
+    if valor.ndim == 1 and valor.shape[0] == renglones:
+        valor = valor[:, None]
+    return np.broadcast_to(valor, (renglones, n_periodos))
+
+
+@dataclass(frozen=True)
+class ResultadoMensual:
+    """Presupuesto por periodo; los arreglos son ``SKU × T`` o ``material × T``."""
+
+    productos: tuple
+    materiales: tuple
+    ventas: np.ndarray
+    produccion: np.ndarray
+    inv_inicial_pt: np.ndarray
+    inv_final_pt: np.ndarray
+    costo_unitario: np.ndarray
+    costo_ventas: np.ndarray
+    valor_inv_final_pt: np.ndarray
+    requerimiento_mp: np.ndarray
+    compras_mp: np.ndarray
+    inv_final_mp: np.ndarray
+    costo_consumo_mp: np.ndarray
+    valor_inv_final_mp: np.ndarray
+    por_periodo: pd.DataFrame
+
+
+def presupuesto_mensual(productos=None, bom=None, entradas=None, estacionalidad=None, n_periodos=12,
+                        inv_final_pt=None, inv_final_mp=None):
+    """Presupuesto maestro mensual para uno o varios SKU.
+
+    ``productos`` y ``bom`` siguen el formato de ``presupuesto_multiproducto``
+    (cifras anuales por SKU); si se omiten se usa el producto único de
+    ``entradas``. ``estacionalidad`` son 12 pesos (o un renglón de 12 por SKU)
+    para repartir las unidades anuales. ``inv_final_pt`` e ``inv_final_mp``
+    pueden ser un valor por SKU/material o una matriz por periodo; por
+    omisión cada mes cierra con el inventario final deseado del catálogo.
+    """
+    e = entradas or EntradasPresupuesto()
+    if productos is None or bom is None:
+        productos, bom = catalogo_desde_entradas(e)
+    productos = productos.reindex(bom.productos)
+    n_sku, n_mat, T = len(bom.productos), len(bom.materiales), n_periodos
+    metodo = e.metodo_valuacion
+
+    col = {c: productos[c].to_numpy(dtype=float) for c in productos.columns if c != 'sku'}
+    cuota_hr = col.get('cuota_hr', np.full(n_sku, float(e.cuota_hr)))
+
+    # Ventas y producción: el inventario final de un mes es el inicial del siguiente
+    pesos = distribuir_estacionalidad(estacionalidad, T)
+    ventas = col['unidades'][:, None] * pesos
+    if_pt = _por_periodo(col['inv_final_pt'] if inv_final_pt is None else inv_final_pt, n_sku, T)
+    ii_pt = np.concatenate((col['inv_inicial_pt'][:, None], if_pt[:, :-1]), axis=1)
+    prod = ventas + if_pt - ii_pt
+
+    # Materiales
+    req = bom.explotar(prod)
+    if_mp = _por_periodo(bom.inv_final if inv_final_mp is None else inv_final_mp, n_mat, T)
+    ii_mp = np.concatenate((bom.inv_inicial[:, None], if_mp[:, :-1]), axis=1)
+    compras = req + if_mp - ii_mp
+    consumo_mp, valor_if_mp = valuar_periodos(
+        bom.inv_inicial, bom.precio_inicial, compras, bom.precio_compra[:, None], req, metodo
+    )
+    costo_mp = prod * bom.costo_por_producto(_dividir(consumo_mp, req))
+
+    # MOD y GIF mensual prorrateado por horas de cada mes
+    horas = prod * col['hrs_unit'][:, None]
+    costo_mod = horas * cuota_hr[:, None]
+    gif_mes = (e.mat_indirecto + e.moi + e.renta + e.energia + e.mantenimiento + e.varios) / MESES_POR_ANIO
+    gif = gif_mes * _dividir(horas, horas.sum(axis=0, keepdims=True))
+    costo_unitario = np.where(prod > 0, _dividir(costo_mp + costo_mod + gif, prod), 0.0)
+
+    # Costo de ventas con capas que pasan de un mes al siguiente
+    costo_ventas, valor_if_pt = valuar_periodos(
+        col['inv_inicial_pt'], col['precio_inv_inicial_pt'], prod, costo_unitario, ventas, metodo
+    )
+
+    ingresos = (ventas * col['precio'][:, None]).sum(axis=0)
+    total_costo_ventas = costo_ventas.sum(axis=0)
+    gastos_op = np.full(T, (e.comisiones + e.sueldos + e.publicidad + e.servicios + e.diversos) / MESES_POR_ANIO)
+    utilidad_bruta = ingresos - total_costo_ventas
+    utilidad_operativa = utilidad_bruta - gastos_op
+    por_periodo = pd.DataFrame({
+        'ventas_unidades': ventas.sum(axis=0),
+        'prod_unidades': prod.sum(axis=0),
+        'ingresos': ingresos,
+        'costo_ventas': total_costo_ventas,
+        'utilidad_bruta': utilidad_bruta,
+        'gastos_operacion': gastos_op,
+        'utilidad_operativa': utilidad_operativa,
+        'margen_operativo': np.where(ingresos > 0, _dividir(utilidad_operativa, ingresos) * 100, 0.0),
+        'valor_inv_final_pt': valor_if_pt.sum(axis=0),
+        'valor_inv_final_mp': valor_if_mp.sum(axis=0),
+    }, index=pd.RangeIndex(1, T + 1, name='periodo'))
+
+    return ResultadoMensual(
+        productos=tuple(bom.productos),
+        materiales=tuple(bom.nombres),
+        ventas=ventas,
+        produccion=prod,
+        inv_inicial_pt=ii_pt,
+        inv_final_pt=np.asarray(if_pt),
+        costo_unitario=costo_unitario,
+        costo_ventas=costo_ventas,
+        valor_inv_final_pt=valor_if_pt,
+        requerimiento_mp=req,
+        compras_mp=compras,
+        inv_final_mp=np.asarray(if_mp),
+        costo_consumo_mp=consumo_mp,
+        valor_inv_final_mp=valor_if_mp,
+        por_periodo=por_periodo,
+    )
@@ -0,0 +1,156 @@
+"""Cronómetro ligero para las secciones de cada rerun de la interfaz.
+
+Un ``Cronometro`` junta, por sección (CSS, cálculo, render de una etapa), los
+milisegundos, los renglones de tabla mostrados y si el resultado vino de la
+caché. Al terminar el rerun se emite una línea JSON en el logger
+``presupuesto.rendimiento``; con ``PRESUPUESTO_LOG_RENDIMIENTO=1`` esas
+líneas salen en stderr sin configurar ``logging``.
+
+Medir cuesta dos lecturas de ``perf_counter_ns`` y un diccionario por sección.
+
+Para un rerun lento en particular, ``resumen_perfil`` y ``perfil_en_bytes``
+convierten un ``cProfile.Profile`` en la tabla de funciones más costosas y en
+un archivo ``.prof`` (el de ``pstats``, que abren snakeviz o flameprof).
+``iniciar_captura``/``detener_captura`` permiten una sola captura a la vez en el
+proceso: desde Python 3.12 cProfile usa ``sys.monitoring``, que es global.
+"""
+import cProfile
+import json
+import logging
+import marshal
+import os
+import pstats
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from time import monotonic, perf_counter_ns
+
+import pandas as pd
+
+LOG = logging.getLogger(__name__)
+if os.environ.get('PRESUPUESTO_LOG_RENDIMIENTO'):
+    LOG.addHandler(logging.StreamHandler())
+    LOG.setLevel(logging.INFO)
+
+# Secciones abiertas del hilo (cada sesión de Streamlit corre en su propio hilo)
+_local = threading.local()
+
+# Captura de cProfile activa en el proceso: (perfil, inicio) o None
+_CANDADO_CAPTURA = threading.Lock()
+_captura = None
+# Una captura más vieja que esto se da por abandonada (su sesión se cerró a media captura)
+CAPTURA_MAXIMA_S = float(os.environ.get('PRESUPUESTO_CAPTURA_MAXIMA_S', 300))
+
+
+class Cronometro:
+    """Secciones medidas de un rerun (``alcance`` distingue la página del fragmento de la etapa)."""
+
+    def __init__(self, alcance):
+        self.alcance = alcance
+        self.secciones = []
+        self._inicio = perf_counter_ns()
+
+    @contextmanager
+    def medir(self, seccion, **datos):
+        """Mide el bloque; ``datos`` (por ejemplo ``cache='acierto'``) se agregan a la sección."""
+        registro = {'seccion': seccion, 'ms': 0.0, 'renglones': 0, **datos}
+        pila = _local.__dict__.setdefault('pila', [])
+        pila.append(registro)
+        inicio = perf_counter_ns()
+        try:
+            yield registro
+        finally:
+            registro['ms'] = (perf_counter_ns() - inicio) / 1e6
+            pila.pop()
+            self.secciones.append(registro)
+
+    @property
+    def total_ms(self):
+        return (perf_counter_ns() - self._inicio) / 1e6
+
+    def linea(self, **extra):
+        """Línea JSON del rerun: alcance, total y cada sección."""
+        return json.dumps({
+            'alcance': self.alcance,
+            'total_ms': round(self.total_ms, 3),
+            **extra,
+            'secciones': [{**s, 'ms': round(s['ms'], 3)} for s in self.secciones],
+        }, ensure_ascii=False)
+
+    def registrar(self, **extra):
+        if LOG.isEnabledFor(logging.INFO):
+            LOG.info(self.linea(**extra))
+
+
+def contar_renglones(renglones):
+    """Suma renglones mostrados a la sección abierta más interna del hilo, si hay una."""
+    pila = getattr(_local, 'pila', None)
+    if pila:
+        pila[-1]['renglones'] += renglones
+
+
+def marcar_cache(estado):
+    """Anota en la sección abierta más interna cómo se obtuvo su resultado.
+
+    Las funciones cacheadas lo llaman sólo cuando su cuerpo se ejecuta, así que
+    una sección abierta con ``cache='acierto'`` conserva ese valor si la
+    caché en memoria respondió.
+    """
+    pila = getattr(_local, 'pila', None)
+    if pila:
+        pila[-1]['cache'] = estado
+
+
+def iniciar_captura():
+    """Regresa un ``cProfile.Profile`` activo, o ``None`` si ya hay una captura en curso."""
+    global _captura
+    with _CANDADO_CAPTURA:
+        if _captura is not None:
+            anterior, inicio = _captura
+            if monotonic() - inicio < CAPTURA_MAXIMA_S:
+                return None
+            anterior.disable()
+            _captura = None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otro perfilador ajeno a la aplicación ocupa sys.monitoring
+            return None
+        _captura = (perfil, monotonic())
+        return perfil
+
+
+def detener_captura(perfil):
+    """Detiene ``perfil`` y libera la captura del proceso; se puede llamar más de una vez."""
+    global _captura
+    with _CANDADO_CAPTURA:
+        perfil.disable()
+        if _captura is not None and _captura[0] is perfil:
+            _captura = None
+
+
+def _estadisticas(perfil):
+    perfil.create_stats()
+    return pstats.Stats(perfil).stats
+
+
+def resumen_perfil(perfil, n=15):
+    """Las ``n`` funciones con más tiempo propio de un ``cProfile.Profile`` ya detenido."""
+    renglones = [
+        {
+            'funcion': nombre,
+            'archivo': f'{Path(archivo).name}:{linea}' if linea else archivo,
+            'llamadas': llamadas,
+            'propio_ms': propio * 1000,
+            'acumulado_ms': acumulado * 1000,
+        }
+        for (archivo, linea, nombre), (_, llamadas, propio, acumulado, _) in _estadisticas(perfil).items()
+    ]
+    columnas = ['funcion', 'archivo', 'llamadas', 'propio_ms', 'acumulado_ms']
+    return pd.DataFrame(renglones, columns=columnas).nlargest(n, 'propio_ms').reset_index(drop=True)
+
+
+def perfil_en_bytes(perfil):
+    """Contenido del archivo ``.prof``, igual al de ``Profile.dump_stats``."""
+    return marshal.dumps(_estadisticas(perfil))
@@ -0,0 +1,267 @@
+"""Reportes descargables del presupuesto maestro.
+
+Cada cédula (producción, materiales, MOD, GIF, costo de producción, costo de
+ventas, gastos de operación y estado de resultados) es una función que arma
+su tabla a partir de un ``ResultadoPresupuesto``. ``generar_reporte`` las
+junta en un libro de Excel (una hoja por cédula), un Parquet en formato largo
+(``cedula``, ``concepto``, ``columna``, ``valor``), un PDF de texto o el
+estado de resultados en texto plano.
+
+Los reportes se construyen en memoria sólo cuando se piden y se guardan en
+una caché LRU por huella de las entradas: volver a descargar el mismo
+presupuesto no lo vuelve a generar.
+"""
+import io
+import os
+
+import pandas as pd
+
+from .cache import CacheLRU, huella
+
+# Techo de la caché de reportes, en MB
+REPORTES_MB = float(os.environ.get('PRESUPUESTO_REPORTES_MB', 32))
+
+_ETIQUETAS_MATERIALES = {
+    'requerimiento': 'Requerimiento para Producción',
+    'inv_final_deseado': '(+) Inventario Final Deseado',
+    'inv_inicial': '(-) Inventario Inicial',
+    'compras': '(=) Compras (piezas)',
+    'precio_compra': 'Precio de Compra',
+    'costo_compras': 'Costo de Compras',
+    'costo_consumo': 'Costo en Producción',
+    'inv_final_cant': 'Inventario Final (piezas)',
+    'costo_inv_final': 'Costo del Inventario Final',
+}
+
+
+def cedula_produccion(res):
+    e = res.entradas
+    return pd.DataFrame({
+        'Concepto': ['Unidades a Vender', '(+) Inventario Final Deseado', '(=) Total Requerido',
+                     '(-) Inventario Inicial', '(=) UNIDADES A PRODUCIR'],
+        'Unidades': [e.unidades, e.inv_final_pt, e.unidades + e.inv_final_pt, e.inv_inicial_pt, res.prod_unidades],
+    })
+
+
+def cedula_materiales(res):
+    # Un renglón por concepto y una columna por material
+    tabla = res.materiales[list(_ETIQUETAS_MATERIALES)].T
+    tabla.columns = list(tabla.columns)
+    tabla.insert(0, 'Concepto', [_ETIQUETAS_MATERIALES[c] for c in tabla.index])
+    return tabla.reset_index(drop=True)
+
+
+def cedula_mod(res):
+    e = res.entradas
+    return pd.DataFrame({
+        'Concepto': ['Producción Requerida', 'Horas por Unidad', 'Total de Horas', 'Tarifa por Hora',
+                     'COSTO TOTAL MOD'],
+        'Cantidad': [res.prod_unidades, e.hrs_unit, res.total_horas, None, None],
+        'Importe': [None, None, None, e.cuota_hr, res.costo_mod],
+    })
+
+
+def cedula_gif(res):
+    e = res.entradas
+    return pd.DataFrame({
+        'Concepto': ['Material Indirecto', 'Mano de Obra Indirecta', 'Renta',
+                     'Energía', 'Mantenimiento', 'Varios', 'TOTAL'],
+        'Importe': [e.mat_indirecto, e.moi, e.renta, e.energia, e.mantenimiento, e.varios, res.total_gif],
+    })
+
+
+def cedula_costo_produccion(res):
+    return pd.DataFrame({
+        'Concepto': ['Materia Prima Directa', 'Mano de Obra Directa',
+                     'Gastos Indirectos de Fabricación', 'COSTO TOTAL DE PRODUCCIÓN'],
+        'Importe': [res.mp_total, res.costo_mod, res.total_gif, res.costo_produccion_total],
+    })
+
+
+def cedula_costo_ventas(res):
+    e = res.entradas
+    return pd.DataFrame({
+        'Concepto': ['Inventario Inicial', 'Producción del Período', 'Total Disponible',
+                     'Inventario Final', 'COSTO DE VENTAS'],
+        'Unidades': [e.inv_inicial_pt, res.prod_unidades, res.total_disponible_pt, e.inv_final_pt, e.unidades],
+        'Costo Unitario': [e.precio_inv_inicial_pt, res.costo_unitario, None, None, None],
+        'Importe': [res.valor_inv_inicial_pt, res.valor_produccion, res.valor_total_disponible,
+                    res.valor_inv_final_pt, res.costo_ventas],
+    })
+
+
+def cedula_gastos(res):
+    e = res.entradas
+    return pd.DataFrame({
+        'Concepto': ['Comisiones a Vendedores', 'Sueldos', 'Publicidad',
+                     'Servicios', 'Diversos', 'TOTAL GASTOS DE OPERACIÓN'],
+        'Importe': [e.comisiones, e.sueldos, e.publicidad, e.servicios, e.diversos, res.total_gastos_op],
+    })
+
+
+def cedula_estado_resultados(res):
+    return pd.DataFrame({
+        'Concepto': ['VENTAS', '(-) COSTO DE VENTAS', '(=) UTILIDAD BRUTA',
+                     '(-) GASTOS DE OPERACIÓN', '(=) UTILIDAD OPERATIVA'],
+        'Importe': [res.ingresos, res.costo_ventas, res.utilidad_bruta, res.total_gastos_op, res.utilidad_operativa],
+    })
+
+
+# Cédulas del reporte, en orden; la llave es el nombre de la hoja
+CEDULAS = {
+    'Producción': cedula_produccion,
+    'Materiales': cedula_materiales,
+    'MOD': cedula_mod,
+    'GIF': cedula_gif,
+    'Costo de producción': cedula_costo_produccion,
+    'Costo de ventas': cedula_costo_ventas,
+    'Gastos de operación': cedula_gastos,
+    'Estado de resultados': cedula_estado_resultados,
+}
+
+
+def texto_estado_resultados(res):
+    e = res.entradas
+    return f"""
+ESTADO DE RESULTADOS PRESUPUESTADO
+COMPAÑÍA XZ, S.A.
+{'='*60}
+
+VENTAS                           ${res.ingresos:>20,.2f}
+(-) COSTO DE VENTAS              ${res.costo_ventas:>20,.2f}
+                                 {'-'*30}
+(=) UTILIDAD BRUTA               ${res.utilidad_bruta:>20,.2f}
+
+(-) GASTOS DE OPERACIÓN:
+    Comisiones                   ${e.comisiones:>20,.2f}
+    Sueldos                      ${e.sueldos:>20,.2f}
+    Publicidad                   ${e.publicidad:>20,.2f}
+    Servicios                    ${e.servicios:>20,.2f}
+    Diversos                     ${e.diversos:>20,.2f}
+                                 {'-'*30}
+    Total Gastos de Operación    ${res.total_gastos_op:>20,.2f}
+
+(=) UTILIDAD OPERATIVA           ${res.utilidad_operativa:>20,.2f}
+
+{'='*60}
+INDICADORES:
+Margen Bruto:       {res.margen_bruto:>6.2f}%
+Margen Operativo:   {res.margen_operativo:>6.2f}%
+            """
+
+
+def reporte_excel(res):
+    """Libro de Excel con una hoja por cédula (requiere ``openpyxl``)."""
+    salida = io.BytesIO()
+    with pd.ExcelWriter(salida, engine='openpyxl') as libro:
+        for nombre, cedula in CEDULAS.items():
+            tabla = cedula(res)
+            tabla.to_excel(libro, sheet_name=nombre, index=False)
+            hoja = libro.sheets[nombre]
+            hoja.column_dimensions['A'].width = max(len(c) for c in tabla['Concepto']) + 2
+            for columna in hoja.iter_cols(min_col=2, min_row=2):
+                hoja.column_dimensions[columna[0].column_letter].width = 20
+                for celda in columna:
+                    celda.number_format = '#,##0.00'
+    return salida.getvalue()
+
+
+def reporte_parquet(res):
+    """Todas las cédulas en una sola tabla larga."""
+    partes = []
+    for nombre, cedula in CEDULAS.items():
+        larga = cedula(res).melt(id_vars='Concepto', var_name='columna', value_name='valor')
+        larga.insert(0, 'cedula', nombre)
+        partes.append(larga.rename(columns={'Concepto': 'concepto'}).dropna(subset=['valor']))
+    tabla = pd.concat(partes, ignore_index=True).astype({'valor': float})
+    salida = io.BytesIO()
+    tabla.to_parquet(salida, index=False)
+    return salida.getvalue()
+
+
+def _renglones(tabla):
+    # Tabla en texto de ancho fijo: conceptos a la izquierda, cifras a la derecha
+    celdas = [[str(c) for c in tabla.columns]]
+    for renglon in tabla.itertuples(index=False):
+        celdas.append([renglon[0]] + ['' if pd.isna(v) else f'{v:,.2f}' for v in renglon[1:]])
+    anchos = [max(len(r[i]) for r in celdas) for i in range(len(tabla.columns))]
+    return [
+        '  '.join([r[0].ljust(anchos[0])] + [c.rjust(a) for c, a in zip(r[1:], anchos[1:])])
+        for r in celdas
+    ]
+
+
+# Página carta en puntos, texto Courier de 8 pt
+_ANCHO, _ALTO, _MARGEN, _PUNTOS, _INTERLINEA = 612, 792, 36, 8, 10
+_RENGLONES_PAGINA = (_ALTO - 2 * _MARGEN) // _INTERLINEA
+
+
+def _pdf(paginas):
+    # PDF 1.4 mínimo sin dependencias: una página por lista de renglones en Courier (WinAnsi)
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>',
+    ]
+    hojas = []
+    for renglones in paginas:
+        texto = [f'BT /F1 {_PUNTOS} Tf {_INTERLINEA} TL {_MARGEN} {_ALTO - _MARGEN} Td'.encode()]
+        for renglon in renglones:
+            crudo = renglon.encode('cp1252', 'replace')
+            crudo = crudo.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+            texto.append(b"(" + crudo + b") '")
+        texto.append(b'ET')
+        contenido = b'\n'.join(texto)
+        objetos.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(contenido), contenido))
+        objetos.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_ANCHO} {_ALTO}] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objetos)} 0 R >>'.encode()
+        )
+        hojas.append(len(objetos))
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(f'{n} 0 R' for n in hojas)}] /Count {len(hojas)} >>".encode()
+
+    salida = io.BytesIO()
+    salida.write(b'%PDF-1.4\n')
+    posiciones = []
+    for numero, objeto in enumerate(objetos, 1):
+        posiciones.append(salida.tell())
+        salida.write(b'%d 0 obj\n%s\nendobj\n' % (numero, objeto))
+    inicio_xref = salida.tell()
+    salida.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1))
+    salida.write(b''.join(b'%010d 00000 n \n' % p for p in posiciones))
+    salida.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, inicio_xref))
+    return salida.getvalue()
+
+
+def reporte_pdf(res):
+    """Cédulas en un PDF de texto; una cédula no se parte entre páginas si cabe en una."""
+    paginas = [['PRESUPUESTO MAESTRO', f'Método de valuación: {res.entradas.metodo_valuacion}', '']]
+    for nombre, cedula in CEDULAS.items():
+        bloque = [nombre.upper(), *_renglones(cedula(res)), '']
+        if len(paginas[-1]) + len(bloque) > _RENGLONES_PAGINA:
+            paginas.append([])
+        paginas[-1].extend(bloque)
+    return _pdf(paginas)
+
+
+def reporte_texto(res):
+    return texto_estado_resultados(res).encode('utf-8')
+
+
+# formato -> (extensión, tipo MIME, generador)
+FORMATOS_REPORTE = {
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', reporte_excel),
+    'parquet': ('parquet', 'application/vnd.apache.parquet', reporte_parquet),
+    'pdf': ('pdf', 'application/pdf', reporte_pdf),
+    'txt': ('txt', 'text/plain', reporte_texto),
+}
+
+CACHE_REPORTES = CacheLRU(REPORTES_MB)
+
+
+def generar_reporte(res, formato):
+    """Bytes del reporte de ``res`` en ``formato``; se generan una vez por huella de las entradas."""
+    if formato not in FORMATOS_REPORTE:
+        raise ValueError(f"Formato de reporte desconocido: {formato!r}")
+    generador = FORMATOS_REPORTE[formato][2]
+    return CACHE_REPORTES.obtener(huella('reporte', formato, res.entradas), lambda: generador(res))
@@ -0,0 +1,74 @@
+"""Análisis de sensibilidad (tornado) y tablas de datos de dos entradas.
+
+Cada entrada se mueve ±x % dejando las demás fijas. Todas las
+perturbaciones forman una sola malla ``campo × variación`` que se evalúa de
+una vez con ``lote.evaluar_arrays``: la fila ``i`` sólo mueve el campo ``i``.
+
+La tabla de datos (como la de Excel) cruza dos entradas: una va como
+renglón ``(n, 1)`` y otra como columna ``(1, m)``, y el *broadcasting* del
+motor llena la malla completa en una sola evaluación.
+"""
+import numpy as np
+import pandas as pd
+
+from .lote import evaluar_arrays
+from .motor import CAMPOS_NUMERICOS, EntradasPresupuesto
+
+NIVELES = (0.05, 0.10, 0.20)
+METRICAS = ('utilidad_operativa', 'margen_operativo')
+
+
+def analisis_sensibilidad(base=None, campos=CAMPOS_NUMERICOS, niveles=NIVELES, metricas=METRICAS):
+    """Evalúa cada campo movido ``-nivel`` y ``+nivel`` (0.1 = 10 %).
+
+    Regresa un ``DataFrame`` con índice ``(campo, variacion)`` y, por cada
+    métrica, su valor y la diferencia contra el presupuesto base.
+    """
+    base = base or EntradasPresupuesto()
+    campos = tuple(campos)
+    niveles = np.asarray(niveles, dtype=float)
+    variaciones = np.concatenate((-niveles[::-1], niveles))
+
+    # Malla campo × variación: en la fila i sólo cambia el campo i
+    identidad = np.eye(len(campos))[:, :, None]
+    columnas = {
+        campo: getattr(base, campo) * (1 + identidad[i] * variaciones)
+        for i, campo in enumerate(campos)
+    }
+    r = evaluar_arrays(columnas, base)
+    referencia = evaluar_arrays({}, base)
+
+    indice = pd.MultiIndex.from_product([campos, variaciones], names=['campo', 'variacion'])
+    tabla = {'valor': np.array([getattr(base, c) for c in campos])[:, None] * (1 + variaciones)}
+    for m in metricas:
+        tabla[m] = r[m]
+        tabla[f'delta_{m}'] = r[m] - referencia[m]
+    return pd.DataFrame({c: np.asarray(v).ravel() for c, v in tabla.items()}, index=indice)
+
+
+def tornado(sensibilidad, nivel, metrica='utilidad_operativa'):
+    """Impacto de ``-nivel`` y ``+nivel`` por campo, ordenado de mayor a menor rango."""
+    delta = sensibilidad[f'delta_{metrica}'].unstack('variacion')
+    columnas = delta.columns.to_numpy()
+    baja = delta[columnas[np.isclose(columnas, -nivel)][0]]
+    alta = delta[columnas[np.isclose(columnas, nivel)][0]]
+    resultado = pd.DataFrame({'baja': baja, 'alta': alta})
+    resultado['rango'] = (alta - baja).abs()
+    return resultado.sort_values('rango', ascending=False)
+
+
+def tabla_dos_vias(campo_x, valores_x, campo_y, valores_y, base=None, metricas=METRICAS):
+    """Tabla de datos de dos entradas.
+
+    Regresa un ``dict`` métrica -> ``DataFrame`` con un renglón por valor de
+    ``campo_y`` y una columna por valor de ``campo_x``. Cualquiera de los dos
+    campos puede ser ``metodo_valuacion`` con una lista de métodos.
+    """
+    if campo_x == campo_y:
+        raise ValueError("La tabla de datos necesita dos campos distintos")
+    valores_x = np.asarray(valores_x)
+    valores_y = np.asarray(valores_y)
+    r = evaluar_arrays({campo_x: valores_x[None, :], campo_y: valores_y[:, None]}, base)
+    columnas = pd.Index(valores_x, name=campo_x)
+    renglones = pd.Index(valores_y, name=campo_y)
+    return {m: pd.DataFrame(r[m], index=renglones, columns=columnas) for m in metricas}
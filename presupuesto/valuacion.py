@@ -0,0 +1,91 @@
+"""Valuación de inventarios de dos capas (inventario inicial + entradas del período).
+
+Contiene la versión escalar que usa el motor y la vectorizada que usan la
+evaluación por lotes y la lista de materiales; ambas son el caso de dos capas
+de ``kardex.CapasCosto``.
+"""
+import numpy as np
+
+METODOS_VALUACION = ('UEPS', 'PEPS', 'Promedio Ponderado')
+UEPS, PEPS, PROMEDIO = range(len(METODOS_VALUACION))
+
+
+def calcular_valuacion(inv_inicial, precio_inicial, compras, precio_compras, consumo, metodo):
+    """Kardex de dos capas (inventario inicial + compras) con una sola salida.
+
+    Regresa ``(costo_consumo, costo_inv_final, inv_final_cant)``; el
+    inventario final vale lo disponible menos lo consumido, de modo que
+    coincide con ``kardex.CapasCosto`` para cualquier nivel de existencia.
+    """
+    total_disponible = inv_inicial + compras
+    valor_total = (inv_inicial * precio_inicial) + (compras * precio_compras)
+
+    if metodo == 'UEPS':
+        # Primero sale lo último que entró (compras)
+        if consumo <= compras:
+            costo_consumo = consumo * precio_compras
+        else:
+            # Se consumen todas las compras y parte del inicial
+            costo_consumo = (compras * precio_compras) + ((consumo - compras) * precio_inicial)
+
+    elif metodo == 'PEPS':
+        # Primero sale lo primero que entró (inicial)
+        if consumo <= inv_inicial:
+            costo_consumo = consumo * precio_inicial
+        else:
+            # Se consume todo el inicial y parte de compras
+            costo_consumo = (inv_inicial * precio_inicial) + ((consumo - inv_inicial) * precio_compras)
+
+    else:  # Promedio Ponderado
+        costo_promedio = valor_total / total_disponible if total_disponible else 0
+        costo_consumo = consumo * costo_promedio
+
+    inv_final_cant = total_disponible - consumo
+    costo_inv_final = valor_total - costo_consumo if inv_final_cant else 0
+    return costo_consumo, costo_inv_final, inv_final_cant
+
+
+def codificar_metodos(metodos):
+    """Convierte nombres de método (escalar o arreglo) a los códigos 0/1/2."""
+    arr = np.asarray(metodos)
+    if arr.dtype.kind in 'iu':
+        return arr
+    valores, inversa = np.unique(arr.astype(str), return_inverse=True)
+    desconocidos = set(valores) - set(METODOS_VALUACION)
+    if desconocidos:
+        raise ValueError(f"Método de valuación desconocido: {sorted(desconocidos)}")
+    codigos = np.array([METODOS_VALUACION.index(v) for v in valores])
+    return codigos[inversa].reshape(arr.shape)
+
+
+def _dividir(num, den):
+    # División que regresa 0 donde el denominador es 0, igual que el motor escalar
+    num, den = np.broadcast_arrays(np.asarray(num, dtype=float), np.asarray(den, dtype=float))
+    return np.divide(num, den, out=np.zeros(num.shape), where=den != 0)
+
+
+def valuacion_vectorizada(inv_inicial, precio_inicial, compras, precio_compras, consumo, metodo):
+    """Versión vectorizada de ``calcular_valuacion``; ``metodo`` en códigos 0/1/2."""
+    total_disponible = inv_inicial + compras
+    valor_total = inv_inicial * precio_inicial + compras * precio_compras
+
+    # UEPS: primero sale lo último que entró (compras)
+    consumo_ueps = np.where(
+        consumo <= compras,
+        consumo * precio_compras,
+        compras * precio_compras + (consumo - compras) * precio_inicial,
+    )
+    # PEPS: primero sale lo primero que entró (inicial)
+    consumo_peps = np.where(
+        consumo <= inv_inicial,
+        consumo * precio_inicial,
+        inv_inicial * precio_inicial + (consumo - inv_inicial) * precio_compras,
+    )
+    consumo_promedio = consumo * _dividir(valor_total, total_disponible)
+
+    costo_consumo = np.select(
+        [metodo == UEPS, metodo == PEPS], [consumo_ueps, consumo_peps], consumo_promedio
+    )
+    inv_final_cant = total_disponible - consumo
+    costo_inv_final = np.where(inv_final_cant != 0, valor_total - costo_consumo, 0.0)
+    return costo_consumo, costo_inv_final, inv_final_cant
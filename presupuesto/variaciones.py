@@ -0,0 +1,134 @@
+"""Variaciones del presupuesto contra los movimientos reales.
+
+Los movimientos (salidas de materiales, horas de MOD, pólizas de GIF) se
+leen por bloques y se van sumando por material o concepto, así que la
+memoria sólo depende del número de materiales y no del de renglones.
+
+* Materiales: precio ``importe - cantidad × costo estándar`` y cantidad
+  ``(cantidad - producción real × consumo estándar) × costo estándar``.
+* MOD: tarifa ``importe - horas × cuota_hr`` y eficiencia
+  ``(horas - producción real × hrs_unit) × cuota_hr``.
+* GIF: gasto ``real - presupuesto`` por línea.
+
+Una variación positiva es desfavorable (el real cuesta más que el estándar).
+Los materiales o conceptos de los movimientos que no están en el presupuesto
+se conservan con estándar vacío en lugar de descartarse.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .archivos import TAMANO_BLOQUE, leer_bloques
+from .motor import lista_materiales, presupuesto_produccion
+
+CONCEPTOS_GIF = ('mat_indirecto', 'moi', 'renta', 'energia', 'mantenimiento', 'varios')
+
+
+def _bloques(fuente, tamano_bloque, columnas):
+    # Ruta o archivo abierto, un DataFrame o un iterable de DataFrame
+    if isinstance(fuente, pd.DataFrame):
+        return [fuente]
+    if isinstance(fuente, (str, os.PathLike)) or hasattr(fuente, 'read'):
+        return leer_bloques(fuente, tamano_bloque, columnas=columnas)
+    return fuente
+
+
+def acumular(fuente, clave, columnas, tamano_bloque=TAMANO_BLOQUE):
+    """Suma ``columnas`` por ``clave`` recorriendo ``fuente`` por bloques.
+
+    Con ``clave=None`` regresa una ``Series`` con los totales.
+    """
+    columnas = list(columnas)
+    leer = columnas if clave is None else [clave, *columnas]
+    total = pd.DataFrame(columns=columnas, dtype=float, index=pd.Index([], name=clave))
+    for bloque in _bloques(fuente, tamano_bloque, leer):
+        faltantes = set(leer) - set(bloque.columns)
+        if faltantes:
+            raise KeyError(f"Faltan columnas en los movimientos: {sorted(faltantes)}")
+        if clave is None:
+            claves = pd.Series('total', index=bloque.index)
+        else:
+            claves = bloque[clave].astype(str).str.strip()
+        parcial = bloque[columnas].astype(float).groupby(claves.rename(clave)).sum()
+        total = total.add(parcial, fill_value=0.0)
+    if clave is None:
+        return total.sum()
+    return total
+
+
+def _dividir(num, den):
+    return np.divide(num, den, out=np.zeros(len(num)), where=np.asarray(den) != 0)
+
+
+def _produccion(entradas, produccion_real):
+    if produccion_real is None:
+        return presupuesto_produccion(entradas.unidades, entradas.inv_final_pt, entradas.inv_inicial_pt)
+    return produccion_real
+
+
+def variaciones_materiales(consumos, entradas, produccion_real=None, tamano_bloque=TAMANO_BLOQUE):
+    """Variaciones de precio y cantidad por material.
+
+    ``consumos`` tiene columnas ``material`` (como en la lista de materiales:
+    "Material A", "Material B" o el nombre de un material adicional),
+    ``cantidad`` e ``importe``. Sin ``produccion_real`` se usa la producción
+    presupuestada.
+    """
+    produccion = _produccion(entradas, produccion_real)
+    estandar = pd.DataFrame(
+        [(m.nombre, m.precio_compra, m.por_unidad) for m in lista_materiales(entradas).materiales],
+        columns=['material', 'costo_estandar', 'consumo_estandar'],
+    ).set_index('material')
+    real = acumular(consumos, 'material', ['cantidad', 'importe'], tamano_bloque)
+    tabla = estandar.join(real, how='outer', sort=False).reindex(
+        [*estandar.index, *real.index.difference(estandar.index)])
+    tabla[['cantidad', 'importe']] = tabla[['cantidad', 'importe']].fillna(0.0)
+
+    tabla['cantidad_estandar'] = produccion * tabla['consumo_estandar']
+    tabla['costo_real'] = _dividir(tabla['importe'], tabla['cantidad'])
+    tabla['variacion_precio'] = tabla['importe'] - tabla['cantidad'] * tabla['costo_estandar']
+    tabla['variacion_cantidad'] = (tabla['cantidad'] - tabla['cantidad_estandar']) * tabla['costo_estandar']
+    tabla['variacion_total'] = tabla['variacion_precio'] + tabla['variacion_cantidad']
+    return tabla[['cantidad', 'cantidad_estandar', 'importe', 'costo_real', 'costo_estandar',
+                  'variacion_precio', 'variacion_cantidad', 'variacion_total']]
+
+
+def variaciones_mod(horas, entradas, produccion_real=None, tamano_bloque=TAMANO_BLOQUE):
+    """Variaciones de tarifa y eficiencia de la mano de obra directa.
+
+    ``horas`` tiene columnas ``horas`` e ``importe``; regresa una ``Series``.
+    """
+    produccion = _produccion(entradas, produccion_real)
+    total = acumular(horas, None, ['horas', 'importe'], tamano_bloque)
+    horas_estandar = produccion * entradas.hrs_unit
+    variacion_tarifa = total['importe'] - total['horas'] * entradas.cuota_hr
+    variacion_eficiencia = (total['horas'] - horas_estandar) * entradas.cuota_hr
+    return pd.Series({
+        'horas': total['horas'],
+        'horas_estandar': horas_estandar,
+        'importe': total['importe'],
+        'tarifa_real': total['importe'] / total['horas'] if total['horas'] else 0.0,
+        'tarifa_estandar': entradas.cuota_hr,
+        'variacion_tarifa': variacion_tarifa,
+        'variacion_eficiencia': variacion_eficiencia,
+        'variacion_total': variacion_tarifa + variacion_eficiencia,
+    })
+
+
+def variaciones_gif(movimientos, entradas, tamano_bloque=TAMANO_BLOQUE):
+    """Variación de gasto por línea de GIF.
+
+    ``movimientos`` tiene columnas ``concepto`` (``mat_indirecto``, ``moi``,
+    ``renta``, ``energia``, ``mantenimiento`` o ``varios``) e ``importe``.
+    """
+    presupuesto = pd.Series({c: getattr(entradas, c) for c in CONCEPTOS_GIF}, name='presupuesto')
+    real = acumular(movimientos, 'concepto', ['importe'], tamano_bloque)['importe']
+    real.index = real.index.str.lower()
+    real = real.groupby(level=0).sum()
+    tabla = pd.DataFrame({'presupuesto': presupuesto, 'real': real}).reindex(
+        [*CONCEPTOS_GIF, *real.index.difference(CONCEPTOS_GIF)])
+    tabla.index.name = 'concepto'
+    tabla['real'] = tabla['real'].fillna(0.0)
+    tabla['variacion_gasto'] = tabla['real'] - tabla['presupuesto']
+    return tabla
@@ -0,0 +1,12 @@
+"""Las pruebas no tocan el almacén de escenarios ni la caché del usuario.
+
+Las rutas se fijan al importar el paquete, así que se definen antes de que
+cualquier módulo de pruebas lo importe.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+TEMPORAL = Path(tempfile.mkdtemp(prefix='presupuesto-pruebas-'))
+os.environ['PRESUPUESTO_ESCENARIOS_DB'] = str(TEMPORAL / 'escenarios.db')
+os.environ['PRESUPUESTO_CACHE_DIR'] = str(TEMPORAL / 'cache')
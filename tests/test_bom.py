@@ -0,0 +1,37 @@
+"""La BOM dispersa da lo mismo que la matriz densa."""
+import numpy as np
+
+from presupuesto import Material
+from presupuesto.bom import ListaMateriales
+
+
+def bom_aleatoria(rng, n_materiales=30, n_productos=12, componentes=60):
+    materiales = [Material(f'MAT-{i}', 1.0, 1.0, 1.0, 1.0) for i in range(n_materiales)]
+    # El último material no entra en ningún producto; los pares repetidos se suman
+    filas = rng.integers(0, n_materiales - 1, componentes)
+    columnas = rng.integers(0, n_productos, componentes)
+    cantidades = rng.uniform(0.1, 5, componentes)
+    densa = np.zeros((n_materiales, n_productos))
+    np.add.at(densa, (filas, columnas), cantidades)
+    bom = ListaMateriales(materiales, [f'SKU-{j}' for j in range(n_productos)], filas, columnas, cantidades)
+    return bom, densa
+
+
+def test_explotar_es_el_producto_matricial():
+    rng = np.random.default_rng(0)
+    bom, densa = bom_aleatoria(rng)
+    produccion = rng.uniform(0, 1000, bom.forma[1])
+    np.testing.assert_allclose(bom.explotar(produccion), densa @ produccion)
+    # Con ejes adicionales (escenarios × periodos) se conservan
+    produccion = rng.uniform(0, 1000, (bom.forma[1], 4, 3))
+    np.testing.assert_allclose(bom.explotar(produccion), np.einsum('mp,pst->mst', densa, produccion))
+    assert not bom.explotar(produccion)[-1].any()
+
+
+def test_costo_por_producto_es_la_transpuesta():
+    rng = np.random.default_rng(1)
+    bom, densa = bom_aleatoria(rng)
+    costo = rng.uniform(1, 20, bom.forma[0])
+    np.testing.assert_allclose(bom.costo_por_producto(costo), densa.T @ costo)
+    costo = rng.uniform(1, 20, (bom.forma[0], 5))
+    np.testing.assert_allclose(bom.costo_por_producto(costo), densa.T @ costo)
@@ -0,0 +1,29 @@
+"""Caché en disco: la llave sigue al código y limpiar no toca otros datos."""
+from presupuesto import cache
+from presupuesto.cache import CacheDisco, persistente
+
+
+def _definir(cuerpo):
+    # Dos versiones de la misma función (mismo módulo y nombre) con distinto código
+    espacio = {'persistente': persistente}
+    exec(f"@persistente\ndef calcular(x):\n    return {cuerpo}\n", espacio)
+    return espacio['calcular']
+
+
+def test_cambiar_la_funcion_invalida_su_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DISCO', CacheDisco(tmp_path))
+    assert _definir('x + 1')(1) == 2
+    assert _definir('x + 1')(1) == 2
+    assert _definir('x * 10')(1) == 10
+    assert cache.CACHE_DISCO.aciertos == 1
+    assert cache.CACHE_DISCO.fallos == 2
+
+
+def test_limpiar_conserva_otros_datos(tmp_path):
+    disco = CacheDisco(tmp_path)
+    disco.guardar(disco.llave('a'), {'valor': 1.0})
+    (tmp_path / 'kardex').mkdir()
+    (tmp_path / 'kardex' / 'movimientos.csv').write_text('articulo,cantidad,costo_unitario\n')
+    disco.limpiar()
+    assert disco.estadisticas()['entradas'] == 0
+    assert (tmp_path / 'kardex' / 'movimientos.csv').exists()
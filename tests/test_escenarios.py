@@ -0,0 +1,68 @@
+"""Almacén de escenarios en SQLite y la etapa que los compara."""
+import dataclasses
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from presupuesto import METODOS_VALUACION, EntradasPresupuesto, Material, compute_master_budget
+from presupuesto.escenarios import METRICAS_ESCENARIO, AlmacenEscenarios
+
+APLICACION = Path(__file__).resolve().parent.parent / 'finanzas.py'
+
+
+def test_guardar_y_cargar(tmp_path):
+    almacen = AlmacenEscenarios(tmp_path / 'escenarios.db')
+    entradas = EntradasPresupuesto(
+        unidades=61_234.5, precio=412.75, metodo_valuacion='PEPS',
+        materiales_adicionales=(Material('Material C', 2000.0, 3.0, 1500.0, 3.5, 1.5),),
+    )
+    assert almacen.guardar('  Con material C ', entradas) == len(METODOS_VALUACION)
+    assert almacen.nombres() == ['Con material C']
+    for metodo in METODOS_VALUACION:
+        esperado = dataclasses.replace(entradas, metodo_valuacion=metodo)
+        assert almacen.cargar('Con material C', metodo) == esperado
+        # Las cifras guardadas son las del presupuesto de ese método
+        guardado = almacen.listar(metodo).iloc[0]
+        resultado = compute_master_budget(esperado)
+        for metrica in METRICAS_ESCENARIO:
+            assert guardado[metrica] == pytest.approx(getattr(resultado, metrica))
+
+    # Guardar con el mismo nombre reemplaza; borrar quita todos los métodos
+    almacen.guardar('Con material C', EntradasPresupuesto())
+    assert almacen.cargar('Con material C', 'UEPS') == EntradasPresupuesto()
+    assert almacen.borrar('Con material C') == len(METODOS_VALUACION)
+    with pytest.raises(KeyError):
+        almacen.cargar('Con material C')
+    with pytest.raises(ValueError):
+        almacen.guardar('   ', entradas)
+
+
+def test_almacen_compara_e_itera(tmp_path):
+    almacen = AlmacenEscenarios(tmp_path / 'almacen.db')
+    almacen.guardar('Base', EntradasPresupuesto())
+    almacen.guardar('Más ventas', EntradasPresupuesto(unidades=70000))
+    comparacion = almacen.comparar(metodo='UEPS', referencia='Base')
+    assert list(comparacion.index) == ['Base', 'Más ventas']
+    assert comparacion.loc['Más ventas', 'cambios'] == 'unidades'
+    assert dict(almacen.iterar(['Base']))['Base'] == almacen.cargar('Base', 'UEPS')
+
+
+def test_etapa_escenarios_con_escenarios_guardados():
+    almacen = AlmacenEscenarios()
+    almacen.guardar('Base', EntradasPresupuesto())
+    almacen.guardar('Más ventas', EntradasPresupuesto(unidades=70000))
+
+    at = AppTest.from_file(str(APLICACION), default_timeout=120)
+    at.run()
+    at.sidebar.radio[0].set_value("1. Presupuestos Operativos").run()
+    etapa = next(e for e in at.radio(key='etapa').options if 'Escenarios' in e)
+    at.radio(key='etapa').set_value(etapa).run()
+
+    assert not at.exception
+    assert any('Escenarios Comparados' in m.value for m in at.markdown)
+
+    at.selectbox(key='esc_orden').set_value('utilidad_operativa').run()
+    listado = at.expander[-1].dataframe[0].value
+    assert not at.exception
+    assert list(listado['nombre']) == ['Más ventas', 'Base']
@@ -0,0 +1,55 @@
+"""La valuación vectorizada del kardex coincide con las capas de ``CapasCosto``."""
+import numpy as np
+import pytest
+
+from presupuesto import METODOS_VALUACION
+from presupuesto.kardex import CapasCosto, ExistenciaInsuficiente, valuar_movimientos
+
+
+def movimientos_aleatorios(rng, n, existencia_inicial=0.0):
+    # Entradas y salidas con existencia nunca negativa; a veces se vacía por completo
+    cantidades, costos = np.zeros(n), rng.uniform(1, 50, n)
+    existencia = existencia_inicial
+    for i in range(n):
+        if existencia <= 0 or rng.random() < 0.5:
+            cantidades[i] = float(rng.integers(1, 100))
+        elif rng.random() < 0.1:
+            cantidades[i] = -existencia
+        else:
+            cantidades[i] = -float(rng.uniform(0, existencia))
+        existencia += cantidades[i]
+    return cantidades, costos
+
+
+def con_capas(cantidades, costos, metodo, existencia_inicial=0.0, costo_inicial=0.0):
+    capas = CapasCosto(metodo)
+    capas.entrada(existencia_inicial, costo_inicial)
+    costo_salida, existencia, valor = [], [], []
+    for q, c in zip(cantidades, costos):
+        if q >= 0:
+            capas.entrada(q, c)
+            costo_salida.append(0.0)
+        else:
+            costo_salida.append(capas.salida(-q))
+        existencia.append(capas.existencia)
+        valor.append(capas.valor)
+    return np.array(costo_salida), np.array(existencia), np.array(valor)
+
+
+@pytest.mark.parametrize('metodo', METODOS_VALUACION)
+@pytest.mark.parametrize('semilla', range(20))
+def test_coincide_con_capas(metodo, semilla):
+    rng = np.random.default_rng(semilla)
+    existencia_inicial, costo_inicial = (0.0, 0.0) if semilla % 2 else (float(rng.integers(1, 500)), 7.5)
+    cantidades, costos = movimientos_aleatorios(rng, 200, existencia_inicial)
+    r = valuar_movimientos(cantidades, costos, metodo, existencia_inicial, costo_inicial)
+    costo_salida, existencia, valor = con_capas(cantidades, costos, metodo, existencia_inicial, costo_inicial)
+    np.testing.assert_allclose(r.costo_salida, costo_salida, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(r.existencia, existencia, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(r.valor, valor, rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize('metodo', METODOS_VALUACION)
+def test_salida_mayor_que_la_existencia(metodo):
+    with pytest.raises(ExistenciaInsuficiente):
+        valuar_movimientos([10.0, -4.0, -7.0], [5.0, 0.0, 0.0], metodo)
@@ -0,0 +1,21 @@
+"""La evaluación por lotes coincide con el presupuesto escalar."""
+import dataclasses
+
+import numpy as np
+
+from presupuesto import METODOS_VALUACION, EntradasPresupuesto, Material, compute_master_budget
+from presupuesto.lote import CAMPOS_RESULTADO, evaluar_arrays
+
+
+def test_metodos_en_arreglo_con_materiales_adicionales():
+    # Producción escalar y método como arreglo: el eje de materiales no debe
+    # mezclarse con el de los métodos
+    base = EntradasPresupuesto(materiales_adicionales=(
+        Material('Material C', 2000.0, 3.0, 1500.0, 3.5, 1.5),
+        Material('Material D', 500.0, 8.0, 900.0, 7.0, 0.25),
+    ))
+    lote = evaluar_arrays({'metodo_valuacion': np.array(METODOS_VALUACION)}, base)
+    for i, metodo in enumerate(METODOS_VALUACION):
+        escalar = compute_master_budget(dataclasses.replace(base, metodo_valuacion=metodo))
+        for campo in CAMPOS_RESULTADO:
+            np.testing.assert_allclose(lote[campo][i], getattr(escalar, campo), err_msg=f'{metodo}: {campo}')
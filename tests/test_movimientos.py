@@ -0,0 +1,26 @@
+"""Carpeta de archivos de movimientos con techo de tamaño."""
+import os
+
+from presupuesto.movimientos import desalojar_movimientos, guardar_movimientos
+
+CONTENIDO = b'articulo,cantidad,costo_unitario\nA,10,5.0\nA,-4,0\n'
+
+
+def test_guardar_es_por_contenido(tmp_path):
+    primera = guardar_movimientos(CONTENIDO, '.CSV', tmp_path)
+    assert guardar_movimientos(CONTENIDO, '.csv', tmp_path) == primera
+    assert primera.suffix == '.csv' and primera.read_bytes() == CONTENIDO
+
+
+def test_desaloja_el_menos_usado_con_sus_historiales(tmp_path):
+    vieja = guardar_movimientos(CONTENIDO, '.csv', tmp_path)
+    historial = tmp_path / f'{vieja.stem}.0.arrow'
+    historial.write_bytes(b'x' * 100)
+    for archivo in (vieja, historial):
+        os.utime(archivo, (0, 0))
+    nueva = guardar_movimientos(CONTENIDO + b'B,1,1.0\n', '.csv', tmp_path, max_mb=100 / 1024 ** 2)
+    assert nueva.exists()
+    assert not vieja.exists() and not historial.exists()
+    # El recién guardado no se borra aunque rebase el techo por sí solo
+    assert desalojar_movimientos(tmp_path, 0, conservar=nueva) == 0
+    assert nueva.exists()
@@ -0,0 +1,43 @@
+"""Búsqueda de objetivo: la solución lleva la métrica a la meta."""
+import numpy as np
+import pytest
+
+from presupuesto import METODOS_VALUACION, EntradasPresupuesto
+from presupuesto.lote import evaluar_arrays
+from presupuesto.objetivo import CAMPOS_LINEALES, buscar_objetivo, punto_equilibrio
+
+METODOS = {'metodo_valuacion': np.array(METODOS_VALUACION)}
+
+
+@pytest.mark.parametrize('campo, metrica, meta', [
+    ('precio', 'margen_operativo', 20.0),
+    ('costo_mat_a', 'utilidad_operativa', 1_000_000.0),
+    ('cuota_hr', 'margen_bruto', 25.0),
+])
+def test_forma_cerrada(campo, metrica, meta):
+    assert campo in CAMPOS_LINEALES
+    solucion = buscar_objetivo(campo, metrica, meta, METODOS)
+    assert np.isfinite(solucion).all()
+    resultado = evaluar_arrays({**METODOS, campo: solucion})
+    np.testing.assert_allclose(resultado[metrica], meta, rtol=1e-9)
+
+
+@pytest.mark.parametrize('campo, metrica, meta', [
+    ('unidades', 'utilidad_operativa', 0.0),
+    ('unidades', 'margen_operativo', 15.0),
+    ('inv_final_pt', 'utilidad_operativa', 2_500_000.0),
+])
+def test_falsa_posicion(campo, metrica, meta):
+    assert campo not in CAMPOS_LINEALES
+    metas = np.array([[meta], [meta * 1.1 if meta else 100_000.0]])
+    solucion = buscar_objetivo(campo, metrica, metas, METODOS)
+    assert solucion.shape == (2, len(METODOS_VALUACION)) and np.isfinite(solucion).all()
+    resultado = evaluar_arrays({**METODOS, campo: solucion})
+    np.testing.assert_allclose(resultado[metrica], np.broadcast_to(metas, solucion.shape), rtol=1e-6, atol=1e-3)
+
+
+def test_punto_equilibrio_y_sin_solucion():
+    unidades = punto_equilibrio('unidades', METODOS)
+    np.testing.assert_allclose(evaluar_arrays({**METODOS, 'unidades': unidades})['utilidad_operativa'], 0.0, atol=1e-3)
+    # Un margen operativo de 100 % no se alcanza con ningún precio
+    assert np.isnan(buscar_objetivo('precio', 'margen_operativo', 100.0, base=EntradasPresupuesto()))
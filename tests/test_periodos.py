@@ -0,0 +1,43 @@
+"""La valuación entre periodos coincide con el kardex movimiento por movimiento."""
+import numpy as np
+import pytest
+
+from presupuesto import METODOS_VALUACION
+from presupuesto.kardex import valuar_movimientos
+from presupuesto.periodos import valuar_periodos
+
+PERIODOS = 24
+
+
+def periodos_aleatorios(rng, lote):
+    # En cada periodo entra y luego sale a lo más lo disponible
+    inv_inicial = rng.uniform(0, 500, lote)
+    costo_inicial = rng.uniform(1, 20, lote)
+    entradas = rng.uniform(0, 300, lote + (PERIODOS,))
+    entradas[..., 3] = 0.0
+    costos = rng.uniform(1, 20, lote + (PERIODOS,))
+    salidas = np.empty_like(entradas)
+    existencia = inv_inicial.copy()
+    for t in range(PERIODOS):
+        disponible = existencia + entradas[..., t]
+        # Algunos periodos vacían el inventario
+        salidas[..., t] = np.where(rng.random(lote) < 0.1, disponible, rng.uniform(0, 1, lote) * disponible)
+        existencia = disponible - salidas[..., t]
+    return inv_inicial, costo_inicial, entradas, costos, salidas
+
+
+@pytest.mark.parametrize('metodo', METODOS_VALUACION)
+def test_coincide_con_kardex(metodo):
+    rng = np.random.default_rng(METODOS_VALUACION.index(metodo))
+    lote = (3, 4)
+    inv_inicial, costo_inicial, entradas, costos, salidas = periodos_aleatorios(rng, lote)
+    costo_salidas, valor_final = valuar_periodos(inv_inicial, costo_inicial, entradas, costos, salidas, metodo)
+    assert costo_salidas.shape == valor_final.shape == entradas.shape
+
+    for i in np.ndindex(*lote):
+        # Movimientos entrada, salida, entrada, salida...
+        cantidades = np.column_stack((entradas[i], -salidas[i])).ravel()
+        costos_mov = np.column_stack((costos[i], np.zeros(PERIODOS))).ravel()
+        r = valuar_movimientos(cantidades, costos_mov, metodo, inv_inicial[i], costo_inicial[i])
+        np.testing.assert_allclose(costo_salidas[i], r.costo_salida[1::2], rtol=1e-7, atol=1e-6)
+        np.testing.assert_allclose(valor_final[i], r.valor[1::2], rtol=1e-7, atol=1e-6)
@@ -0,0 +1,40 @@
+"""Una sola captura de cProfile a la vez en el proceso."""
+import cProfile
+
+from presupuesto import rendimiento
+from presupuesto.rendimiento import detener_captura, iniciar_captura
+
+
+def test_captura_en_curso():
+    primera = iniciar_captura()
+    try:
+        assert primera is not None
+        assert iniciar_captura() is None
+    finally:
+        detener_captura(primera)
+    detener_captura(primera)
+    segunda = iniciar_captura()
+    assert segunda is not None
+    detener_captura(segunda)
+
+
+def test_captura_abandonada_se_libera(monkeypatch):
+    abandonada = iniciar_captura()
+    monkeypatch.setattr(rendimiento, 'CAPTURA_MAXIMA_S', 0)
+    nueva = iniciar_captura()
+    assert nueva is not None
+    detener_captura(nueva)
+    detener_captura(abandonada)
+
+
+def test_perfilador_ocupado(monkeypatch):
+    # Python 3.12+: enable() falla si otra herramienta ocupa sys.monitoring
+    class Ocupado(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+    monkeypatch.setattr(rendimiento.cProfile, 'Profile', Ocupado)
+    assert iniciar_captura() is None
+    monkeypatch.undo()
+    perfil = iniciar_captura()
+    assert perfil is not None
+    detener_captura(perfil)